@@ -0,0 +1,35 @@
+from fastapi import Header
+from typing import List, Optional
+
+from app.core.admission import granted_tenants
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, ForbiddenException
+from app.infrastructure.vector_db import parse_tenants
+
+
+def request_tenants(
+    tenant_header: Optional[str] = Header(default=None, alias=settings.TENANT_HEADER),
+    api_key: Optional[str] = Header(default=None, alias=settings.API_KEY_HEADER),
+) -> List[str]:
+    """
+    Tenants a request is scoped to, from the TENANT_HEADER header (comma-separated)
+
+    Only tenants granted to the request's API key in API_KEY_TENANTS are allowed.
+
+    Returns:
+        Tenant IDs, empty when the request uses the shared collection
+
+    Raises:
+        BadRequestException: If a tenant ID is not valid
+        ForbiddenException: If the API key is not granted every tenant
+    """
+    try:
+        tenants = parse_tenants(tenant_header)
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+
+    granted = granted_tenants(api_key)
+    denied = [tenant for tenant in tenants if tenant not in granted and "*" not in granted]
+    if denied:
+        raise ForbiddenException(detail=f"Access to tenant denied: {', '.join(denied)}")
+    return tenants
@@ -9,11 +9,12 @@ class CVMetadata(BaseModel):
     experience_years: Optional[float] = None
     job_titles: Optional[List[str]] = None
     education: Optional[str] = None
+    profile: Optional[str] = None
 
 class CVDocument(BaseModel):
     id: str
     filename: str
-    content: str
+    content: Optional[str] = None
     metadata: CVMetadata
 
 class CVUploadResponse(BaseModel):
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+class MatchRequest(BaseModel):
+    job_description: str
+    required_skills: Optional[List[str]] = None
+    min_experience_years: Optional[float] = Field(default=None, ge=0)
+    page: int = Field(default=1, ge=1)
+    page_size: int = Field(default=20, ge=1)
+    summarize_top_n: int = Field(default=0, ge=0)
+
+class CandidateMatch(BaseModel):
+    id: str
+    filename: str
+    name: Optional[str] = None
+    location: Optional[str] = None
+    experience_years: Optional[float] = None
+    score: float
+    semantic_score: float
+    skills_score: float
+    experience_score: float
+    matched_skills: List[str]
+
+class MatchResponse(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    candidates: List[CandidateMatch]
+    summary: Optional[str] = None
@@ -3,7 +3,9 @@ from typing import Optional
 
 class QuestionRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None
 
 class QuestionResponse(BaseModel):
     question: str
-    answer: str
\ No newline at end of file
+    answer: str
+    session_id: Optional[str] = None
@@ -1,37 +1,88 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks
-from typing import List
+import io
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
 
-from app.core.exceptions import BadRequestException, InternalServerException
+from app.core.admission import INGESTION, lane, reserve_ingestion_slot, release_ingestion_slot, submit_ingestion
+from app.core.exceptions import (
+    BadRequestException,
+    InternalServerException,
+    NotFoundException,
+    ServiceUnavailableException,
+)
+from app.core.config import settings
+from app.core.metrics import INGESTION_QUEUE_DEPTH
+from app.core.tracing import current_context, use_context
+from app.api.dependencies import request_tenants
 from app.api.models.cv import CVUploadResponse, CVDocument
 from app.services.cv_processor import process_cv_file
-from app.infrastructure.vector_db import get_all_cvs
+from app.infrastructure.vector_db import get_all_cvs, get_cv
 
 router = APIRouter()
 
+def _process_queued_cv(file: UploadFile, trace_context=None, tenant: Optional[str] = None):
+    """Process a queued CV in the ingestion lane, under the uploading request's trace, and release its queue slot"""
+    try:
+        with use_context(trace_context), lane(INGESTION):
+            process_cv_file(file, tenant)
+    finally:
+        INGESTION_QUEUE_DEPTH.dec()
+        release_ingestion_slot()
+
 @router.post("/upload", response_model=CVUploadResponse, summary="Upload a CV")
 async def upload_cv(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    tenants: List[str] = Depends(request_tenants)
 ):
-    """Upload a CV file (PDF) to be processed and indexed"""
+    """Upload a CV file (PDF) to be processed and indexed, into the tenant's collection if one is given"""
     
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
         raise BadRequestException(detail="Only PDF files are supported")
     
+    if len(tenants) > 1:
+        raise BadRequestException(detail="A CV can only be uploaded to one tenant")
+    
+    # Refuse rather than queue without bound when ingestion is falling behind
+    if not reserve_ingestion_slot():
+        raise ServiceUnavailableException(
+            detail="Too many CVs waiting to be processed",
+            retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        )
+    
+    INGESTION_QUEUE_DEPTH.inc()
     try:
-        # Process the CV in the background
-        background_tasks.add_task(process_cv_file, file)
+        # Process the CV in the background, on the ingestion pool rather than the request threads;
+        # the upload is read now because the request closes its file once the response is sent
+        queued = UploadFile(io.BytesIO(await file.read()), filename=file.filename)
+        submit_ingestion(_process_queued_cv, queued, current_context(), tenants[0] if tenants else None)
         
         return {"message": f"CV uploaded and being processed: {file.filename}"}
     except Exception as e:
+        INGESTION_QUEUE_DEPTH.dec()
+        release_ingestion_slot()
         raise InternalServerException(detail=f"Error processing CV: {str(e)}")
 
 @router.get("/cv", response_model=List[CVDocument], summary="Get all CVs")
-async def get_cvs():
-    """Get all uploaded CVs"""
+async def get_cvs(tenants: List[str] = Depends(request_tenants)):
+    """Get all uploaded CVs of the given tenants (metadata only; use /cv/{cv_id} for the full text)"""
     try:
-        return get_all_cvs()
+        if settings.FAST_JSON_RESPONSES:
+            # The listing is built here from stored metadata, so skip re-validating it against
+            # the response model and serialize the plain dictionaries with orjson
+            return ORJSONResponse(get_all_cvs(tenants, as_dicts=True))
+        return get_all_cvs(tenants)
     except Exception as e:
         raise InternalServerException(detail=f"Error retrieving CVs: {str(e)}")
-    
\ No newline at end of file
+
+@router.get("/cv/{cv_id}", response_model=CVDocument, summary="Get a CV")
+async def get_cv_detail(cv_id: str, tenants: List[str] = Depends(request_tenants)):
+    """Get a single CV, including its full text"""
+    try:
+        cv = get_cv(cv_id, tenants)
+    except Exception as e:
+        raise InternalServerException(detail=f"Error retrieving CV: {str(e)}")
+    
+    if cv is None:
+        raise NotFoundException(detail=f"CV not found: {cv_id}")
+    return cv
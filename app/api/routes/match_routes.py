@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from typing import List
+
+from app.api.dependencies import request_tenants
+from app.api.models.match import MatchRequest, MatchResponse
+from app.services.match_service import rank_candidates
+from app.core.exceptions import (
+    BadRequestException,
+    InternalServerException,
+    ProviderBusyException,
+    ServiceUnavailableException,
+)
+
+router = APIRouter()
+
+@router.post("/match", response_model=MatchResponse, summary="Rank candidates for a job description")
+def match_candidates(request: MatchRequest, tenants: List[str] = Depends(request_tenants)):
+    """Rank all uploaded CVs of the given tenants against a job description"""
+    
+    # Validate request
+    if not request.job_description.strip():
+        raise BadRequestException(detail="Job description is required")
+    
+    try:
+        return rank_candidates(
+            request.job_description,
+            required_skills=request.required_skills,
+            min_experience_years=request.min_experience_years,
+            page=request.page,
+            page_size=request.page_size,
+            summarize_top_n=request.summarize_top_n,
+            tenants=tenants,
+        )
+    except ProviderBusyException as e:
+        raise ServiceUnavailableException(detail=str(e), retry_after=e.retry_after)
+    except Exception as e:
+        raise InternalServerException(detail=f"Error matching candidates: {str(e)}")
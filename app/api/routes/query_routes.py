@@ -1,14 +1,28 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List
 
+from app.api.dependencies import request_tenants
 from app.api.models.query import QuestionRequest, QuestionResponse
 from app.services.query_service import process_question
-from app.core.exceptions import BadRequestException, InternalServerException
+from app.services.session_store import get_session, save_session
+from app.core.exceptions import (
+    BadRequestException,
+    InternalServerException,
+    ProviderBusyException,
+    ServiceUnavailableException,
+)
 
 router = APIRouter()
 
 @router.post("/ask", response_model=QuestionResponse, summary="Ask a question about CVs")
-async def ask_question(request: QuestionRequest):
-    """Ask a question about the uploaded CVs"""
+def ask_question(request: QuestionRequest, tenants: List[str] = Depends(request_tenants)):
+    """
+    Ask a question about the uploaded CVs
+    
+    Pass the session_id of a previous answer to ask follow-up questions about the
+    same candidates; a new session is started when it is missing or expired.
+    Name several tenants in the tenant header to search all of their CVs at once.
+    """
     
     # Validate request
     if not request.question:
@@ -16,8 +30,12 @@ async def ask_question(request: QuestionRequest):
     
     try:
         # Process the question
-        answer = process_question(request.question)
+        session = get_session(request.session_id, tenants)
+        answer = process_question(request.question, session, tenants)
+        save_session(session)
         
-        return {"question": request.question, "answer": answer}
+        return {"question": request.question, "answer": answer, "session_id": session.id}
+    except ProviderBusyException as e:
+        raise ServiceUnavailableException(detail=str(e), retry_after=e.retry_after)
     except Exception as e:
         raise InternalServerException(detail=f"Error processing your question: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,373 @@
+import math
+import time
+import ipaddress
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.core.exceptions import ProviderBusyException
+from app.core.metrics import ADMISSION_REJECTIONS, PROVIDER_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+INGESTION = "ingestion"
+
+# Lane of the work running in the current context; background ingestion switches it
+_lane: ContextVar[str] = ContextVar("admission_lane", default=INTERACTIVE)
+
+# Routes that queue background ingestion rather than answer interactively
+_INGESTION_PATHS = {"/upload"}
+
+# Routes that are never limited
+_EXEMPT_PREFIXES = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+
+def worker_share(total: int) -> int:
+    """A worker's share of a server-wide limit, which every worker enforces on its own"""
+    return max(total // max(settings.WEB_CONCURRENCY, 1), 1)
+
+
+def _rate_share(rate: float, burst: float) -> Tuple[float, float]:
+    # Requests are spread over the workers, so a client gets about the configured rate in total
+    workers = max(settings.WEB_CONCURRENCY, 1)
+    return rate / workers, max(burst / workers, 1.0)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Take tokens if available
+
+        Returns:
+            Whether the tokens were taken, and otherwise the seconds until they will be
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimiter:
+    """Token buckets per client and lane, keeping the most recently seen clients"""
+
+    def __init__(self, max_clients: int = 10000):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str, lane: str) -> Tuple[bool, float]:
+        """Take one token from the client's bucket for a lane"""
+        key = (client, lane)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if lane == INGESTION:
+                    rate, burst = _rate_share(settings.RATE_LIMIT_UPLOADS_PER_SECOND, settings.RATE_LIMIT_UPLOAD_BURST)
+                else:
+                    rate, burst = _rate_share(settings.RATE_LIMIT_REQUESTS_PER_SECOND, settings.RATE_LIMIT_BURST)
+                bucket = TokenBucket(rate, burst)
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+            return bucket.try_acquire()
+
+
+class ProviderBudget:
+    """
+    Bounded concurrency for calls to one provider, with priority lanes
+
+    Interactive calls may use every slot and are served first; ingestion calls
+    only use the slots not reserved for interactive traffic, and wait while any
+    interactive call is queued.
+    """
+
+    def __init__(self, provider: str, limit: int, reserved_interactive: int):
+        self.provider = provider
+        self.limit = limit
+        self.ingestion_limit = max(limit - reserved_interactive, 1)
+        self.in_use = 0
+        self.interactive_waiting = 0
+        self._condition = threading.Condition()
+
+    def _available(self, lane: str) -> bool:
+        if lane == INTERACTIVE:
+            return self.in_use < self.limit
+        return self.in_use < self.ingestion_limit and self.interactive_waiting == 0
+
+    def acquire(self, lane: str, timeout: Optional[float]) -> bool:
+        """Wait for a slot; returns False if none freed up within the timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if lane == INTERACTIVE:
+                self.interactive_waiting += 1
+            try:
+                while not self._available(lane):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.in_use += 1
+            finally:
+                if lane == INTERACTIVE:
+                    self.interactive_waiting -= 1
+                    # Queued ingestion may proceed once no interactive call is waiting
+                    self._condition.notify_all()
+        PROVIDER_IN_FLIGHT.labels(provider=self.provider, lane=lane).inc()
+        return True
+
+    def release(self, lane: str):
+        PROVIDER_IN_FLIGHT.labels(provider=self.provider, lane=lane).dec()
+        with self._condition:
+            self.in_use -= 1
+            self._condition.notify_all()
+
+
+_rate_limiter = RateLimiter()
+_budgets: Dict[str, ProviderBudget] = {}
+_budgets_lock = threading.Lock()
+_interactive_in_flight = 0
+_ingestion_queued = 0
+_counters_lock = threading.Lock()
+_ingestion_pool: Optional[ThreadPoolExecutor] = None
+_ingestion_pool_lock = threading.Lock()
+
+
+def _provider_limits() -> Tuple[int, int]:
+    # This worker's provider slots, and how many of them are kept for interactive calls
+    return (
+        worker_share(settings.PROVIDER_MAX_CONCURRENCY),
+        settings.PROVIDER_INTERACTIVE_RESERVED // max(settings.WEB_CONCURRENCY, 1),
+    )
+
+
+def _budget(provider: str) -> ProviderBudget:
+    with _budgets_lock:
+        if provider not in _budgets:
+            _budgets[provider] = ProviderBudget(provider, *_provider_limits())
+        return _budgets[provider]
+
+
+def current_lane() -> str:
+    """Lane of the work running in the current context"""
+    return _lane.get()
+
+
+@contextmanager
+def lane(name: str):
+    """Run the enclosed provider calls in a priority lane"""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+@contextmanager
+def provider_slot(provider: str):
+    """
+    Hold one of the provider's concurrency slots for the enclosed call
+
+    Interactive calls wait at most PROVIDER_INTERACTIVE_MAX_WAIT_SECONDS; ingestion
+    calls wait for as long as it takes, yielding to interactive ones.
+
+    Raises:
+        ProviderBusyException: If an interactive call could not get a slot in time
+    """
+    if not settings.ADMISSION_ENABLED:
+        yield
+        return
+
+    current = _lane.get()
+    budget = _budget(provider)
+    timeout = settings.PROVIDER_INTERACTIVE_MAX_WAIT_SECONDS if current == INTERACTIVE else None
+    if not budget.acquire(current, timeout):
+        ADMISSION_REJECTIONS.labels(lane=current, reason="provider_busy").inc()
+        raise ProviderBusyException(
+            f"{provider} is at its concurrency limit", retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS
+        )
+    try:
+        yield
+    finally:
+        budget.release(current)
+
+
+@lru_cache(maxsize=8)
+def _parse_api_keys(value: str) -> FrozenSet[str]:
+    return frozenset(key.strip() for key in value.split(",") if key.strip())
+
+
+@lru_cache(maxsize=8)
+def _parse_api_key_tenants(value: str) -> Dict[str, FrozenSet[str]]:
+    grants = {}
+    for entry in value.split(";"):
+        key, _, tenants = entry.partition("=")
+        if key.strip():
+            grants[key.strip()] = frozenset(tenant.strip() for tenant in tenants.split(",") if tenant.strip())
+    return grants
+
+
+def granted_tenants(api_key: Optional[str]) -> FrozenSet[str]:
+    """Tenants an API key may access according to API_KEY_TENANTS; "*" grants all of them"""
+    if not api_key:
+        return frozenset()
+    return _parse_api_key_tenants(settings.API_KEY_TENANTS).get(api_key, frozenset())
+
+
+def is_known_api_key(api_key: Optional[str]) -> bool:
+    """Whether an API key is one of the configured API_KEYS or API_KEY_TENANTS keys"""
+    return bool(api_key) and (
+        api_key in _parse_api_keys(settings.API_KEYS)
+        or api_key in _parse_api_key_tenants(settings.API_KEY_TENANTS)
+    )
+
+
+@lru_cache(maxsize=8)
+def _parse_networks(value: str) -> Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]:
+    return tuple(ipaddress.ip_network(cidr.strip(), strict=False) for cidr in value.split(",") if cidr.strip())
+
+
+def _is_trusted_proxy(host: Optional[str]) -> bool:
+    try:
+        address = ipaddress.ip_address(host or "")
+    except ValueError:
+        return False
+    return any(address in network for network in _parse_networks(settings.TRUSTED_PROXY_CIDRS))
+
+
+def forwarded_client(client_host: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+    """
+    Address of the client as seen by the outermost of TRUSTED_PROXY_HOPS proxies
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the client's is the TRUSTED_PROXY_HOPS-th entry from the
+    end; entries before it are whatever the client sent and are ignored. The
+    header is only used when the connection comes from TRUSTED_PROXY_CIDRS.
+
+    Args:
+        client_host: Address of the connecting peer
+        forwarded_for: The X-Forwarded-For header, if any
+
+    Returns:
+        The client address to identify the client by
+    """
+    hops = settings.TRUSTED_PROXY_HOPS
+    if hops <= 0 or not forwarded_for or not _is_trusted_proxy(client_host):
+        return client_host
+    hosts = [host.strip() for host in forwarded_for.split(",") if host.strip()]
+    if not hosts:
+        return client_host
+    return hosts[-hops] if len(hosts) >= hops else hosts[0]
+
+
+def client_key(api_key: Optional[str], client_host: Optional[str]) -> str:
+    """
+    Identify a client by its API key, or by its address when the key is missing or unknown
+
+    Unknown keys are not trusted: a client sending a new key with every request
+    would otherwise get a fresh burst each time and evict other clients' buckets.
+    """
+    return f"key:{api_key}" if is_known_api_key(api_key) else f"ip:{client_host or 'unknown'}"
+
+
+def request_lane(path: str) -> Optional[str]:
+    """Lane of an HTTP request, or None for routes that are never limited"""
+    if path.startswith(_EXEMPT_PREFIXES):
+        return None
+    return INGESTION if path in _INGESTION_PATHS else INTERACTIVE
+
+
+def admit_request(client: str, lane_name: str) -> Optional[Tuple[int, int, str]]:
+    """
+    Decide whether to admit an HTTP request
+
+    Args:
+        client: Client key from client_key
+        lane_name: Lane from request_lane
+
+    Returns:
+        None to admit the request, otherwise (status code, Retry-After seconds, reason)
+    """
+    global _interactive_in_flight
+
+    allowed, wait = _rate_limiter.check(client, lane_name)
+    if not allowed:
+        ADMISSION_REJECTIONS.labels(lane=lane_name, reason="rate_limited").inc()
+        return 429, max(math.ceil(wait), 1), "Rate limit exceeded"
+
+    if lane_name == INTERACTIVE:
+        with _counters_lock:
+            if _interactive_in_flight >= worker_share(settings.INTERACTIVE_MAX_IN_FLIGHT):
+                ADMISSION_REJECTIONS.labels(lane=lane_name, reason="over_capacity").inc()
+                return 503, settings.ADMISSION_RETRY_AFTER_SECONDS, "Server is at capacity"
+            _interactive_in_flight += 1
+    return None
+
+
+def finish_request(lane_name: str):
+    """Release the capacity taken by an admitted request"""
+    global _interactive_in_flight
+
+    if lane_name == INTERACTIVE:
+        with _counters_lock:
+            _interactive_in_flight -= 1
+
+
+def reserve_ingestion_slot() -> bool:
+    """Reserve a place in the background ingestion queue; False when it is full"""
+    global _ingestion_queued
+
+    with _counters_lock:
+        if settings.ADMISSION_ENABLED and _ingestion_queued >= worker_share(settings.INGESTION_MAX_QUEUE):
+            ADMISSION_REJECTIONS.labels(lane=INGESTION, reason="queue_full").inc()
+            return False
+        _ingestion_queued += 1
+        return True
+
+
+def release_ingestion_slot():
+    """Free a place in the background ingestion queue"""
+    global _ingestion_queued
+
+    with _counters_lock:
+        _ingestion_queued -= 1
+
+
+def ingestion_workers() -> int:
+    """Threads processing queued uploads: the provider slots ingestion may use, so none of them waits on another"""
+    limit, reserved_interactive = _provider_limits()
+    return max(limit - reserved_interactive, 1)
+
+
+def submit_ingestion(fn, *args, **kwargs) -> Future:
+    """
+    Run queued ingestion work on its own bounded thread pool
+
+    Uploads waiting for a provider slot block only these threads, never the
+    server's thread pool that runs the interactive handlers. The pool is created
+    on first use, so each forked worker gets its own.
+    """
+    global _ingestion_pool
+
+    with _ingestion_pool_lock:
+        if _ingestion_pool is None:
+            _ingestion_pool = ThreadPoolExecutor(max_workers=ingestion_workers(), thread_name_prefix="ingestion")
+        return _ingestion_pool.submit(fn, *args, **kwargs)
@@ -0,0 +1,170 @@
+import zlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; responses fall back to gzip without it
+    brotli = None
+
+# Media types worth compressing; images, PDFs and archives are already compressed
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml", "application/javascript")
+
+
+def supported_encodings() -> List[str]:
+    """Content encodings this process can produce, preferred first"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content encoding for a response from the client's Accept-Encoding header
+
+    Args:
+        accept_encoding: The raw header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br" or "gzip", or None to send the response uncompressed
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    # Highest weight wins; on a tie, the order of supported_encodings decides
+    best = None
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (encoding, weight)
+    return best[0] if best else None
+
+
+class _Compressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            # wbits=31 writes the gzip header and trailer
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a whole body with "br" or "gzip" at the configured level"""
+    compressor = _Compressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip, as the client accepts
+
+    Responses sent in one piece are only compressed from COMPRESSION_MIN_BYTES up,
+    since small bodies gain little and pay the compression latency; streamed
+    responses are compressed chunk by chunk. Responses that already carry a
+    Content-Encoding or are not text-like are passed through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[dict] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = dict(message.get("headers") or [])
+                media_type = headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = b"content-encoding" in headers or not media_type.startswith(_COMPRESSIBLE_TYPES)
+                if passthrough:
+                    await send(message)
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body:
+                    # The whole body is at hand: compress it only if it is worth it
+                    if len(body) < settings.COMPRESSION_MIN_BYTES:
+                        await send(start_message)
+                        await send(message)
+                        return
+                    body = compress(body, encoding)
+                    await send(_with_encoding(start_message, encoding, len(body)))
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                # Streamed body: the final length is unknown, so drop Content-Length
+                compressor = _Compressor(encoding)
+                await send(_with_encoding(start_message, encoding, None))
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.flush()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _with_encoding(start_message: dict, encoding: str, length: Optional[int]) -> dict:
+    """Response start message with the Content-Encoding, Vary and Content-Length headers updated"""
+    headers: List[Tuple[bytes, bytes]] = [
+        (name, value)
+        for name, value in start_message.get("headers") or []
+        if name.lower() not in (b"content-length", b"content-encoding")
+    ]
+    headers.append((b"content-encoding", encoding.encode("latin-1")))
+    if length is not None:
+        headers.append((b"content-length", str(length).encode("latin-1")))
+    vary = [value for name, value in headers if name.lower() == b"vary"]
+    if not any(b"accept-encoding" in value.lower() for value in vary):
+        headers.append((b"vary", b"Accept-Encoding"))
+    return dict(start_message, headers=headers)
@@ -14,6 +14,21 @@ class Settings(BaseSettings):
     
     # S3 Configuration
     S3_BUCKET_NAME: str = os.getenv("S3_BUCKET_NAME", "cv-assistant-bucket")
+    # Set S3_ENDPOINT_URL to use an S3-compatible store instead of AWS (e.g. MinIO or a moto server)
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")
+    
+    # S3 Sync Configuration
+    # The sync worker indexes CVs dropped straight into S3_BUCKET_NAME under S3_SYNC_PREFIX;
+    # S3_SYNC_ENABLED runs it inside the API process, otherwise run `python -m app.services.s3_sync`
+    S3_SYNC_ENABLED: bool = os.getenv("S3_SYNC_ENABLED", "false").lower() == "true"
+    S3_SYNC_PREFIX: str = os.getenv("S3_SYNC_PREFIX", "")
+    S3_SYNC_INTERVAL_SECONDS: float = float(os.getenv("S3_SYNC_INTERVAL_SECONDS", "60"))
+    S3_SYNC_CONCURRENCY: int = int(os.getenv("S3_SYNC_CONCURRENCY", "4"))
+    S3_SYNC_STATE_PATH: str = os.getenv("S3_SYNC_STATE_PATH", "./s3_sync_state.json")
+    # Set S3_SYNC_TENANT_FROM_KEY to index keys like "<prefix><tenant>/<file>.pdf" into that tenant's
+    # collection; otherwise they go to the shared one (CVs from /upload keep their tenant either way)
+    S3_SYNC_TENANT_FROM_KEY: bool = os.getenv("S3_SYNC_TENANT_FROM_KEY", "false").lower() == "true"
+    S3_SYNC_DELETE: bool = os.getenv("S3_SYNC_DELETE", "true").lower() == "true"
     
     # Model Configuration
     BEDROCK_MODEL_ID: str = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
@@ -22,14 +37,136 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
     
+    # Model Routing Configuration
+    # Simple questions go to the small model, everything else to BEDROCK_MODEL_ID / OPENAI_MODEL
+    ROUTER_ENABLED: bool = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+    BEDROCK_SMALL_MODEL_ID: str = os.getenv("BEDROCK_SMALL_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+    OPENAI_SMALL_MODEL: str = os.getenv("OPENAI_SMALL_MODEL", "gpt-4o-mini")
+    ROUTER_SIMPLE_MAX_WORDS: int = int(os.getenv("ROUTER_SIMPLE_MAX_WORDS", "15"))
+    ROUTER_SIMPLE_MAX_CONTEXT_CHARS: int = int(os.getenv("ROUTER_SIMPLE_MAX_CONTEXT_CHARS", "4000"))
+    ROUTER_SMALL_MAX_TOKENS: int = int(os.getenv("ROUTER_SMALL_MAX_TOKENS", "300"))
+    ROUTER_LARGE_MAX_TOKENS: int = int(os.getenv("ROUTER_LARGE_MAX_TOKENS", "1000"))
+    # Prices in USD per 1K tokens, used for the expected cost metrics (defaults: Claude 3 Haiku / Sonnet)
+    ROUTER_SMALL_INPUT_COST: float = float(os.getenv("ROUTER_SMALL_INPUT_COST", "0.00025"))
+    ROUTER_SMALL_OUTPUT_COST: float = float(os.getenv("ROUTER_SMALL_OUTPUT_COST", "0.00125"))
+    ROUTER_LARGE_INPUT_COST: float = float(os.getenv("ROUTER_LARGE_INPUT_COST", "0.003"))
+    ROUTER_LARGE_OUTPUT_COST: float = float(os.getenv("ROUTER_LARGE_OUTPUT_COST", "0.015"))
+    
+    # Prompt Caching Configuration
+    # Bedrock caching needs a model that supports it (e.g. Claude 3.5 Haiku, Claude 3.7 Sonnet);
+    # OpenAI caches stable prompt prefixes automatically
+    BEDROCK_PROMPT_CACHING: bool = os.getenv("BEDROCK_PROMPT_CACHING", "false").lower() == "true"
+    # Price of a cached input token relative to an uncached one (0.1 on Bedrock, 0.5 on OpenAI)
+    PROMPT_CACHE_READ_COST_FACTOR: float = float(os.getenv("PROMPT_CACHE_READ_COST_FACTOR", "0.1"))
+    # Shortest prefix the provider will cache; Bedrock ignores breakpoints on shorter prefixes
+    PROMPT_CACHE_MIN_TOKENS: int = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+    
+    # Admission Control Configuration
+    # Clients are identified by an API_KEY_HEADER key listed in API_KEYS (comma-separated), or by
+    # address otherwise, so made-up keys do not get a rate limit of their own
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    API_KEY_HEADER: str = os.getenv("API_KEY_HEADER", "X-API-Key")
+    API_KEYS: str = os.getenv("API_KEYS", "")
+    # Behind a load balancer every connection comes from the balancer: TRUSTED_PROXY_HOPS is the
+    # number of proxies appending to X-Forwarded-For (1 behind an ALB), trusted only when the
+    # connection comes from TRUSTED_PROXY_CIDRS, so clients are told apart by their own address
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+    TRUSTED_PROXY_CIDRS: str = os.getenv("TRUSTED_PROXY_CIDRS", "10.0.0.0/8,172.16.0.0/12,192.168.0.0/16")
+    # The limits below are totals for the server; each of its WEB_CONCURRENCY workers (set by
+    # gunicorn.conf.py) enforces an equal share of them
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    RATE_LIMIT_REQUESTS_PER_SECOND: float = float(os.getenv("RATE_LIMIT_REQUESTS_PER_SECOND", "5"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "20"))
+    RATE_LIMIT_UPLOADS_PER_SECOND: float = float(os.getenv("RATE_LIMIT_UPLOADS_PER_SECOND", "2"))
+    RATE_LIMIT_UPLOAD_BURST: float = float(os.getenv("RATE_LIMIT_UPLOAD_BURST", "50"))
+    INTERACTIVE_MAX_IN_FLIGHT: int = int(os.getenv("INTERACTIVE_MAX_IN_FLIGHT", "32"))
+    INGESTION_MAX_QUEUE: int = int(os.getenv("INGESTION_MAX_QUEUE", "200"))
+    PROVIDER_MAX_CONCURRENCY: int = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "8"))
+    PROVIDER_INTERACTIVE_RESERVED: int = int(os.getenv("PROVIDER_INTERACTIVE_RESERVED", "2"))
+    PROVIDER_INTERACTIVE_MAX_WAIT_SECONDS: float = float(os.getenv("PROVIDER_INTERACTIVE_MAX_WAIT_SECONDS", "5"))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+    
     # Vector DB Configuration
     VECTOR_DB_DIR: str = os.getenv("VECTOR_DB_DIR", "./chroma_db")
     COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "cv_embeddings")
+    # Set CHROMA_HOST to use a ChromaDB server instead of VECTOR_DB_DIR (required for multiple workers)
+    CHROMA_HOST: Optional[str] = os.getenv("CHROMA_HOST")
+    CHROMA_PORT: int = int(os.getenv("CHROMA_PORT", "8000"))
+    
+    # Tenant Configuration
+    # Each tenant (client or requisition) named in the TENANT_HEADER header gets its own
+    # collection; requests without it use COLLECTION_NAME. API_KEY_TENANTS grants each API key
+    # its tenants, e.g. "key1=acme,globex;key2=*"; requests naming any other tenant are refused
+    TENANT_HEADER: str = os.getenv("TENANT_HEADER", "X-Tenant-ID")
+    API_KEY_TENANTS: str = os.getenv("API_KEY_TENANTS", "")
+    TENANT_MAX_OPEN_COLLECTIONS: int = int(os.getenv("TENANT_MAX_OPEN_COLLECTIONS", "64"))
+    TENANT_MAX_PER_QUERY: int = int(os.getenv("TENANT_MAX_PER_QUERY", "8"))
+    
+    # Document Store Configuration
+    # Full CV text lives here (zstd-compressed, content-addressed) rather than in ChromaDB
+    DOC_STORE_DIR: str = os.getenv("DOC_STORE_DIR", "./doc_store")
+    DOC_STORE_CACHE_SIZE: int = int(os.getenv("DOC_STORE_CACHE_SIZE", "256"))
+    DOC_STORE_ZSTD_LEVEL: int = int(os.getenv("DOC_STORE_ZSTD_LEVEL", "3"))
+    DOC_STORE_S3_ENABLED: bool = os.getenv("DOC_STORE_S3_ENABLED", "true").lower() == "true"
+    DOC_STORE_S3_PREFIX: str = os.getenv("DOC_STORE_S3_PREFIX", "documents/")
+    
+    # Response Configuration
+    # FAST_JSON_RESPONSES serializes large listings with orjson, skipping response model validation;
+    # responses from COMPRESSION_MIN_BYTES up are compressed with brotli or gzip as the client accepts
+    FAST_JSON_RESPONSES: bool = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    
+    # Tracing Configuration
+    # TRACING_EXPORTER: "otlp" sends spans to a collector, "file" appends JSON lines
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "otlp")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4317")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "./traces.jsonl")
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "cv-assistant-api")
+    
+    # Health Check Configuration
+    # Readiness makes a cheap authenticated call to the AI provider; its result is reused for
+    # HEALTH_CHECK_CACHE_SECONDS so that frequent probes do not each reach the provider
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+    HEALTH_CHECK_CACHE_SECONDS: float = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "10"))
+    
+    # Near-Duplicate Detection Configuration
+    # DEDUP_MODE: "skip" drops duplicates, "merge" replaces the existing entry,
+    # "keep" stores them but collapses them in search results, "off" disables it
+    DEDUP_MODE: str = os.getenv("DEDUP_MODE", "skip")
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_NUM_BANDS: int = int(os.getenv("DEDUP_NUM_BANDS", "16"))
+    DEDUP_SHINGLE_SIZE: int = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+    DEDUP_QUERY_OVERFETCH: int = int(os.getenv("DEDUP_QUERY_OVERFETCH", "2"))
+    
+    # Question Planning Configuration
+    QUERY_MAX_SUBQUERIES: int = int(os.getenv("QUERY_MAX_SUBQUERIES", "4"))
+    QUERY_RESULTS_PER_SUBQUERY: int = int(os.getenv("QUERY_RESULTS_PER_SUBQUERY", "3"))
+    QUERY_PLANNER_USE_LLM: bool = os.getenv("QUERY_PLANNER_USE_LLM", "true").lower() == "true"
+    QUERY_PLANNER_LLM_MIN_WORDS: int = int(os.getenv("QUERY_PLANNER_LLM_MIN_WORDS", "12"))
+    
+    # Conversation Session Configuration
+    # SESSION_STORE: "memory" keeps sessions in the worker, "vector_db" stores them in ChromaDB so
+    # that any worker can answer a follow-up (the default when several workers share CHROMA_HOST)
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "vector_db" if os.getenv("CHROMA_HOST") else "memory")
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+    SESSION_TTL_SECONDS: int = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+    SESSION_HISTORY_TURNS: int = int(os.getenv("SESSION_HISTORY_TURNS", "3"))
+    SESSION_ANSWER_MAX_CHARS: int = int(os.getenv("SESSION_ANSWER_MAX_CHARS", "500"))
+    SESSION_SUMMARY_MAX_CHARS: int = int(os.getenv("SESSION_SUMMARY_MAX_CHARS", "1000"))
+    
+    # Candidate Matching Configuration
+    MATCH_WEIGHT_SEMANTIC: float = float(os.getenv("MATCH_WEIGHT_SEMANTIC", "0.6"))
+    MATCH_WEIGHT_SKILLS: float = float(os.getenv("MATCH_WEIGHT_SKILLS", "0.3"))
+    MATCH_WEIGHT_EXPERIENCE: float = float(os.getenv("MATCH_WEIGHT_EXPERIENCE", "0.1"))
+    MATCH_MAX_PAGE_SIZE: int = int(os.getenv("MATCH_MAX_PAGE_SIZE", "100"))
+    MATCH_MAX_SUMMARY_CANDIDATES: int = int(os.getenv("MATCH_MAX_SUMMARY_CANDIDATES", "10"))
     
     class Config:
         env_file = ".env"
 
 settings = Settings()
-
-# Create necessary directories
-os.makedirs(settings.VECTOR_DB_DIR, exist_ok=True)
\ No newline at end of file
@@ -1,5 +1,11 @@
 from fastapi import HTTPException
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+    HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 
 class CVProcessingException(Exception):
     """Exception raised when processing a CV fails"""
@@ -9,6 +15,18 @@ class S3UploadException(Exception):
     """Exception raised when uploading to S3 fails"""
     pass
 
+class S3DownloadException(Exception):
+    """Exception raised when downloading from S3 fails"""
+    pass
+
+class S3DeleteException(Exception):
+    """Exception raised when deleting from S3 fails"""
+    pass
+
+class DocumentStoreException(Exception):
+    """Exception raised when document store operations fail"""
+    pass
+
 class AIServiceException(Exception):
     """Exception raised when AI service calls fail"""
     pass
@@ -17,6 +35,12 @@ class VectorDBException(Exception):
     """Exception raised when vector database operations fail"""
     pass
 
+class ProviderBusyException(Exception):
+    """Exception raised when an AI provider has no free concurrency slot"""
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 class NotFoundException(HTTPException):
     """Exception raised when a resource is not found"""
     def __init__(self, detail: str = "Resource not found"):
@@ -27,7 +51,21 @@ class BadRequestException(HTTPException):
     def __init__(self, detail: str = "Bad request"):
         super().__init__(status_code=HTTP_400_BAD_REQUEST, detail=detail)
 
+class ForbiddenException(HTTPException):
+    """Exception raised when a client may not access a resource"""
+    def __init__(self, detail: str = "Forbidden"):
+        super().__init__(status_code=HTTP_403_FORBIDDEN, detail=detail)
+
 class InternalServerException(HTTPException):
     """Exception raised for internal server errors"""
     def __init__(self, detail: str = "Internal server error"):
-        super().__init__(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
\ No newline at end of file
+        super().__init__(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
+
+class ServiceUnavailableException(HTTPException):
+    """Exception raised when the server is over capacity"""
+    def __init__(self, detail: str = "Service unavailable", retry_after: int = 1):
+        super().__init__(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
\ No newline at end of file
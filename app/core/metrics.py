@@ -0,0 +1,174 @@
+import time
+import logging
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.tracing import start_span, set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Latency of individual ingestion and question answering stages",
+    ["stage"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+PROVIDER_TOKENS = Counter(
+    "provider_tokens_total",
+    "Tokens consumed by AI provider calls",
+    ["provider", "operation", "kind"],
+)
+
+PROVIDER_ERRORS = Counter(
+    "provider_errors_total",
+    "Failed AI provider calls, split into throttled and other errors",
+    ["provider", "operation", "kind"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+
+INGESTION_QUEUE_DEPTH = Gauge(
+    "ingestion_queue_depth",
+    "CV uploads accepted but not yet processed",
+    multiprocess_mode="livesum",
+)
+
+PROMPT_CACHE_TOKENS = Counter(
+    "prompt_cache_tokens_total",
+    "Prompt tokens by provider cache outcome; the cached ratio is cached / (cached + written + uncached)",
+    ["provider", "operation", "kind"],
+)
+
+ROUTE_LATENCY = Histogram(
+    "llm_route_duration_seconds",
+    "LLM call latency by model route",
+    ["route", "model"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+ROUTE_TOKENS = Counter(
+    "llm_route_tokens_total",
+    "Tokens consumed by model route",
+    ["route", "model", "kind"],
+)
+
+ROUTE_COST = Counter(
+    "llm_route_cost_usd_total",
+    "Expected LLM cost in USD by model route, from the configured token prices",
+    ["route", "model"],
+)
+
+# USD per 1K input and output tokens on each model route
+ROUTE_PRICES = {
+    "small": (settings.ROUTER_SMALL_INPUT_COST, settings.ROUTER_SMALL_OUTPUT_COST),
+    "large": (settings.ROUTER_LARGE_INPUT_COST, settings.ROUTER_LARGE_OUTPUT_COST),
+}
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests and provider calls turned away by admission control",
+    ["lane", "reason"],
+)
+
+PROVIDER_IN_FLIGHT = Gauge(
+    "provider_calls_in_flight",
+    "Provider calls holding a concurrency slot",
+    ["provider", "lane"],
+    multiprocess_mode="livesum",
+)
+
+S3_SYNC_OBJECTS = Counter(
+    "s3_sync_objects_total",
+    "S3 objects handled by the sync worker by action (added, updated, deleted, linked, skipped, failed)",
+    ["action"],
+)
+
+# Error codes providers use to signal rate limiting
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "SlowDown"}
+
+
+@contextmanager
+def track_stage(stage: str, **attributes):
+    """
+    Time a pipeline stage into the stage latency histogram and trace it as a span
+
+    Args:
+        stage: Stage name (e.g. "pdf_parse", "embedding", "llm_call")
+        attributes: Span attributes (e.g. prompt size, document count)
+    """
+    start = time.perf_counter()
+    with start_span(stage, attributes or None):
+        try:
+            yield
+        finally:
+            STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def record_tokens(provider: str, operation: str, input_tokens: int = 0, output_tokens: int = 0):
+    """Record the token usage reported by a provider call on the metrics and the current span"""
+    set_span_attributes(
+        **{"llm.provider": provider, "llm.input_tokens": input_tokens, "llm.output_tokens": output_tokens}
+    )
+    if input_tokens:
+        PROVIDER_TOKENS.labels(provider=provider, operation=operation, kind="input").inc(input_tokens)
+    if output_tokens:
+        PROVIDER_TOKENS.labels(provider=provider, operation=operation, kind="output").inc(output_tokens)
+
+
+def record_provider_error(provider: str, operation: str, throttled: bool = False):
+    """Record a failed provider call"""
+    kind = "throttle" if throttled else "error"
+    PROVIDER_ERRORS.labels(provider=provider, operation=operation, kind=kind).inc()
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Record a cache hit or miss; the hit ratio is hits / (hits + misses)"""
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_prompt_cache(provider: str, operation: str, cached_tokens: int = 0, written_tokens: int = 0, uncached_tokens: int = 0):
+    """Record how many prompt tokens were read from, written to or missed the provider prompt cache"""
+    set_span_attributes(**{"llm.cached_tokens": cached_tokens, "llm.cache_write_tokens": written_tokens})
+    for kind, tokens in (("cached", cached_tokens), ("written", written_tokens), ("uncached", uncached_tokens)):
+        if tokens:
+            PROMPT_CACHE_TOKENS.labels(provider=provider, operation=operation, kind=kind).inc(tokens)
+
+
+def record_route(
+    route: str,
+    model: str,
+    seconds: float,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cached_tokens: int = 0,
+):
+    """
+    Record the latency, tokens and expected cost of an LLM call made on a model route
+
+    input_tokens excludes the cached_tokens, which are priced at PROMPT_CACHE_READ_COST_FACTOR.
+    """
+    input_price, output_price = ROUTE_PRICES.get(route, (0.0, 0.0))
+    billed_input = input_tokens + cached_tokens * settings.PROMPT_CACHE_READ_COST_FACTOR
+    cost = (billed_input * input_price + output_tokens * output_price) / 1000
+    set_span_attributes(**{"llm.route": route, "llm.cost_usd": cost})
+    ROUTE_LATENCY.labels(route=route, model=model).observe(seconds)
+    if input_tokens:
+        ROUTE_TOKENS.labels(route=route, model=model, kind="input").inc(input_tokens)
+    if output_tokens:
+        ROUTE_TOKENS.labels(route=route, model=model, kind="output").inc(output_tokens)
+    if cached_tokens:
+        ROUTE_TOKENS.labels(route=route, model=model, kind="cached").inc(cached_tokens)
+    if cost:
+        ROUTE_COST.labels(route=route, model=model).inc(cost)
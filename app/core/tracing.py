@@ -0,0 +1,159 @@
+import logging
+import functools
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tracer used for all spans; None while tracing is disabled
+_tracer = None
+_provider = None
+# File the "file" exporter writes to, closed on shutdown
+_trace_file = None
+_NOOP_SPAN = nullcontext()
+
+
+def init_tracing():
+    """
+    Configure OpenTelemetry tracing if TRACING_ENABLED is set
+
+    Spans are exported in batches either to an OTLP collector (TRACING_EXPORTER=otlp)
+    or as JSON lines to TRACING_FILE_PATH (TRACING_EXPORTER=file). When tracing is
+    disabled nothing is imported and every helper in this module is a no-op.
+    """
+    global _tracer, _provider, _trace_file
+
+    if not settings.TRACING_ENABLED or _tracer is not None:
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        if settings.TRACING_EXPORTER == "otlp":
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+            exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT, insecure=True)
+        else:
+            _trace_file = open(settings.TRACING_FILE_PATH, "a")
+            exporter = ConsoleSpanExporter(
+                out=_trace_file,
+                formatter=lambda span: span.to_json(indent=None) + "\n",
+            )
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME})
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        _provider = provider
+        _tracer = provider.get_tracer(__name__)
+        logger.info(f"Tracing enabled with {settings.TRACING_EXPORTER} exporter")
+
+    except ImportError:
+        logger.error(
+            "OpenTelemetry SDK not installed. Please install it with 'pip install opentelemetry-sdk'."
+        )
+    except Exception as e:
+        logger.error(f"Error initializing tracing: {str(e)}")
+
+
+def shutdown_tracing():
+    """Export the spans still queued and release the exporter, closing the trace file"""
+    global _tracer, _provider, _trace_file
+
+    if _provider is None:
+        return
+
+    try:
+        _provider.shutdown()
+    except Exception as e:
+        logger.error(f"Error shutting down tracing: {str(e)}")
+    finally:
+        if _trace_file is not None:
+            _trace_file.close()
+        _tracer, _provider, _trace_file = None, None, None
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Start a span as the current span
+
+    Args:
+        name: Span name
+        attributes: Initial span attributes
+
+    Returns:
+        Context manager yielding the span, or None when tracing is disabled
+    """
+    if _tracer is None:
+        return _NOOP_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(name: str):
+    """
+    Decorator that runs the wrapped function inside a span
+
+    Args:
+        name: Span name
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_span_attributes(**attributes: Any):
+    """Set attributes on the current span, if tracing is enabled"""
+    if _tracer is None:
+        return
+
+    from opentelemetry import trace
+
+    trace.get_current_span().set_attributes(
+        {key: value for key, value in attributes.items() if value is not None}
+    )
+
+
+def current_context():
+    """
+    Capture the current trace context to continue it in background work
+
+    Returns:
+        The context object, or None when tracing is disabled
+    """
+    if _tracer is None:
+        return None
+
+    from opentelemetry import context
+
+    return context.get_current()
+
+
+@contextmanager
+def use_context(ctx):
+    """
+    Make a context captured with current_context the active one
+
+    Args:
+        ctx: Context returned by current_context (None is ignored)
+    """
+    if ctx is None:
+        yield
+        return
+
+    from opentelemetry import context
+
+    token = context.attach(ctx)
+    try:
+        yield
+    finally:
+        context.detach(token)
@@ -1,20 +1,115 @@
-import boto3
 import json
+import time
 import logging
+import threading
+from typing import Optional
 from botocore.exceptions import ClientError
 
 from app.core.config import settings
+from app.core.admission import provider_slot
 from app.core.exceptions import AIServiceException
+from app.core.metrics import (
+    THROTTLING_ERROR_CODES,
+    track_stage,
+    record_tokens,
+    record_provider_error,
+    record_route,
+    record_prompt_cache,
+)
+from app.infrastructure.prompts import EXTRACTION_INSTRUCTIONS
 
 logger = logging.getLogger(__name__)
 
-# Initialize Bedrock client
-bedrock_client = boto3.client(
-    'bedrock-runtime',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
-)
+# Bedrock runtime client, created on first use so that importing this module stays
+# cheap and deployments that use OpenAI never build it
+bedrock_client = None
+bedrock_control_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Get the shared Bedrock runtime client, creating it on first use"""
+    global bedrock_client
+    if bedrock_client is None:
+        with _client_lock:
+            if bedrock_client is None:
+                import boto3
+                
+                bedrock_client = boto3.client(
+                    'bedrock-runtime',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION
+                )
+    return bedrock_client
+
+def _record_client_error(operation: str, error: ClientError):
+    """Count a failed Bedrock call, separating throttling from other errors"""
+    code = error.response.get("Error", {}).get("Code", "")
+    record_provider_error("bedrock", operation, throttled=code in THROTTLING_ERROR_CODES)
+
+def _text_block(text: str, cache_prefix: Optional[str] = None) -> dict:
+    """
+    Build a message content block
+    
+    When prompt caching is on and cache_prefix (everything sent before and including
+    this block) is long enough to be cached, the block is marked as a cache breakpoint.
+    Shorter prefixes are never cached, so marking them would only spend a breakpoint.
+    """
+    block = {"type": "text", "text": text}
+    # Roughly four characters per token
+    if (
+        cache_prefix is not None
+        and settings.BEDROCK_PROMPT_CACHING
+        and len(cache_prefix) // 4 >= settings.PROMPT_CACHE_MIN_TOKENS
+    ):
+        block["cache_control"] = {"type": "ephemeral"}
+    return block
+
+def _record_usage(operation: str, usage: dict):
+    """Count the tokens reported by a Claude response, including prompt cache reads and writes"""
+    cached = usage.get("cache_read_input_tokens", 0)
+    written = usage.get("cache_creation_input_tokens", 0)
+    uncached = usage.get("input_tokens", 0)
+    record_tokens("bedrock", operation, uncached + cached + written, usage.get("output_tokens", 0))
+    record_prompt_cache("bedrock", operation, cached, written, uncached)
+
+def _get_control_client():
+    """Get the Bedrock control plane client used for readiness checks, creating it on first use"""
+    global bedrock_control_client
+    if bedrock_control_client is None:
+        with _client_lock:
+            if bedrock_control_client is None:
+                import boto3
+                from botocore.config import Config
+                
+                bedrock_control_client = boto3.client(
+                    'bedrock',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION,
+                    config=Config(
+                        connect_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+                        read_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+                        retries={"max_attempts": 1},
+                    ),
+                )
+    return bedrock_control_client
+
+def check_health() -> dict:
+    """
+    Check that Bedrock accepts the configured credentials
+    
+    Lists the foundation models, a free call that fails on missing or rejected
+    credentials and on an unreachable endpoint, within HEALTH_CHECK_TIMEOUT_SECONDS.
+    
+    Returns:
+        Dictionary with an "ok" flag and an optional "error" message
+    """
+    try:
+        _get_control_client().list_foundation_models(byOutputModality="TEXT")
+        return {"ok": True}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
 
 def generate_embeddings(text: str) -> list:
     """
@@ -30,19 +125,23 @@ def generate_embeddings(text: str) -> list:
         AIServiceException: If the embedding generation fails
     """
     try:
-        response = bedrock_client.invoke_model(
-            modelId=settings.BEDROCK_EMBEDDING_MODEL,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps({
-                "inputText": text
-            })
-        )
+        with track_stage("embedding", **{"llm.model": settings.BEDROCK_EMBEDDING_MODEL, "llm.prompt_chars": len(text)}):
+            with provider_slot("bedrock"):
+                response = get_client().invoke_model(
+                    modelId=settings.BEDROCK_EMBEDDING_MODEL,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps({
+                        "inputText": text
+                    })
+                )
+            response_body = json.loads(response['body'].read())
+            record_tokens("bedrock", "embedding", input_tokens=response_body.get("inputTextTokenCount", 0))
         
-        response_body = json.loads(response['body'].read())
         return response_body['embedding']
     
     except ClientError as e:
+        _record_client_error("embedding", e)
         error_message = f"Error generating embeddings: {str(e)}"
         logger.error(error_message)
         raise AIServiceException(error_message)
@@ -60,41 +159,34 @@ def extract_metadata(text: str) -> dict:
     Raises:
         AIServiceException: If the metadata extraction fails
     """
-    # Create prompt for metadata extraction
+    # The instructions are the same for every CV, so they go first as the system prompt. They
+    # are too short to reach the provider's minimum cacheable prefix, so they are not marked
     prompt = f"""
-    Extract the following structured information from this CV:
-    - Name
-    - Location (city and country)
-    - Skills (technical and soft skills)
-    - Languages (spoken languages and proficiency)
-    - Experience (years of total professional experience)
-    - Job titles (all job titles mentioned)
-    - Education (degrees and institutions)
-
-    Return the information as a JSON object with these fields.
-    
     CV Text:
     {text[:4000]}  # Limit text length to avoid token limits
     """
     
     try:
-        response = bedrock_client.invoke_model(
-            modelId=settings.BEDROCK_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
+        with track_stage("metadata_extraction", **{"llm.model": settings.BEDROCK_MODEL_ID, "llm.prompt_chars": len(prompt)}):
+            with provider_slot("bedrock"):
+                response = get_client().invoke_model(
+                    modelId=settings.BEDROCK_MODEL_ID,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps({
+                        "anthropic_version": "bedrock-2023-05-31",
+                        "max_tokens": 1000,
+                        "system": [_text_block(EXTRACTION_INSTRUCTIONS)],
+                        "messages": [
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ]
+                    })
+                )
+            response_body = json.loads(response['body'].read())
+            _record_usage("metadata_extraction", response_body.get("usage", {}))
         
         # Extract JSON from the response
         ai_message = response_body['content'][0]['text']
@@ -107,6 +199,10 @@ def extract_metadata(text: str) -> dict:
             return json.loads(metadata_json)
     
     except (ClientError, json.JSONDecodeError) as e:
+        if isinstance(e, ClientError):
+            _record_client_error("metadata_extraction", e)
+        else:
+            record_provider_error("bedrock", "metadata_extraction")
         error_message = f"Error extracting metadata: {str(e)}"
         logger.error(error_message)
         
@@ -121,15 +217,33 @@ def extract_metadata(text: str) -> dict:
         "languages": [],
         "experience_years": 0,
         "job_titles": [],
-        "education": []
+        "education": [],
+        "summary": "",
+        "timeline": []
     }
 
-def query_llm(prompt: str) -> str:
+def query_llm(
+    prompt: str,
+    model_id: Optional[str] = None,
+    max_tokens: int = 1000,
+    route: str = "large",
+    system: Optional[str] = None,
+    context: Optional[str] = None,
+) -> str:
     """
     Query the LLM with the given prompt
     
+    The system prompt and the context are sent before the prompt, with a cache
+    breakpoint after the context when they are long enough to be cached, so calls
+    that share them only pay for the prompt.
+    
     Args:
         prompt: The prompt to send to the LLM
+        model_id: Bedrock model to use, BEDROCK_MODEL_ID by default
+        max_tokens: Maximum number of tokens to generate
+        route: Model route the call was assigned to, for the route metrics
+        system: Stable instructions sent as the system prompt
+        context: Context shared by related calls (e.g. the candidate profiles)
         
     Returns:
         The LLM's response
@@ -137,27 +251,51 @@ def query_llm(prompt: str) -> str:
     Raises:
         AIServiceException: If the LLM query fails
     """
+    model_id = model_id or settings.BEDROCK_MODEL_ID
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                # A single breakpoint after the context covers the system prompt as well
+                "content": [
+                    _text_block(context, cache_prefix=(system or "") + context),
+                    _text_block(prompt),
+                ] if context else prompt
+            }
+        ]
+    }
+    if system:
+        body["system"] = [_text_block(system)]
+    
     try:
-        response = bedrock_client.invoke_model(
-            modelId=settings.BEDROCK_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            })
-        )
+        start = time.perf_counter()
+        prompt_chars = len(prompt) + len(system or "") + len(context or "")
+        with track_stage("llm_call", **{"llm.model": model_id, "llm.prompt_chars": prompt_chars}):
+            with provider_slot("bedrock"):
+                response = get_client().invoke_model(
+                    modelId=model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps(body)
+                )
+            response_body = json.loads(response['body'].read())
+            usage = response_body.get("usage", {})
+            _record_usage("llm_call", usage)
+            record_route(
+                route,
+                model_id,
+                time.perf_counter() - start,
+                usage.get("input_tokens", 0) + usage.get("cache_creation_input_tokens", 0),
+                usage.get("output_tokens", 0),
+                usage.get("cache_read_input_tokens", 0),
+            )
         
-        response_body = json.loads(response['body'].read())
         return response_body['content'][0]['text']
     
     except ClientError as e:
+        _record_client_error("llm_call", e)
         error_message = f"Error querying LLM: {str(e)}"
         logger.error(error_message)
         raise AIServiceException(error_message)
\ No newline at end of file
@@ -1,7 +1,12 @@
 from chromadb.utils.embedding_functions import EmbeddingFunction
 import logging
+import threading
 from typing import List, Union
 
+from app.core.admission import provider_slot
+from app.core.exceptions import ProviderBusyException
+from app.core.metrics import track_stage, record_tokens, record_provider_error
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,18 +33,28 @@ class CustomOpenAIEmbeddingFunction(EmbeddingFunction):
         self.model_name = model_name
         self.dimensions = dimensions
 
-        try:
-            from openai import OpenAI
-
-            self.client = OpenAI(api_key=api_key)
-            logger.info(f"Initialized OpenAI client with model {model_name}")
-        except ImportError:
-            raise ImportError(
-                "The OpenAI package is required to use the OpenAI embedding function"
-            )
-        except Exception as e:
-            logger.error(f"Error initializing OpenAI client: {str(e)}")
-            raise
+        # The client is created on first use, keeping startup free of the OpenAI SDK import
+        self.client = None
+        self._client_lock = threading.Lock()
+
+    def _get_client(self):
+        """Get the OpenAI client, creating it on first use"""
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    try:
+                        from openai import OpenAI
+
+                        self.client = OpenAI(api_key=self.api_key)
+                        logger.info(f"Initialized OpenAI client with model {self.model_name}")
+                    except ImportError:
+                        raise ImportError(
+                            "The OpenAI package is required to use the OpenAI embedding function"
+                        )
+                    except Exception as e:
+                        logger.error(f"Error initializing OpenAI client: {str(e)}")
+                        raise
+        return self.client
 
     def __call__(self, input: List[str]) -> List[List[float]]:
         """
@@ -58,15 +73,28 @@ class CustomOpenAIEmbeddingFunction(EmbeddingFunction):
         try:
 
             try:
-                response = self.client.embeddings.create(
-                    model=self.model_name, input=input
-                )
+                with track_stage("embedding", **{"llm.model": self.model_name, "embedding.inputs": len(input)}):
+                    with provider_slot("openai"):
+                        response = self._get_client().embeddings.create(
+                            model=self.model_name, input=input
+                        )
+                    if getattr(response, "usage", None) is not None:
+                        record_tokens("openai", "embedding", response.usage.prompt_tokens or 0)
+            except ProviderBusyException:
+                raise
             except Exception as dim_error:
+                record_provider_error(
+                    "openai",
+                    "embedding",
+                    throttled=type(dim_error).__name__ == "RateLimitError",
+                )
                 logger.warning(f"No dimetions supported: {str(dim_error)}")
 
             embeddings = [data.embedding for data in response.data]
             return embeddings
 
+        except ProviderBusyException:
+            raise
         except Exception as e:
             logger.error(f"Error generating embeddings with OpenAI: {str(e)}")
             return [[0.0] * self.dimensions for _ in input]
@@ -0,0 +1,207 @@
+import os
+import hashlib
+import logging
+import threading
+import zstandard
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.core.exceptions import DocumentStoreException
+from app.core.metrics import record_cache_lookup, track_stage
+from app.infrastructure.s3 import upload_bytes_to_s3, download_bytes_from_s3, delete_object_from_s3
+
+logger = logging.getLogger(__name__)
+
+# Hot tier: most recently read documents, keyed by content hash
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+# Serializes blob writes with reference-checked deletes, so a text stored for a new
+# document is never deleted by a release that checked references just before
+_blob_lock = threading.RLock()
+
+
+def content_hash(text: str) -> str:
+    """Get the content address (SHA-256 hex digest) of a document text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _local_path(digest: str) -> str:
+    # Two-level fan-out keeps directories small
+    return os.path.join(settings.DOC_STORE_DIR, digest[:2], f"{digest}.zst")
+
+
+def _object_name(digest: str) -> str:
+    return f"{settings.DOC_STORE_S3_PREFIX}{digest}.zst"
+
+
+def _cache_get(digest: str) -> Optional[str]:
+    with _cache_lock:
+        text = _cache.get(digest)
+        if text is not None:
+            _cache.move_to_end(digest)
+    record_cache_lookup("documents", text is not None)
+    return text
+
+
+def _cache_put(digest: str, text: str):
+    with _cache_lock:
+        _cache[digest] = text
+        _cache.move_to_end(digest)
+        while len(_cache) > settings.DOC_STORE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _write_local(path: str, data: bytes):
+    # Write to a temporary file first so readers never see a partial blob
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def put_document(text: str) -> str:
+    """
+    Store a document text, compressed, in the local blob store and the S3 cold tier
+
+    Identical texts share one blob, so storing the same text twice is free. Storing
+    it again after referencing the hash rewrites a blob that a concurrent
+    release_document deleted in between.
+
+    Args:
+        text: The document text
+
+    Returns:
+        The content hash to reference the document by
+
+    Raises:
+        DocumentStoreException: If the local write fails
+    """
+    digest = content_hash(text)
+    path = _local_path(digest)
+
+    try:
+        with _blob_lock:
+            written = not os.path.exists(path)
+            if written:
+                with track_stage("document_store_put"):
+                    data = zstandard.ZstdCompressor(level=settings.DOC_STORE_ZSTD_LEVEL).compress(text.encode("utf-8"))
+                    _write_local(path, data)
+
+        # The cold tier is best-effort: the local copy is enough to serve reads
+        if written and settings.DOC_STORE_S3_ENABLED:
+            try:
+                upload_bytes_to_s3(data, _object_name(digest))
+            except Exception as e:
+                logger.warning(f"S3 cold tier upload failed for {digest}, keeping local copy: {str(e)}")
+
+        _cache_put(digest, text)
+        return digest
+
+    except OSError as e:
+        error_message = f"Error storing document {digest}: {str(e)}"
+        logger.error(error_message)
+        raise DocumentStoreException(error_message)
+
+
+def get_document(digest: str) -> str:
+    """
+    Load a document text by content hash from the fastest tier that has it
+
+    Reads go to the in-memory LRU, then the local blob store, then S3; blobs
+    fetched from S3 are written back locally.
+
+    Args:
+        digest: The content hash returned by put_document
+
+    Returns:
+        The document text
+
+    Raises:
+        DocumentStoreException: If the document is in none of the tiers
+    """
+    text = _cache_get(digest)
+    if text is not None:
+        return text
+
+    path = _local_path(digest)
+    try:
+        with track_stage("document_store_get"):
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    data = file.read()
+            elif settings.DOC_STORE_S3_ENABLED:
+                logger.info(f"Fetching document {digest} from S3 cold tier")
+                data = download_bytes_from_s3(_object_name(digest))
+                _write_local(path, data)
+            else:
+                raise DocumentStoreException(f"Document {digest} not found")
+
+            text = zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
+    except DocumentStoreException:
+        raise
+    except Exception as e:
+        error_message = f"Error loading document {digest}: {str(e)}"
+        logger.error(error_message)
+        raise DocumentStoreException(error_message)
+
+    _cache_put(digest, text)
+    return text
+
+
+def delete_document(digest: str):
+    """
+    Delete a document text from every tier
+
+    Blobs are shared by identical texts, so callers must only delete one that no
+    document references any more.
+
+    Args:
+        digest: The content hash returned by put_document
+
+    Raises:
+        DocumentStoreException: If the local or S3 copy cannot be deleted
+    """
+    with _cache_lock:
+        _cache.pop(digest, None)
+
+    try:
+        with _blob_lock:
+            path = _local_path(digest)
+            if os.path.exists(path):
+                os.remove(path)
+            if settings.DOC_STORE_S3_ENABLED:
+                delete_object_from_s3(_object_name(digest))
+        logger.info(f"Deleted document {digest}")
+
+    except Exception as e:
+        error_message = f"Error deleting document {digest}: {str(e)}"
+        logger.error(error_message)
+        raise DocumentStoreException(error_message)
+
+
+def release_document(digest: str, is_referenced: Callable[[], bool]) -> bool:
+    """
+    Delete a document text unless something still references it
+
+    The reference check and the delete run under the lock put_document writes
+    under, so a put_document that runs concurrently either happens first or
+    rewrites the blob afterwards.
+
+    Args:
+        digest: The content hash returned by put_document
+        is_referenced: Tells whether any document still references the hash
+
+    Returns:
+        True if the text was deleted
+
+    Raises:
+        DocumentStoreException: If the local or S3 copy cannot be deleted
+    """
+    with _blob_lock:
+        if is_referenced():
+            return False
+        delete_document(digest)
+        return True
@@ -1,25 +1,99 @@
 import json
+import time
 import logging
-from typing import List
+import threading
+from typing import List, Optional
 
 from app.core.config import settings
-from app.core.exceptions import AIServiceException
+from app.core.admission import provider_slot
+from app.core.exceptions import AIServiceException, ProviderBusyException
+from app.core.metrics import (
+    track_stage,
+    record_tokens,
+    record_provider_error,
+    record_route,
+    record_prompt_cache,
+)
+from app.infrastructure.prompts import EXTRACTION_INSTRUCTIONS
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-try:
-    from openai import OpenAI
+# OpenAI client, created on first use so that importing this module stays cheap
+# and deployments that use Bedrock never load the OpenAI SDK
+client = None
+_client_lock = threading.Lock()
 
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-except ImportError:
-    logger.error(
-        "OpenAI package not installed. Please install it with 'pip install openai'."
-    )
-    client = None
-except Exception as e:
-    logger.error(f"Error initializing OpenAI client: {str(e)}")
-    client = None
+
+def get_client():
+    """
+    Get the shared OpenAI client, creating it on first use
+
+    Raises:
+        AIServiceException: If the OpenAI package is missing or the client cannot be created
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                try:
+                    from openai import OpenAI
+
+                    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+                except ImportError:
+                    error_message = "OpenAI package not installed. Please install it with 'pip install openai'."
+                    logger.error(error_message)
+                    raise AIServiceException(error_message)
+                except Exception as e:
+                    error_message = f"Error initializing OpenAI client: {str(e)}"
+                    logger.error(error_message)
+                    raise AIServiceException(error_message)
+    return client
+
+
+def _record_error(operation: str, error: Exception):
+    """Count a failed OpenAI call, separating rate limiting from other errors"""
+    throttled = type(error).__name__ == "RateLimitError"
+    record_provider_error("openai", operation, throttled=throttled)
+
+
+def _cached_tokens(usage) -> int:
+    """Prompt tokens served from OpenAI's automatic prefix cache"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", 0) or 0
+
+
+def _record_usage(operation: str, response):
+    """Count the tokens reported in an OpenAI response, including prefix cache hits"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        cached_tokens = _cached_tokens(usage)
+        record_tokens(
+            "openai",
+            operation,
+            prompt_tokens,
+            getattr(usage, "completion_tokens", 0) or 0,
+        )
+        record_prompt_cache("openai", operation, cached_tokens, uncached_tokens=prompt_tokens - cached_tokens)
+
+
+def check_health() -> dict:
+    """
+    Check that OpenAI accepts the configured API key
+
+    Retrieves the configured model, a free call that fails on a missing or
+    revoked key and on an unreachable API, within HEALTH_CHECK_TIMEOUT_SECONDS.
+
+    Returns:
+        Dictionary with an "ok" flag and an optional "error" message
+    """
+    try:
+        get_client().with_options(
+            timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS, max_retries=0
+        ).models.retrieve(settings.OPENAI_MODEL)
+        return {"ok": True}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
 
 
 def generate_embeddings(text: str) -> List[float]:
@@ -37,17 +111,25 @@ def generate_embeddings(text: str) -> List[float]:
     """
     try:
         try:
-            response = client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text,
-            )
+            with track_stage("embedding", **{"llm.model": "text-embedding-ada-002", "llm.prompt_chars": len(text)}):
+                with provider_slot("openai"):
+                    response = get_client().embeddings.create(
+                        model="text-embedding-ada-002",
+                        input=text,
+                    )
+                _record_usage("embedding", response)
+        except ProviderBusyException:
+            raise
         except Exception as dim_error:
+            _record_error("embedding", dim_error)
             logger.warning(
                 f"Model does not support dimensions, using standard method: {str(dim_error)}"
             )
 
         return response.data[0].embedding
 
+    except ProviderBusyException:
+        raise
     except Exception as e:
         error_message = f"Error generating embeddings with OpenAI: {str(e)}"
         logger.error(error_message)
@@ -67,39 +149,35 @@ def extract_metadata(text: str) -> dict:
     Raises:
         AIServiceException: If the metadata extraction fails
     """
-    # Create prompt for metadata extraction
+    # The instructions are the same for every CV, so they go first where prefix caching can reuse them
     prompt = f"""
-    Extract the following structured information from this CV:
-    - Name
-    - Location (city and country)
-    - Skills (technical and soft skills)
-    - Languages (spoken languages and proficiency)
-    - Experience (years of total professional experience)
-    - Job titles (all job titles mentioned)
-    - Education (degrees and institutions)
-
-    Return the information as a JSON object with these fields.
-    
     CV Text:
     {text[:4000]}  # Limit text length to avoid token limits
     """
 
     try:
-        response = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that extracts structured information from CVs.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            response_format={"type": "json_object"},
-        )
+        with track_stage("metadata_extraction", **{"llm.model": settings.OPENAI_MODEL, "llm.prompt_chars": len(prompt)}):
+            with provider_slot("openai"):
+                response = get_client().chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a helpful assistant that extracts structured information from CVs.\n"
+                            + EXTRACTION_INSTRUCTIONS,
+                        },
+                        {"role": "user", "content": prompt},
+                    ],
+                    response_format={"type": "json_object"},
+                )
+            _record_usage("metadata_extraction", response)
 
         return json.loads(response.choices[0].message.content)
 
+    except ProviderBusyException:
+        raise
     except Exception as e:
+        _record_error("metadata_extraction", e)
         error_message = f"Error extracting metadata with OpenAI: {str(e)}"
         logger.error(error_message)
 
@@ -115,15 +193,32 @@ def extract_metadata(text: str) -> dict:
         "experience_years": 0,
         "job_titles": [],
         "education": [],
+        "summary": "",
+        "timeline": [],
     }
 
 
-def query_llm(prompt: str) -> str:
+def query_llm(
+    prompt: str,
+    model: Optional[str] = None,
+    max_tokens: int = 1000,
+    route: str = "large",
+    system: Optional[str] = None,
+    context: Optional[str] = None,
+) -> str:
     """
     Query the LLM with the given prompt using OpenAI
 
+    The system prompt and the context are sent before the prompt, so calls that
+    share them hit OpenAI's automatic prefix cache.
+
     Args:
         prompt: The prompt to send to the LLM
+        model: OpenAI model to use, OPENAI_MODEL by default
+        max_tokens: Maximum number of tokens to generate
+        route: Model route the call was assigned to, for the route metrics
+        system: Stable instructions sent as the system message
+        context: Context shared by related calls (e.g. the candidate profiles)
 
     Returns:
         The LLM's response
@@ -131,18 +226,39 @@ def query_llm(prompt: str) -> str:
     Raises:
         AIServiceException: If the LLM query fails
     """
+    model = model or settings.OPENAI_MODEL
+    content = f"{context}\n\n{prompt}" if context else prompt
     try:
-        response = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for HR."},
-                {"role": "user", "content": prompt},
-            ],
-        )
+        start = time.perf_counter()
+        prompt_chars = len(content) + len(system or "")
+        with track_stage("llm_call", **{"llm.model": model, "llm.prompt_chars": prompt_chars}):
+            with provider_slot("openai"):
+                response = get_client().chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system or "You are a helpful assistant for HR."},
+                        {"role": "user", "content": content},
+                    ],
+                    max_tokens=max_tokens,
+                )
+            _record_usage("llm_call", response)
+            usage = getattr(response, "usage", None)
+            cached_tokens = _cached_tokens(usage)
+            record_route(
+                route,
+                model,
+                time.perf_counter() - start,
+                (getattr(usage, "prompt_tokens", 0) or 0) - cached_tokens,
+                getattr(usage, "completion_tokens", 0) or 0,
+                cached_tokens,
+            )
 
         return response.choices[0].message.content
 
+    except ProviderBusyException:
+        raise
     except Exception as e:
+        _record_error("llm_call", e)
         error_message = f"Error querying OpenAI LLM: {str(e)}"
         logger.error(error_message)
         raise AIServiceException(error_message)
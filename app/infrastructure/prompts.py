@@ -0,0 +1,16 @@
+# Metadata extraction prompt shared by every provider, so they all extract the same fields
+EXTRACTION_INSTRUCTIONS = """
+Extract the following structured information from this CV:
+- Name
+- Location (city and country)
+- Skills (technical and soft skills)
+- Languages (spoken languages and proficiency)
+- Experience (years of total professional experience)
+- Job titles (all job titles mentioned)
+- Education (degrees and institutions)
+- Summary (at most two sentences describing the candidate's profile)
+- Timeline (every role as an object with title, company, start and end dates)
+
+Return the information as a JSON object with these fields: name, location,
+skills, languages, experience_years, job_titles, education, summary, timeline.
+"""
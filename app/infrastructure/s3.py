@@ -1,28 +1,58 @@
-import boto3
 import os
 import logging
+import threading
+from typing import Dict, Iterator, Optional
 from botocore.exceptions import ClientError
 
 from app.core.config import settings
-from app.core.exceptions import S3UploadException
+from app.core.exceptions import S3UploadException, S3DownloadException, S3DeleteException
 
 logger = logging.getLogger(__name__)
 
-# Initialize S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
-)
+# S3 client, created on first use so that importing this module stays cheap
+s3_client = None
+_client_lock = threading.Lock()
 
-def upload_file_to_s3(file_path: str, object_name: str = None) -> str:
+def get_client():
+    """Get the shared S3 client, creating it on first use"""
+    global s3_client
+    if s3_client is None:
+        with _client_lock:
+            if s3_client is None:
+                import boto3
+                from botocore.config import Config
+                
+                # S3-compatible stores (MinIO, a moto server) are addressed by path, not by bucket subdomain
+                s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION,
+                    endpoint_url=settings.S3_ENDPOINT_URL or None,
+                    config=Config(s3={"addressing_style": "path"}) if settings.S3_ENDPOINT_URL else None
+                )
+    return s3_client
+
+def _ensure_bucket(bucket_name: str):
+    """Create the bucket if it does not exist yet"""
+    try:
+        get_client().head_bucket(Bucket=bucket_name)
+    except ClientError:
+        logger.info(f"Creating S3 bucket: {bucket_name}")
+        # Create the bucket in the specified region
+        get_client().create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={'LocationConstraint': settings.AWS_REGION}
+        )
+
+def upload_file_to_s3(file_path: str, object_name: str = None, metadata: Optional[Dict[str, str]] = None) -> str:
     """
     Upload a file to an S3 bucket
     
     Args:
         file_path: Path to the file to upload
         object_name: S3 object name (if None, file_path's basename will be used)
+        metadata: User metadata to store with the object
         
     Returns:
         S3 URI of the uploaded file
@@ -37,20 +67,12 @@ def upload_file_to_s3(file_path: str, object_name: str = None) -> str:
     bucket_name = settings.S3_BUCKET_NAME
     
     try:
-        # Check if bucket exists, create if not
-        try:
-            s3_client.head_bucket(Bucket=bucket_name)
-        except ClientError:
-            logger.info(f"Creating S3 bucket: {bucket_name}")
-            # Create the bucket in the specified region
-            s3_client.create_bucket(
-                Bucket=bucket_name,
-                CreateBucketConfiguration={'LocationConstraint': settings.AWS_REGION}
-            )
+        _ensure_bucket(bucket_name)
         
         # Upload file
         logger.info(f"Uploading file {file_path} to S3 bucket {bucket_name} as {object_name}")
-        s3_client.upload_file(file_path, bucket_name, object_name)
+        extra_args = {"Metadata": metadata} if metadata else None
+        get_client().upload_file(file_path, bucket_name, object_name, ExtraArgs=extra_args)
         
         s3_uri = f"s3://{bucket_name}/{object_name}"
         logger.info(f"File uploaded successfully to {s3_uri}")
@@ -60,4 +82,120 @@ def upload_file_to_s3(file_path: str, object_name: str = None) -> str:
     except ClientError as e:
         error_message = f"Error uploading file to S3: {str(e)}"
         logger.error(error_message)
-        raise S3UploadException(error_message)
\ No newline at end of file
+        raise S3UploadException(error_message)
+
+def upload_bytes_to_s3(data: bytes, object_name: str) -> str:
+    """
+    Upload in-memory bytes to the S3 bucket
+    
+    Args:
+        data: The bytes to upload
+        object_name: S3 object name
+        
+    Returns:
+        S3 URI of the uploaded object
+    
+    Raises:
+        S3UploadException: If upload fails
+    """
+    bucket_name = settings.S3_BUCKET_NAME
+    
+    try:
+        _ensure_bucket(bucket_name)
+        get_client().put_object(Bucket=bucket_name, Key=object_name, Body=data)
+        
+        s3_uri = f"s3://{bucket_name}/{object_name}"
+        logger.debug(f"Uploaded {len(data)} bytes to {s3_uri}")
+        
+        return s3_uri
+    
+    except ClientError as e:
+        error_message = f"Error uploading object to S3: {str(e)}"
+        logger.error(error_message)
+        raise S3UploadException(error_message)
+
+def download_bytes_from_s3(object_name: str) -> bytes:
+    """
+    Download an object from the S3 bucket into memory
+    
+    Args:
+        object_name: S3 object name
+        
+    Returns:
+        The object's bytes
+    
+    Raises:
+        S3DownloadException: If download fails
+    """
+    try:
+        response = get_client().get_object(Bucket=settings.S3_BUCKET_NAME, Key=object_name)
+        return response["Body"].read()
+    
+    except ClientError as e:
+        error_message = f"Error downloading object from S3: {str(e)}"
+        logger.error(error_message)
+        raise S3DownloadException(error_message)
+
+def delete_object_from_s3(object_name: str):
+    """
+    Delete an object from the S3 bucket; deleting a missing object is not an error
+    
+    Args:
+        object_name: S3 object name
+    
+    Raises:
+        S3DeleteException: If the request fails
+    """
+    try:
+        get_client().delete_object(Bucket=settings.S3_BUCKET_NAME, Key=object_name)
+        logger.debug(f"Deleted s3://{settings.S3_BUCKET_NAME}/{object_name}")
+    
+    except ClientError as e:
+        error_message = f"Error deleting object from S3: {str(e)}"
+        logger.error(error_message)
+        raise S3DeleteException(error_message)
+
+def list_objects(prefix: str = "") -> Iterator[Dict]:
+    """
+    List the objects of the S3 bucket under a prefix, page by page
+    
+    Args:
+        prefix: Key prefix to list
+        
+    Yields:
+        Object summaries with "Key", "ETag", "LastModified" and "Size"
+    
+    Raises:
+        S3DownloadException: If listing fails
+    """
+    try:
+        paginator = get_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=prefix):
+            yield from page.get("Contents", [])
+    
+    except ClientError as e:
+        error_message = f"Error listing objects in S3: {str(e)}"
+        logger.error(error_message)
+        raise S3DownloadException(error_message)
+
+def get_object_metadata(object_name: str) -> Dict[str, str]:
+    """
+    Get the user metadata stored with an object of the S3 bucket
+    
+    Args:
+        object_name: S3 object name
+        
+    Returns:
+        The object's user metadata
+    
+    Raises:
+        S3DownloadException: If the request fails
+    """
+    try:
+        response = get_client().head_object(Bucket=settings.S3_BUCKET_NAME, Key=object_name)
+        return response.get("Metadata", {})
+    
+    except ClientError as e:
+        error_message = f"Error reading object metadata from S3: {str(e)}"
+        logger.error(error_message)
+        raise S3DownloadException(error_message)
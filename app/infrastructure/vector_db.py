@@ -1,124 +1,570 @@
+import os
+import re
 import chromadb
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from chromadb.utils import embedding_functions
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 from app.core.config import settings
-from app.core.exceptions import VectorDBException
-from app.api.models.cv import CVDocument, CVMetadata
+from app.core.exceptions import VectorDBException, ProviderBusyException
+from app.core.metrics import track_stage, record_cache_lookup
+from app.core.tracing import set_span_attributes, current_context, use_context
+from app.api.models.cv import CVDocument
 from app.infrastructure.bedrock import generate_embeddings as bedrock_embeddings
 from app.infrastructure.custom_embedding import CustomOpenAIEmbeddingFunction
+from app.services.profile_builder import flatten_education
+from app.infrastructure.document_store import put_document, get_document, release_document
 
 logger = logging.getLogger(__name__)
 
 # Global variables for ChromaDB client and collection
 chroma_client = None
 collection = None
+embedding_function = None
+_init_lock = threading.Lock()
+
+# Open tenant collections, least recently used first; cold tenants are dropped from it
+_tenant_collections: "OrderedDict[str, Any]" = OrderedDict()
+_tenant_lock = threading.Lock()
+
+# Tenant IDs become part of a collection name, so they are limited to what ChromaDB accepts
+_TENANT_ID = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]*[A-Za-z0-9])?$")
+_MAX_COLLECTION_NAME = 63
+
+# Conversation sessions shared by the workers; the name cannot clash with a tenant collection
+_session_collection = None
+
+# Searches spanning several tenants query their collections concurrently
+_tenant_pool = ThreadPoolExecutor(max_workers=settings.TENANT_MAX_PER_QUERY, thread_name_prefix="tenant-query")
+
+
+def split_metadata_list(value: Optional[str]) -> List[str]:
+    """
+    Split a comma-joined metadata field back into a list
+
+    Args:
+        value: The stored metadata value
+
+    Returns:
+        List of non-empty items
+    """
+    if not value:
+        return []
+    return [item for item in value.split(", ") if item]
+
+
+def _create_client():
+    """Create a ChromaDB client: a remote server when CHROMA_HOST is set, otherwise local files"""
+    if settings.CHROMA_HOST:
+        logger.info(f"Connecting to ChromaDB server at {settings.CHROMA_HOST}:{settings.CHROMA_PORT}")
+        return chromadb.HttpClient(host=settings.CHROMA_HOST, port=settings.CHROMA_PORT)
+
+    logger.info(f"Initializing ChromaDB with directory: {settings.VECTOR_DB_DIR}")
+    os.makedirs(settings.VECTOR_DB_DIR, exist_ok=True)
+    return chromadb.PersistentClient(path=settings.VECTOR_DB_DIR)
 
 
 def init_vector_db():
-    """Initialize the ChromaDB client and collection"""
-    global chroma_client, collection
+    """
+    Initialize the ChromaDB client and collection
 
-    try:
-        logger.info(f"Initializing ChromaDB with directory: {settings.VECTOR_DB_DIR}")
+    Safe to call from several threads at once and more than once: only the first
+    call does the work, and the collection is published only once it is ready.
+    """
+    global chroma_client, collection, embedding_function
 
-        # Initialize ChromaDB client
-        chroma_client = chromadb.PersistentClient(path=settings.VECTOR_DB_DIR)
+    if collection is not None:
+        return
+
+    with _init_lock:
+        if collection is not None:
+            return
 
-        # Configure the embedding function
-        if settings.USE_OPENAI:
-            logger.info("Using OpenAI embedding function with custom implementation")
-            embedding_function = CustomOpenAIEmbeddingFunction(
-                api_key=settings.OPENAI_API_KEY, model_name="text-embedding-ada-002"
-            )
-        else:
-            logger.info("Using Bedrock embedding function")
-
-            # Custom embedding function for Amazon Bedrock
-            class BedrockEmbeddingFunction(embedding_functions.EmbeddingFunction):
-                def __init__(self):
-                    pass
-                
-                def __call__(self, input):
-                    embeddings = []
-                    for text in input:
-                        embedding = bedrock_embeddings(text)
-                        embeddings.append(embedding)
-                    return embeddings
-
-            embedding_function = BedrockEmbeddingFunction()
-
-        # Get or create collection
         try:
+            client = _create_client()
+
+            # Configure the embedding function
+            if settings.USE_OPENAI:
+                logger.info("Using OpenAI embedding function with custom implementation")
+                function = CustomOpenAIEmbeddingFunction(
+                    api_key=settings.OPENAI_API_KEY, model_name="text-embedding-ada-002"
+                )
+            else:
+                logger.info("Using Bedrock embedding function")
+
+                # Custom embedding function for Amazon Bedrock
+                class BedrockEmbeddingFunction(embedding_functions.EmbeddingFunction):
+                    def __init__(self):
+                        pass
+                    
+                    def __call__(self, input):
+                        embeddings = []
+                        for text in input:
+                            embedding = bedrock_embeddings(text)
+                            embeddings.append(embedding)
+                        return embeddings
+
+                function = BedrockEmbeddingFunction()
+
+            # Get or create the collection in one step, so concurrent workers cannot both create it
             logger.info(f"Getting collection: {settings.COLLECTION_NAME}")
-            collection = chroma_client.get_collection(
-                name=settings.COLLECTION_NAME, embedding_function=embedding_function
-            )
-            logger.info(
-                f"Found existing collection with {collection.count()} documents"
+            ready = client.get_or_create_collection(
+                name=settings.COLLECTION_NAME, embedding_function=function
             )
+            logger.info(f"Collection ready with {ready.count()} documents")
+
+            chroma_client, embedding_function = client, function
+            with _tenant_lock:
+                _tenant_collections.clear()
+            collection = ready
+
         except Exception as e:
-            logger.info(f"Creating new collection: {settings.COLLECTION_NAME}")
-            collection = chroma_client.create_collection(
-                name=settings.COLLECTION_NAME, embedding_function=embedding_function
-            )
-            logger.info("Collection created successfully")
+            error_message = f"Error initializing vector database: {str(e)}"
+            logger.error(error_message)
+            raise VectorDBException(error_message)
+
+
+def tenant_collection_name(tenant: Optional[str] = None) -> str:
+    """Name of the collection holding a tenant's documents; COLLECTION_NAME without a tenant"""
+    return f"{settings.COLLECTION_NAME}__{tenant}" if tenant else settings.COLLECTION_NAME
+
+
+def parse_tenants(value: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated list of tenant IDs, e.g. the TENANT_HEADER header
+
+    Args:
+        value: The raw value
+
+    Returns:
+        Unique tenant IDs in the given order, empty when no tenant was named
+
+    Raises:
+        ValueError: If an ID is not valid or too many tenants are named
+    """
+    tenants = list(dict.fromkeys(part.strip() for part in (value or "").split(",") if part.strip()))
+    for tenant in tenants:
+        if not _TENANT_ID.match(tenant) or len(tenant_collection_name(tenant)) > _MAX_COLLECTION_NAME:
+            raise ValueError(f"Invalid tenant ID: {tenant}")
+    if len(tenants) > settings.TENANT_MAX_PER_QUERY:
+        raise ValueError(f"At most {settings.TENANT_MAX_PER_QUERY} tenants can be searched at once")
+    return tenants
+
+
+def get_collection(tenant: Optional[str] = None, create: bool = False):
+    """
+    Get the collection of a tenant, opening it on first use
+
+    Open handles are kept in a least-recently-used map of TENANT_MAX_OPEN_COLLECTIONS
+    entries, so only recently active tenants hold on to one.
+
+    Args:
+        tenant: The tenant ID, or None for the shared collection
+        create: Whether to create the collection if it does not exist yet
+
+    Returns:
+        The collection, or None if it does not exist and create is False
+    """
+    if collection is None:
+        init_vector_db()
+    if not tenant:
+        return collection
+
+    with _tenant_lock:
+        handle = _tenant_collections.get(tenant)
+        if handle is not None:
+            _tenant_collections.move_to_end(tenant)
+    record_cache_lookup("tenant_collections", handle is not None)
+    if handle is not None:
+        return handle
+
+    name = tenant_collection_name(tenant)
+    if create:
+        handle = chroma_client.get_or_create_collection(name=name, embedding_function=embedding_function)
+    else:
+        # Reads must not create a collection for every tenant ID a client makes up
+        try:
+            handle = chroma_client.get_collection(name=name, embedding_function=embedding_function)
+        except Exception:
+            # A local client raises ValueError for a missing collection, but the HTTP client
+            # re-raises the server's error as a plain Exception; tell them apart by listing
+            if name not in {existing.name for existing in chroma_client.list_collections()}:
+                return None
+            raise
+
+    with _tenant_lock:
+        handle = _tenant_collections.setdefault(tenant, handle)
+        _tenant_collections.move_to_end(tenant)
+        while len(_tenant_collections) > settings.TENANT_MAX_OPEN_COLLECTIONS:
+            evicted, _ = _tenant_collections.popitem(last=False)
+            logger.debug(f"Closed collection of cold tenant {evicted}")
+    return handle
+
+
+def _targets(tenants: Optional[Sequence[str]]) -> List[Optional[str]]:
+    """Tenants a read spans: the given ones, or the shared collection"""
+    return list(tenants) if tenants else [None]
+
+
+def _map_tenants(function, tenants: List[Optional[str]]) -> list:
+    """Call a function for every tenant, concurrently when there are several"""
+    if len(tenants) == 1:
+        return [function(tenants[0])]
+
+    context = current_context()
+
+    def run(tenant: Optional[str]):
+        with use_context(context):
+            return function(tenant)
+
+    return list(_tenant_pool.map(run, tenants))
+
 
+def check_health() -> dict:
+    """
+    Check that ChromaDB is reachable and the collection can be read
+
+    Returns:
+        Dictionary with an "ok" flag, the document count, and an optional "error" message
+    """
+    try:
+        if collection is None:
+            init_vector_db()
+        chroma_client.heartbeat()
+        return {"ok": True, "documents": collection.count()}
     except Exception as e:
-        error_message = f"Error initializing vector database: {str(e)}"
-        logger.error(error_message)
-        raise VectorDBException(error_message)
+        return {"ok": False, "error": str(e)}
 
 
-def add_document(text: str, metadata: Dict[str, Any], doc_id: str):
+def format_metadata(metadata: Dict[str, Any], doc_id: str) -> Dict[str, Any]:
+    """
+    Format extracted CV metadata for storage in ChromaDB
+
+    Args:
+        metadata: Metadata as returned by extract_metadata, plus filename and fingerprint
+        doc_id: The document ID
+
+    Returns:
+        Flat metadata dictionary with list fields joined into strings
+    """
+    # ChromaDB only accepts scalar metadata values
+    chroma_metadata = {
+        "filename": metadata.get("filename", "Unknown"),
+        "name": metadata.get("name", "Unknown"),
+        "location": metadata.get("location", "Unknown"),
+        "skills": ", ".join(metadata.get("skills", [])),
+        "languages": ", ".join(metadata.get("languages", [])),
+        "experience_years": metadata.get("experience_years", 0),
+        "job_titles": ", ".join(metadata.get("job_titles", [])),
+        "education": flatten_education(metadata.get("education")),
+    }
+
+    # Address of the full text in the document store
+    if metadata.get("content_hash"):
+        chroma_metadata["content_hash"] = metadata["content_hash"]
+
+    # Compact candidate profile built at ingestion time
+    if metadata.get("profile"):
+        chroma_metadata["profile"] = metadata["profile"]
+
+    # Near-duplicate fingerprint and the canonical ID of its duplicate group
+    if metadata.get("fingerprint"):
+        chroma_metadata["fingerprint"] = metadata["fingerprint"]
+        chroma_metadata["duplicate_of"] = metadata.get("duplicate_of") or doc_id
+        for band, key in enumerate(metadata.get("lsh_bands") or []):
+            chroma_metadata[f"lsh_band_{band}"] = key
+
+    # S3 object the CV was synced from, and the version that was indexed
+    if metadata.get("source_key"):
+        chroma_metadata["source_key"] = metadata["source_key"]
+        chroma_metadata["source_etag"] = metadata.get("source_etag") or ""
+
+    return chroma_metadata
+
+
+def _release_text(digest: Optional[str]):
+    """Delete a text from the document store once no document in any collection references it"""
+    if not digest:
+        return
+
+    def is_referenced() -> bool:
+        return any(
+            _get_tenant(tenant, where={"content_hash": digest}, include=[], limit=1)["ids"]
+            for tenant in [None] + list_tenants()
+        )
+
+    release_document(digest, is_referenced)
+
+
+def _stored_content_hash(target, doc_id: str) -> Optional[str]:
+    results = target.get(ids=[doc_id], include=["metadatas"])
+    return (results["metadatas"][0] or {}).get("content_hash") if results["ids"] else None
+
+
+def add_document(text: str, metadata: Dict[str, Any], doc_id: str, tenant: Optional[str] = None):
     """
     Add a document to the vector database
 
+    The full text goes to the document store; ChromaDB only keeps the ID, the
+    embedding and the filterable metadata.
+
     Args:
         text: The document text
         metadata: Document metadata
         doc_id: Unique document ID
+        tenant: Tenant whose collection the document goes to, or None for the shared one
 
     Raises:
         VectorDBException: If adding the document fails
     """
-    global collection
+    try:
+        target = get_collection(tenant, create=True)
+        previous_hash = _stored_content_hash(target, doc_id)
+        chroma_metadata = format_metadata(
+            dict(metadata, content_hash=put_document(text)), doc_id
+        )
+        embeddings = embedding_function([text])
 
+        # Add to ChromaDB (upsert so merged duplicates and new versions replace the existing entry)
+        with track_stage("vector_upsert", **{"db.document_chars": len(text)}):
+            target.upsert(embeddings=embeddings, metadatas=[chroma_metadata], ids=[doc_id])
+
+        # A release of the same text may have found no reference between the put and the
+        # upsert and deleted the blob; now that this document references it, store it again
+        put_document(text)
+
+        # The text of a replaced version is personal data too, so it goes once nothing else uses it
+        if previous_hash != chroma_metadata["content_hash"]:
+            _release_text(previous_hash)
+
+        logger.info(f"Added document {doc_id} to {target.name}")
+
+    except Exception as e:
+        error_message = f"Error adding document to vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def delete_document(doc_id: str, tenant: Optional[str] = None):
+    """
+    Remove a document from the vector database
+
+    Its text is deleted from the document store too, unless another document
+    has the same text.
+
+    Args:
+        doc_id: The document ID
+        tenant: The tenant the document belongs to, or None for the shared collection
+
+    Raises:
+        VectorDBException: If deleting the document fails
+    """
+    try:
+        target = get_collection(tenant)
+        if target is not None:
+            digest = _stored_content_hash(target, doc_id)
+            target.delete(ids=[doc_id])
+            logger.info(f"Deleted document {doc_id} from {target.name}")
+            _release_text(digest)
+
+    except Exception as e:
+        error_message = f"Error deleting document from vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def list_tenants() -> List[str]:
+    """
+    List the tenants that have a collection
+
+    Returns:
+        Tenant IDs
+
+    Raises:
+        VectorDBException: If listing the collections fails
+    """
     if collection is None:
         init_vector_db()
 
     try:
-        # Format metadata for ChromaDB
-        chroma_metadata = {
-            "filename": metadata.get("filename", "Unknown"),
-            "name": metadata.get("name", "Unknown"),
-            "location": metadata.get("location", "Unknown"),
-            "skills": ", ".join(metadata.get("skills", [])),
-            "languages": ", ".join(metadata.get("languages", [])),
-            "experience_years": metadata.get("experience_years", 0),
-            "job_titles": ", ".join(metadata.get("job_titles", [])),
-            "education": metadata.get("education", ""),
+        prefix = f"{settings.COLLECTION_NAME}__"
+        return [
+            handle.name[len(prefix):]
+            for handle in chroma_client.list_collections()
+            if handle.name.startswith(prefix)
+        ]
+
+    except Exception as e:
+        error_message = f"Error listing tenant collections: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def find_document_by_source(source_key: str, tenant: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Find the document indexed from an S3 object
+
+    Args:
+        source_key: The S3 key
+        tenant: The tenant to look in, or None for the shared collection
+
+    Returns:
+        The document ID and its stored metadata, or None if no document came from the object
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        results = _get_tenant(tenant, where={"source_key": source_key}, include=["metadatas"], limit=1)
+        if not results["ids"]:
+            return None
+        return results["ids"][0], results["metadatas"][0]
+
+    except Exception as e:
+        error_message = f"Error looking up document by source: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def get_document_sources(tenants: Optional[Sequence[Optional[str]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the S3 object every synced document was indexed from
+
+    Args:
+        tenants: Tenants whose collections to scan besides the shared one
+
+    Returns:
+        Dictionary mapping each S3 key to its "doc_id", indexed "etag" and "tenant"
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        targets = [None] + [tenant for tenant in tenants or [] if tenant]
+        results_list = _map_tenants(
+            lambda tenant: _get_tenant(tenant, where={"source_key": {"$ne": ""}}, include=["metadatas"]),
+            targets,
+        )
+        return {
+            metadata["source_key"]: {"doc_id": doc_id, "etag": metadata.get("source_etag") or None, "tenant": tenant}
+            for tenant, results in zip(targets, results_list)
+            for doc_id, metadata in zip(results["ids"], results["metadatas"])
         }
 
-        # Add to ChromaDB
-        collection.add(documents=[text], metadatas=[chroma_metadata], ids=[doc_id])
+    except Exception as e:
+        error_message = f"Error retrieving document sources: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def set_document_source(doc_id: str, source_key: str, source_etag: str, tenant: Optional[str] = None) -> bool:
+    """
+    Record the S3 object a document was indexed from, e.g. for a CV uploaded through the API
+
+    Args:
+        doc_id: The document ID
+        source_key: The S3 key
+        source_etag: The ETag of the indexed version
+        tenant: The tenant the document belongs to, or None for the shared collection
+
+    Returns:
+        Whether the document exists
 
-        logger.info(f"Added document {doc_id} to vector database")
+    Raises:
+        VectorDBException: If updating the document fails
+    """
+    try:
+        target = get_collection(tenant)
+        results = target.get(ids=[doc_id], include=["metadatas"]) if target is not None else {"ids": []}
+        if not results["ids"]:
+            return False
+        metadata = dict(results["metadatas"][0], source_key=source_key, source_etag=source_etag)
+        target.update(ids=[doc_id], metadatas=[metadata])
+        return True
 
     except Exception as e:
-        error_message = f"Error adding document to vector database: {str(e)}"
+        error_message = f"Error updating document source: {str(e)}"
         logger.error(error_message)
         raise VectorDBException(error_message)
 
 
-def query_documents(query_text: str, n_results: int = 5):
+def _collapse_duplicate_hits(results: Dict[str, Any], n_results: int) -> Dict[str, Any]:
+    """
+    Keep only the best-ranked hit of each duplicate group in ChromaDB query results
+
+    Args:
+        results: Query results for a single query text
+        n_results: Number of results to keep
+
+    Returns:
+        Query results in the same shape, with duplicates removed
+    """
+    keep = []
+    seen = set()
+    for i, doc_id in enumerate(results["ids"][0]):
+        metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
+        group = (metadata or {}).get("duplicate_of") or doc_id
+        if group in seen:
+            continue
+        seen.add(group)
+        keep.append(i)
+        if len(keep) == n_results:
+            break
+
+    collapsed = dict(results)
+    for key, value in results.items():
+        if isinstance(value, list) and value and isinstance(value[0], list):
+            collapsed[key] = [[value[0][i] for i in keep]]
+    return collapsed
+
+
+def _query_tenant(
+    tenant: Optional[str], query_embedding: List[float], n_results: int, collapse_duplicates: bool
+) -> Dict[str, Any]:
+    """Query one tenant's collection; hits are tagged with the tenant they came from"""
+    target = get_collection(tenant)
+    if target is None:
+        return {"ids": [[]], "metadatas": [[]], "distances": [[]]}
+
+    # Over-fetch so collapsing duplicates still leaves n_results distinct candidates
+    fetch = n_results * settings.DEDUP_QUERY_OVERFETCH if collapse_duplicates else n_results
+    with track_stage("vector_query", **{"db.n_results": fetch}):
+        results = target.query(
+            query_embeddings=[query_embedding],
+            n_results=fetch,
+            include=["metadatas", "distances"],
+        )
+        set_span_attributes(**{"db.documents_returned": len(results["ids"][0])})
+
+    if collapse_duplicates:
+        results = _collapse_duplicate_hits(results, n_results)
+    if tenant:
+        for metadata in results["metadatas"][0]:
+            metadata["tenant"] = tenant
+    return results
+
+
+def query_documents(
+    query_text: str,
+    n_results: int = 5,
+    collapse_duplicates: bool = True,
+    tenants: Optional[Sequence[str]] = None,
+):
     """
     Query the vector database for documents matching the query
 
+    Each tenant has its own collection, so a search only scans the collections of
+    the tenants it names. Several tenants are queried concurrently and their hits
+    merged by distance into a single top n_results.
+
     Args:
         query_text: The query text
         n_results: Number of results to return
+        collapse_duplicates: Whether to return a single hit per near-duplicate group
+        tenants: Tenants to search, or None for the shared collection
 
     Returns:
         Query results from ChromaDB
@@ -126,79 +572,405 @@ def query_documents(query_text: str, n_results: int = 5):
     Raises:
         VectorDBException: If querying fails
     """
-    global collection
-
-    if collection is None:
-        init_vector_db()
-
     try:
-        results = collection.query(query_texts=[query_text], n_results=n_results)
-
-        return results
+        targets = _targets(tenants)
+        if embedding_function is None:
+            init_vector_db()
+
+        # Embed once, however many collections are searched
+        query_embedding = list(embedding_function([query_text])[0])
+        results_list = _map_tenants(
+            lambda tenant: _query_tenant(tenant, query_embedding, n_results, collapse_duplicates),
+            targets,
+        )
+        if len(results_list) == 1:
+            return results_list[0]
+
+        hits = sorted(
+            (
+                (distance, doc_id, metadata)
+                for results in results_list
+                for doc_id, metadata, distance in zip(
+                    results["ids"][0], results["metadatas"][0], results["distances"][0]
+                )
+            ),
+            key=lambda hit: hit[0],
+        )[:n_results]
+        return {
+            "ids": [[doc_id for _, doc_id, _ in hits]],
+            "metadatas": [[metadata for _, _, metadata in hits]],
+            "distances": [[distance for distance, _, _ in hits]],
+        }
 
+    except ProviderBusyException:
+        raise
     except Exception as e:
         error_message = f"Error querying vector database: {str(e)}"
         logger.error(error_message)
         raise VectorDBException(error_message)
 
 
-def get_all_cvs() -> List[CVDocument]:
+def _to_cv_dict(doc_id: str, metadata: Dict[str, Any], content: Optional[str] = None) -> Dict[str, Any]:
+    """Build a plain dictionary in the CVDocument shape from stored ChromaDB metadata"""
+    return {
+        "id": doc_id,
+        "filename": metadata.get("filename", "Unknown"),
+        "content": content,
+        "metadata": {
+            "name": metadata.get("name", "Unknown"),
+            "location": metadata.get("location", "Unknown"),
+            "skills": split_metadata_list(metadata.get("skills")),
+            "languages": split_metadata_list(metadata.get("languages")),
+            "experience_years": float(metadata.get("experience_years", 0)),
+            "job_titles": split_metadata_list(metadata.get("job_titles")),
+            "education": metadata.get("education", ""),
+            "profile": metadata.get("profile"),
+        },
+    }
+
+
+def _to_cv_document(doc_id: str, metadata: Dict[str, Any], content: Optional[str] = None) -> CVDocument:
+    """Build a CVDocument from stored ChromaDB metadata"""
+    return CVDocument.model_validate(_to_cv_dict(doc_id, metadata, content))
+
+
+def _get_tenant(tenant: Optional[str], **kwargs) -> Dict[str, Any]:
+    """Get records from one tenant's collection; an unknown tenant has none"""
+    target = get_collection(tenant)
+    if target is None:
+        return {"ids": [], "embeddings": None, "metadatas": [], "documents": None}
+    return target.get(**kwargs)
+
+
+def get_all_cvs(tenants: Optional[Sequence[str]] = None, as_dicts: bool = False) -> List[Any]:
     """
     Get all CVs from the vector database
 
+    Only metadata is returned; use get_cv for the full text of a single CV.
+
+    Args:
+        tenants: Tenants to list, or None for the shared collection
+        as_dicts: Return plain dictionaries in the CVDocument shape instead of models,
+            for callers that serialize them directly
+
     Returns:
-        List of CVDocument objects
+        List of CVDocument objects (or dictionaries) without content
 
     Raises:
         VectorDBException: If retrieval fails
     """
-    global collection
+    try:
+        # Get all metadata from ChromaDB
+        results_list = _map_tenants(lambda tenant: _get_tenant(tenant, include=["metadatas"]), _targets(tenants))
 
-    if collection is None:
+        build = _to_cv_dict if as_dicts else _to_cv_document
+        return [
+            build(doc_id, metadata)
+            for results in results_list
+            for doc_id, metadata in zip(results["ids"], results["metadatas"])
+        ]
+
+    except Exception as e:
+        error_message = f"Error retrieving CVs from vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def embed_query(text: str) -> List[float]:
+    """
+    Embed a query text with the same embedding function used by the collection
+
+    Args:
+        text: The text to embed
+
+    Returns:
+        Embedding vector
+
+    Raises:
+        VectorDBException: If embedding fails
+    """
+    if embedding_function is None:
         init_vector_db()
 
     try:
-        # Get all documents from ChromaDB
-        results = collection.get()
-
-        cvs = []
-        for i, doc_id in enumerate(results["ids"]):
-            metadata = results["metadatas"][i]
-
-            # Parse metadata
-            cv_metadata = CVMetadata(
-                name=metadata.get("name", "Unknown"),
-                location=metadata.get("location", "Unknown"),
-                skills=(
-                    metadata.get("skills", "").split(", ")
-                    if metadata.get("skills")
-                    else []
-                ),
-                languages=(
-                    metadata.get("languages", "").split(", ")
-                    if metadata.get("languages")
-                    else []
-                ),
-                experience_years=float(metadata.get("experience_years", 0)),
-                job_titles=(
-                    metadata.get("job_titles", "").split(", ")
-                    if metadata.get("job_titles")
-                    else []
-                ),
-                education=metadata.get("education", ""),
-            )
+        return list(embedding_function([text])[0])
+
+    except ProviderBusyException:
+        raise
+    except Exception as e:
+        error_message = f"Error embedding query text: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def get_corpus_embeddings(tenants: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Get the ids, embeddings and metadata of every document in the collection
+
+    Args:
+        tenants: Tenants whose collections to scan, or None for the shared collection
 
-            cv = CVDocument(
-                id=doc_id,
-                filename=metadata.get("filename", "Unknown"),
-                content=results["documents"][i],
-                metadata=cv_metadata,
+    Returns:
+        Dictionary with "ids", "embeddings" and "metadatas" lists
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        with track_stage("corpus_scan"):
+            results_list = _map_tenants(
+                lambda tenant: _get_tenant(tenant, include=["embeddings", "metadatas"]), _targets(tenants)
             )
-            cvs.append(cv)
+            corpus = {"ids": [], "embeddings": [], "metadatas": []}
+            for results in results_list:
+                corpus["ids"].extend(results["ids"])
+                corpus["embeddings"].extend(results["embeddings"] or [])
+                corpus["metadatas"].extend(results["metadatas"] or [])
+            set_span_attributes(**{"db.documents_returned": len(corpus["ids"])})
 
-        return cvs
+        return corpus
 
     except Exception as e:
-        error_message = f"Error retrieving CVs from vector database: {str(e)}"
+        error_message = f"Error retrieving embeddings from vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def get_fingerprints(tenant: Optional[str] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    Get the near-duplicate fingerprints of every fingerprinted document
+
+    Args:
+        tenant: The tenant whose documents to read, or None for the shared collection
+
+    Returns:
+        Dictionary mapping document ID to (fingerprint, duplicate group ID)
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        results = _get_tenant(tenant, where={"fingerprint": {"$ne": ""}}, include=["metadatas"])
+
+        return {
+            doc_id: (metadata["fingerprint"], metadata.get("duplicate_of") or doc_id)
+            for doc_id, metadata in zip(results["ids"], results["metadatas"])
+        }
+
+    except Exception as e:
+        error_message = f"Error retrieving fingerprints from vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def find_fingerprints_by_band(bands: List[str], tenant: Optional[str] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    Get the fingerprints of the documents sharing at least one LSH band key
+
+    Args:
+        bands: Band keys of a signature, in band order
+        tenant: The tenant whose documents to search, or None for the shared collection
+
+    Returns:
+        Dictionary mapping document ID to (fingerprint, duplicate group ID)
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    clauses = [{f"lsh_band_{band}": key} for band, key in enumerate(bands)]
+    if not clauses:
+        return {}
+
+    try:
+        where = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        results = _get_tenant(tenant, where=where, include=["metadatas"])
+
+        return {
+            doc_id: (metadata["fingerprint"], metadata.get("duplicate_of") or doc_id)
+            for doc_id, metadata in zip(results["ids"], results["metadatas"])
+            if metadata.get("fingerprint")
+        }
+
+    except Exception as e:
+        error_message = f"Error looking up fingerprints in vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def get_document_metadata(doc_id: str, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get the extracted metadata of a document in the form returned by extract_metadata
+
+    Args:
+        doc_id: The document ID
+        tenant: The tenant the document belongs to, or None for the shared collection
+
+    Returns:
+        Metadata dictionary, or None if the document does not exist
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        results = _get_tenant(tenant, ids=[doc_id], include=["metadatas"])
+        if not results["ids"]:
+            return None
+
+        metadata = dict(results["metadatas"][0])
+        for field in ("skills", "languages", "job_titles"):
+            metadata[field] = split_metadata_list(metadata.get(field))
+        return metadata
+
+    except Exception as e:
+        error_message = f"Error retrieving document metadata: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def get_document_text(
+    doc_id: str, metadata: Optional[Dict[str, Any]] = None, tenant: Optional[str] = None
+) -> Optional[str]:
+    """
+    Load the full text of a document
+
+    The text is read from the document store; documents indexed before the
+    document store existed still carry their text in ChromaDB.
+
+    Args:
+        doc_id: The document ID
+        metadata: The document's stored metadata, if already at hand
+        tenant: The tenant the document belongs to, or None for the shared collection
+
+    Returns:
+        The document text, or None if the document does not exist
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        if metadata is None:
+            results = _get_tenant(tenant, ids=[doc_id], include=["metadatas"])
+            if not results["ids"]:
+                return None
+            metadata = results["metadatas"][0]
+
+        if metadata.get("content_hash"):
+            return get_document(metadata["content_hash"])
+
+        results = _get_tenant(tenant, ids=[doc_id], include=["documents"])
+        return results["documents"][0] if results["ids"] else None
+
+    except Exception as e:
+        error_message = f"Error loading document text: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def get_cv(doc_id: str, tenants: Optional[Sequence[str]] = None) -> Optional[CVDocument]:
+    """
+    Get a single CV, including its full text
+
+    Args:
+        doc_id: The document ID
+        tenants: Tenants to look in, in order, or None for the shared collection
+
+    Returns:
+        CVDocument, or None if the document does not exist
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        for tenant in _targets(tenants):
+            results = _get_tenant(tenant, ids=[doc_id], include=["metadatas"])
+            if results["ids"]:
+                metadata = results["metadatas"][0]
+                return _to_cv_document(doc_id, metadata, get_document_text(doc_id, metadata, tenant))
+        return None
+
+    except Exception as e:
+        error_message = f"Error retrieving CV from vector database: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def _sessions():
+    """Get the collection holding conversation sessions, creating it on first use"""
+    global _session_collection
+
+    if _session_collection is None:
+        if collection is None:
+            init_vector_db()
+        # Sessions are looked up by ID only, so their records carry a placeholder embedding
+        _session_collection = chroma_client.get_or_create_collection(
+            name=f"{settings.COLLECTION_NAME}.sessions", embedding_function=None
+        )
+    return _session_collection
+
+
+def load_session_state(session_id: str) -> Optional[Tuple[str, float]]:
+    """
+    Load a stored conversation session
+
+    Args:
+        session_id: The session ID
+
+    Returns:
+        Tuple of (serialized session, time it was last saved), or None if it is not stored
+
+    Raises:
+        VectorDBException: If retrieval fails
+    """
+    try:
+        results = _sessions().get(ids=[session_id], include=["metadatas"])
+        if not results["ids"]:
+            return None
+        metadata = results["metadatas"][0]
+        return metadata["state"], metadata["updated"]
+
+    except Exception as e:
+        error_message = f"Error loading session {session_id}: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def save_session_state(session_id: str, state: str, updated: float):
+    """
+    Store a conversation session, replacing its previous state
+
+    Args:
+        session_id: The session ID
+        state: The serialized session
+        updated: Time of the save, as seconds since the epoch
+
+    Raises:
+        VectorDBException: If storing fails
+    """
+    try:
+        _sessions().upsert(
+            ids=[session_id], embeddings=[[0.0]], metadatas=[{"state": state, "updated": updated}]
+        )
+
+    except Exception as e:
+        error_message = f"Error saving session {session_id}: {str(e)}"
+        logger.error(error_message)
+        raise VectorDBException(error_message)
+
+
+def purge_session_states(older_than: float):
+    """
+    Delete the stored sessions last saved before a time
+
+    Args:
+        older_than: Cut-off time, as seconds since the epoch
+
+    Raises:
+        VectorDBException: If deleting fails
+    """
+    try:
+        _sessions().delete(where={"updated": {"$lt": older_than}})
+
+    except Exception as e:
+        error_message = f"Error purging expired sessions: {str(e)}"
         logger.error(error_message)
         raise VectorDBException(error_message)
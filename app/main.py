@@ -1,12 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
 import os
+import time
+import threading
 
 from app.api.routes.cv_routes import router as cv_router
 from app.api.routes.query_routes import router as query_router
+from app.api.routes.match_routes import router as match_router
+from app.core.compression import CompressionMiddleware
+from app.core.admission import client_key, forwarded_client, request_lane, admit_request, finish_request
 from app.core.config import settings
-from app.infrastructure.vector_db import init_vector_db
+from app.core.metrics import REQUEST_LATENCY
+from app.core.tracing import init_tracing, shutdown_tracing, start_span, set_span_attributes
+from app.infrastructure import bedrock, openai
+from app.infrastructure.vector_db import init_vector_db, check_health as check_vector_db
+from app.services.s3_sync import start_background_sync, stop_background_sync
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +29,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Compress large responses for clients that accept it (added first, so it wraps the routes directly)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,19 +45,121 @@ app.add_middleware(
 # Include routers
 app.include_router(cv_router, tags=["CVs"])
 app.include_router(query_router, tags=["Queries"])
+app.include_router(match_router, tags=["Matching"])
 
 # Initialize vector DB on startup
 @app.on_event("startup")
 async def startup_event():
+    # Configure tracing (no-op unless TRACING_ENABLED is set) in each worker: the exporter's
+    # thread and gRPC channel would not survive the fork from a preloading master
+    init_tracing()
+    
     # Initialize the vector database
     init_vector_db()
+    
+    # Index CVs dropped straight into the S3 bucket
+    if settings.S3_SYNC_ENABLED:
+        start_background_sync()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_background_sync()
+    shutdown_tracing()
+
+# Turn requests away early when a client is over its rate limit or the server is at capacity
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    lane = request_lane(request.url.path) if settings.ADMISSION_ENABLED else None
+    if lane is None:
+        return await call_next(request)
+    
+    client = client_key(
+        request.headers.get(settings.API_KEY_HEADER),
+        forwarded_client(request.client.host if request.client else None, request.headers.get("x-forwarded-for")),
+    )
+    rejection = admit_request(client, lane)
+    if rejection is not None:
+        status, retry_after, detail = rejection
+        return JSONResponse(
+            status_code=status,
+            content={"detail": detail},
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    try:
+        return await call_next(request)
+    finally:
+        finish_request(lane)
+
+# Record per-route request latency and trace each request as a root span
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    # Named after the route template once routing has matched it, so that raw paths
+    # with IDs do not turn every request into a span name of its own
+    with start_span(request.method) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Use the route template rather than the raw path to keep label cardinality bounded
+            route = request.scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            if span is not None:
+                span.update_name(f"{request.method} {route_path}")
+            set_span_attributes(**{"http.route": route_path, "http.status_code": status})
+            REQUEST_LATENCY.labels(
+                method=request.method,
+                route=route_path,
+                status=str(status),
+            ).observe(time.perf_counter() - start)
 
-# Health check endpoint
+# Metrics endpoint
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    # With several workers, aggregate the metrics every worker writes to PROMETHEUS_MULTIPROC_DIR
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Health check endpoints
 @app.get("/health", tags=["Health"])
+@app.get("/health/live", tags=["Health"])
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up and serving requests"""
     return {"status": "ok"}
 
+# Last AI provider check and when it ran; probes within HEALTH_CHECK_CACHE_SECONDS reuse it
+_provider_health = {"checked": 0.0, "result": None}
+_provider_health_lock = threading.Lock()
+
+def check_provider() -> dict:
+    """Check the active AI provider, reusing a result younger than HEALTH_CHECK_CACHE_SECONDS"""
+    with _provider_health_lock:
+        now = time.monotonic()
+        if _provider_health["result"] is None or now - _provider_health["checked"] > settings.HEALTH_CHECK_CACHE_SECONDS:
+            _provider_health["result"] = openai.check_health() if settings.USE_OPENAI else bedrock.check_health()
+            _provider_health["checked"] = now
+        return _provider_health["result"]
+
+@app.get("/health/ready", tags=["Health"])
+def readiness_check():
+    """Readiness check: the vector database and the active AI provider are usable"""
+    checks = {
+        "vector_db": check_vector_db(),
+        "llm_provider": check_provider(),
+    }
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ok" if ready else "unavailable", "checks": checks},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
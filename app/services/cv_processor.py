@@ -4,14 +4,27 @@ import tempfile
 import shutil
 import logging
 import pypdf
+from typing import Optional
 from fastapi import UploadFile
 
 from app.core.config import settings
 from app.core.exceptions import CVProcessingException
+from app.core.metrics import track_stage
+from app.core.tracing import traced, set_span_attributes
 from app.infrastructure.s3 import upload_file_to_s3
-from app.infrastructure.vector_db import add_document
+from app.infrastructure.vector_db import add_document, delete_document, get_document_metadata
 from app.infrastructure.bedrock import extract_metadata as bedrock_extract_metadata
 from app.infrastructure.openai import extract_metadata as openai_extract_metadata
+from app.services.profile_builder import build_profile, canonicalize_skills
+from app.services.deduplication import (
+    compute_fingerprint,
+    encode_fingerprint,
+    band_hashes,
+    check_and_register,
+    replace_signature,
+    group_of,
+    unregister,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -45,12 +58,26 @@ def extract_text_from_pdf(file_path: str) -> str:
         logger.error(error_message)
         raise CVProcessingException(error_message)
 
-def process_cv_file(file: UploadFile):
+@traced("process_cv_file")
+def process_cv_file(
+    file: UploadFile,
+    tenant: Optional[str] = None,
+    doc_id: Optional[str] = None,
+    source_key: Optional[str] = None,
+    source_etag: Optional[str] = None,
+) -> Optional[str]:
     """
     Process an uploaded CV file
     
     Args:
         file: The uploaded file
+        tenant: Tenant whose collection the CV goes to, or None for the shared one
+        doc_id: ID of an earlier version of the CV to replace; a new ID is created if None
+        source_key: S3 key the CV was read from; it is already stored there, so it is not uploaded again
+        source_etag: ETag of the S3 object version that was read, recorded with source_key
+        
+    Returns:
+        The ID the CV was stored under, or None if it was skipped as a duplicate
         
     Raises:
         CVProcessingException: If processing fails
@@ -59,6 +86,7 @@ def process_cv_file(file: UploadFile):
     temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
     temp_file_path = temp_file.name
     temp_file.close()
+    registered_id = None
     
     try:
         # Save the upload file to the temporary file
@@ -68,33 +96,93 @@ def process_cv_file(file: UploadFile):
         logger.info(f"Processing CV: {file.filename}")
         
         # Extract text from the PDF
-        text = extract_text_from_pdf(temp_file_path)
+        with track_stage("pdf_parse"):
+            text = extract_text_from_pdf(temp_file_path)
+        set_span_attributes(**{"cv.filename": file.filename, "cv.text_chars": len(text), "cv.tenant": tenant or ""})
         
-        # Extract metadata using AI service
-        if settings.USE_OPENAI:
-            metadata = openai_extract_metadata(text)
+        # Create a unique ID for the document; a new version of a known CV keeps its ID and
+        # leaves the duplicate index first, so it is not taken for a duplicate of itself
+        if doc_id is None:
+            doc_id = str(uuid.uuid4())
         else:
-            metadata = bedrock_extract_metadata(text)
+            unregister(doc_id, tenant)
         
-        # Add filename to metadata
-        metadata["filename"] = file.filename
+        # Look for a near-duplicate before paying for extraction and embedding
+        metadata = None
+        fingerprint = None
+        lsh_bands = None
+        duplicate_of = None
+        merged = False
+        signature = compute_fingerprint(text) if settings.DEDUP_MODE != "off" else None
+        if signature is not None:
+            fingerprint = encode_fingerprint(signature)
+            lsh_bands = band_hashes(signature)
+            match = check_and_register(doc_id, signature, tenant)
+            registered_id = doc_id
+            if match:
+                duplicate_id, similarity = match
+                set_span_attributes(**{"cv.duplicate_of": duplicate_id, "cv.duplicate_similarity": similarity})
+                logger.info(
+                    f"CV {file.filename} is a near-duplicate of {duplicate_id} "
+                    f"(similarity {similarity:.2f}, mode {settings.DEDUP_MODE})"
+                )
+                if settings.DEDUP_MODE == "skip":
+                    unregister(registered_id, tenant)
+                    return None
+                if settings.DEDUP_MODE == "merge":
+                    # Replace the existing entry, reusing its extracted metadata
+                    unregister(registered_id, tenant)
+                    registered_id = None
+                    doc_id = duplicate_id
+                    merged = True
+                    metadata = get_document_metadata(duplicate_id, tenant)
+                duplicate_of = group_of(duplicate_id, tenant)
         
-        # Create a unique ID for the document
-        doc_id = str(uuid.uuid4())
+        # Extract metadata using AI service
+        if metadata is None:
+            if settings.USE_OPENAI:
+                metadata = openai_extract_metadata(text)
+            else:
+                metadata = bedrock_extract_metadata(text)
+        
+        # Normalize skills and build the compact profile used at question time
+        metadata["skills"] = canonicalize_skills(metadata.get("skills", []))
+        if not metadata.get("profile"):
+            metadata["profile"] = build_profile(metadata)
+        
+        # Add filename, fingerprint with its band keys and the S3 object it was synced from to metadata
+        metadata["filename"] = file.filename
+        metadata["fingerprint"] = fingerprint
+        metadata["lsh_bands"] = lsh_bands
+        metadata["duplicate_of"] = duplicate_of
+        metadata["source_key"] = source_key
+        metadata["source_etag"] = source_etag
         
         # Add to vector database
-        add_document(text, metadata, doc_id)
+        add_document(text, metadata, doc_id, tenant)
+        registered_id = None
         
-        # Upload to S3 (optional)
-        try:
-            s3_path = upload_file_to_s3(temp_file_path, file.filename)
-            logger.info(f"Uploaded to S3: {s3_path}")
-        except Exception as e:
-            logger.warning(f"S3 upload failed, but continuing: {str(e)}")
+        # The merged entry now holds this text, so the index must match against its signature
+        if merged:
+            replace_signature(doc_id, signature, tenant)
+        
+        # Upload to S3 (optional), tagged with the document ID and tenant so the S3 sync does not index it again
+        if source_key is None:
+            try:
+                object_name = f"{tenant}/{file.filename}" if tenant else file.filename
+                object_metadata = {"doc-id": doc_id, "tenant": tenant} if tenant else {"doc-id": doc_id}
+                s3_path = upload_file_to_s3(temp_file_path, object_name, metadata=object_metadata)
+                logger.info(f"Uploaded to S3: {s3_path}")
+            except Exception as e:
+                logger.warning(f"S3 upload failed, but continuing: {str(e)}")
         
         logger.info(f"Successfully processed CV: {file.filename}")
+        return doc_id
         
     except Exception as e:
+        # Release the duplicate index slot reserved for a CV that was never stored
+        if registered_id:
+            unregister(registered_id, tenant)
         error_message = f"Error processing CV: {str(e)}"
         logger.error(error_message)
         raise CVProcessingException(error_message)
@@ -103,4 +191,18 @@ def process_cv_file(file: UploadFile):
         # Clean up the temporary file
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
-            logger.debug(f"Removed temporary file: {temp_file_path}")
\ No newline at end of file
+            logger.debug(f"Removed temporary file: {temp_file_path}")
+
+def remove_cv(doc_id: str, tenant: Optional[str] = None):
+    """
+    Remove a CV from the vector database and the near-duplicate index
+    
+    Args:
+        doc_id: The document ID
+        tenant: The tenant the CV belongs to, or None for the shared collection
+        
+    Raises:
+        VectorDBException: If deleting the document fails
+    """
+    delete_document(doc_id, tenant)
+    unregister(doc_id, tenant)
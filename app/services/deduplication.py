@@ -0,0 +1,273 @@
+import re
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.infrastructure.vector_db import get_fingerprints, find_fingerprints_by_band
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+
+# Fixed permutations so fingerprints stay comparable across processes and restarts
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=settings.DEDUP_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=settings.DEDUP_NUM_PERM, dtype=np.uint64)
+
+
+def compute_fingerprint(text: str) -> Optional[np.ndarray]:
+    """
+    Compute a MinHash signature of a text over word shingles
+
+    Args:
+        text: The text to fingerprint
+
+    Returns:
+        Array of DEDUP_NUM_PERM uint32 values, or None if the text has no words
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+
+    size = settings.DEDUP_SHINGLE_SIZE
+    shingles = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+            for shingle in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+    # Apply every permutation to every shingle hash at once and keep the minimum per permutation
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def encode_fingerprint(signature: np.ndarray) -> str:
+    """Encode a signature as a hex string that fits in vector DB metadata"""
+    return signature.astype("<u4").tobytes().hex()
+
+
+def decode_fingerprint(value: str) -> np.ndarray:
+    """Decode a signature stored with encode_fingerprint"""
+    return np.frombuffer(bytes.fromhex(value), dtype="<u4").astype(np.uint32)
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two texts from their signatures"""
+    return float(np.mean(a == b))
+
+
+def band_hashes(signature: np.ndarray) -> List[str]:
+    """
+    Hash each LSH band of a signature into a short key stored with the document
+
+    Documents sharing any band key are duplicate candidates, so other processes
+    can find them with a metadata query instead of scanning every fingerprint.
+    """
+    rows = len(signature) // settings.DEDUP_NUM_BANDS
+    return [
+        hashlib.blake2b(signature[band * rows:(band + 1) * rows].astype("<u4").tobytes(), digest_size=8).hexdigest()
+        for band in range(settings.DEDUP_NUM_BANDS)
+    ]
+
+
+class DuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures
+
+    Signatures are split into bands; documents sharing any band bucket are
+    candidates, which are then verified against the similarity threshold. Lookups
+    touch only the candidate buckets instead of the whole corpus.
+    """
+
+    def __init__(self, num_bands: int, threshold: float):
+        self.num_bands = num_bands
+        self.threshold = threshold
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.groups: Dict[str, str] = {}
+        self.buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        rows = len(signature) // self.num_bands
+        return [
+            (band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(self.num_bands)
+        ]
+
+    def add(self, doc_id: str, signature: np.ndarray, group: Optional[str] = None):
+        """Add a document signature, optionally as a member of an existing duplicate group"""
+        self.signatures[doc_id] = signature
+        self.groups[doc_id] = group or doc_id
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        """Remove a document from the index"""
+        signature = self.signatures.pop(doc_id, None)
+        self.groups.pop(doc_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar indexed document above the threshold
+
+        Returns:
+            Tuple of (document ID, estimated similarity), or None if there is no duplicate
+        """
+        candidates: Set[str] = set()
+        for key in self._band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+
+        best = None
+        for doc_id in candidates:
+            similarity = estimate_similarity(signature, self.signatures[doc_id])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity)
+        return best
+
+    def group_of(self, doc_id: str) -> str:
+        """Get the canonical document ID of a document's duplicate group"""
+        return self.groups.get(doc_id, doc_id)
+
+
+# Indexes per tenant (None is the shared collection), built lazily from the fingerprints
+# stored in the vector database; only the most recently used tenants keep theirs in memory
+_indexes: "OrderedDict[Optional[str], DuplicateIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+
+# One build at a time per tenant; entries only exist while a build is running
+_build_locks: Dict[Optional[str], threading.Lock] = {}
+
+
+def _keep(tenant: Optional[str], index: DuplicateIndex) -> DuplicateIndex:
+    """Make an index the tenant's most recently used one; call with _index_lock held"""
+    index = _indexes.setdefault(tenant, index)
+    _indexes.move_to_end(tenant)
+    while len(_indexes) > settings.TENANT_MAX_OPEN_COLLECTIONS:
+        _indexes.popitem(last=False)
+    return index
+
+
+def _get_index(tenant: Optional[str] = None) -> DuplicateIndex:
+    """
+    Get a tenant's index, building it from the vector database on first use
+
+    The build reads every fingerprint of the tenant, so it runs outside
+    _index_lock: uploads to other tenants carry on meanwhile, and only those to
+    the same tenant wait for it.
+    """
+    with _index_lock:
+        index = _indexes.get(tenant)
+        if index is not None:
+            return _keep(tenant, index)
+        build_lock = _build_locks.setdefault(tenant, threading.Lock())
+
+    with build_lock:
+        with _index_lock:
+            index = _indexes.get(tenant)
+        if index is None:
+            index = DuplicateIndex(settings.DEDUP_NUM_BANDS, settings.DEDUP_THRESHOLD)
+            for doc_id, (fingerprint, group) in get_fingerprints(tenant).items():
+                index.add(doc_id, decode_fingerprint(fingerprint), group)
+            logger.info(f"Built duplicate index with {len(index.signatures)} fingerprints for tenant {tenant}")
+
+    with _index_lock:
+        _build_locks.pop(tenant, None)
+        return _keep(tenant, index)
+
+
+def _add_stored_candidates(index: DuplicateIndex, signature: np.ndarray, tenant: Optional[str]):
+    """
+    Add the stored documents sharing a band with a signature to a tenant's index
+
+    With a ChromaDB server several workers ingest into the same collections, and
+    each one's index only holds the fingerprints stored when it was built plus
+    its own registrations. Documents stored since by other workers are found
+    through their band keys.
+    """
+    stored = find_fingerprints_by_band(band_hashes(signature), tenant)
+    with _index_lock:
+        for doc_id, (fingerprint, group) in stored.items():
+            if doc_id not in index.signatures:
+                index.add(doc_id, decode_fingerprint(fingerprint), group)
+
+
+def check_and_register(
+    doc_id: str, signature: np.ndarray, tenant: Optional[str] = None
+) -> Optional[Tuple[str, float]]:
+    """
+    Look up a new document's near-duplicate and reserve its place in the index
+
+    The lookup and registration happen under one lock so that concurrent uploads
+    of the same CV see each other. The new document joins the group of its
+    duplicate when one is found. Duplicates are only looked for within the tenant.
+    When the vector database is shared with other workers (CHROMA_HOST), a miss in
+    the in-memory index is checked against the fingerprints stored there.
+
+    Args:
+        doc_id: The ID the new document will be stored under
+        signature: The document's MinHash signature
+        tenant: The tenant the document is uploaded to
+
+    Returns:
+        Tuple of (duplicate document ID, estimated similarity), or None
+    """
+    index = _get_index(tenant)
+    if settings.CHROMA_HOST:
+        with _index_lock:
+            match = index.find(signature)
+        if match is None:
+            _add_stored_candidates(index, signature, tenant)
+
+    with _index_lock:
+        # Still the tenant's index, even if it was evicted while this upload waited
+        index = _keep(tenant, index)
+        match = index.find(signature)
+        index.add(doc_id, signature, index.group_of(match[0]) if match else None)
+        return match
+
+
+def replace_signature(doc_id: str, signature: np.ndarray, tenant: Optional[str] = None):
+    """
+    Index a document under a new signature, e.g. after a near-duplicate was merged into it
+
+    The document keeps its duplicate group; later uploads are compared against
+    the text it now holds.
+    """
+    index = _get_index(tenant)
+    with _index_lock:
+        index = _keep(tenant, index)
+        group = index.group_of(doc_id)
+        index.remove(doc_id)
+        index.add(doc_id, signature, group)
+
+
+def group_of(doc_id: str, tenant: Optional[str] = None) -> str:
+    """Get the canonical document ID of a document's duplicate group"""
+    index = _get_index(tenant)
+    with _index_lock:
+        return index.group_of(doc_id)
+
+
+def unregister(doc_id: str, tenant: Optional[str] = None):
+    """Remove a document from the duplicate index, e.g. after a failed or skipped ingestion"""
+    with _index_lock:
+        index = _indexes.get(tenant)
+        if index is not None:
+            index.remove(doc_id)
@@ -0,0 +1,231 @@
+import re
+import logging
+import numpy as np
+from typing import List, Dict, Any, Iterable, Optional, Sequence
+
+from app.core.config import settings
+from app.core.exceptions import AIServiceException, ProviderBusyException
+from app.core.tracing import traced, set_span_attributes
+from app.infrastructure.vector_db import (
+    embed_query,
+    get_corpus_embeddings,
+    split_metadata_list,
+)
+from app.infrastructure.bedrock import query_llm as bedrock_query
+from app.infrastructure.openai import query_llm as openai_query
+
+logger = logging.getLogger(__name__)
+
+_NON_TERM_CHARS = re.compile(r"[^a-z0-9+#.]+")
+
+
+def _normalize_term(text: str) -> str:
+    """Lowercase a skill or free text and collapse separators to single spaces"""
+    return " ".join(_NON_TERM_CHARS.sub(" ", text.lower()).split())
+
+
+def _candidate_terms(metadata: Dict[str, Any]) -> List[str]:
+    """Get the raw skill and job title terms stored for a candidate"""
+    return split_metadata_list(metadata.get("skills")) + split_metadata_list(
+        metadata.get("job_titles")
+    )
+
+
+def _job_terms(
+    job_description: str, vocabulary: Iterable[str], required_skills: Optional[List[str]]
+) -> List[str]:
+    """
+    Get the normalized terms the job description asks for
+
+    Explicit required skills win; otherwise every corpus term that appears in the
+    job description text is used.
+    """
+    if required_skills:
+        terms = [_normalize_term(skill) for skill in required_skills]
+        return list(dict.fromkeys(term for term in terms if term))
+
+    text = f" {_normalize_term(job_description)} "
+    return [term for term in vocabulary if f" {term} " in text]
+
+
+def _summarize_candidates(job_description: str, candidates: List[Dict[str, Any]]) -> str:
+    """
+    Generate a single LLM summary comparing the top candidates for a job description
+
+    Raises:
+        AIServiceException: If the LLM call fails
+    """
+    cv_context = ""
+    for candidate in candidates:
+        cv_context += f"CV ID: {candidate['id']}\n"
+        cv_context += f"Name: {candidate['name']}\n"
+        cv_context += f"Location: {candidate['location']}\n"
+        cv_context += f"Experience: {candidate['experience_years']} years\n"
+        cv_context += f"Matched Skills: {', '.join(candidate['matched_skills']) or 'None'}\n"
+        cv_context += f"Match Score: {candidate['score']:.2f}\n\n"
+
+    prompt = f"""
+    You are an AI assistant for a Human Resources department. The candidates below were
+    ranked against a job description. Briefly summarize why each one fits or falls short,
+    citing candidates by name, and recommend who to interview first.
+
+    Job Description:
+    {job_description}
+
+    Ranked Candidates:
+    {cv_context}
+    """
+
+    try:
+        if settings.USE_OPENAI:
+            return openai_query(prompt)
+        return bedrock_query(prompt)
+
+    except ProviderBusyException:
+        raise
+    except Exception as e:
+        error_message = f"Error summarizing candidates: {str(e)}"
+        logger.error(error_message)
+        raise AIServiceException(error_message)
+
+
+@traced("rank_candidates")
+def rank_candidates(
+    job_description: str,
+    required_skills: Optional[List[str]] = None,
+    min_experience_years: Optional[float] = None,
+    page: int = 1,
+    page_size: int = 20,
+    summarize_top_n: int = 0,
+    tenants: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Rank every CV of the given tenants against a job description
+
+    The score is a weighted blend of embedding similarity, skill overlap with the
+    extracted skills and job titles, and experience fit, computed in a single
+    vectorized pass over the corpus. The LLM is only called once, and only when a
+    summary of the top candidates is requested.
+
+    Args:
+        job_description: The job description to match against
+        required_skills: Skills to match instead of the ones detected in the description
+        min_experience_years: Years of experience the role requires
+        page: 1-based page number
+        page_size: Number of candidates per page
+        summarize_top_n: Number of top candidates to summarize with the LLM (0 disables it)
+        tenants: Tenants whose CVs to rank, or None for the shared collection
+
+    Returns:
+        Dictionary matching the MatchResponse model
+
+    Raises:
+        VectorDBException: If the corpus or query embedding cannot be retrieved
+        AIServiceException: If the summary generation fails
+    """
+    logger.info(f"Ranking candidates for job description ({len(job_description)} chars)")
+
+    page_size = min(page_size, settings.MATCH_MAX_PAGE_SIZE)
+    corpus = get_corpus_embeddings(tenants)
+    ids = corpus["ids"]
+
+    if not ids:
+        logger.warning("No CV data found to rank")
+        return {"total": 0, "page": page, "page_size": page_size, "candidates": [], "summary": None}
+
+    metadatas = corpus["metadatas"]
+
+    # Semantic similarity: cosine between the job description and every CV vector
+    matrix = np.asarray(corpus["embeddings"], dtype=np.float32)
+    query = np.asarray(embed_query(job_description), dtype=np.float32)
+    row_norms = np.linalg.norm(matrix, axis=1)
+    query_norm = np.linalg.norm(query)
+    denominator = np.where(row_norms == 0, 1.0, row_norms) * (query_norm or 1.0)
+    semantic_scores = np.clip((matrix @ query) / denominator, 0.0, 1.0)
+
+    # Skill overlap: each candidate's terms intersected with the job terms only, so memory
+    # stays proportional to the terms the candidates actually have
+    candidate_terms = [
+        {_normalize_term(term) for term in _candidate_terms(metadata)} - {""} for metadata in metadatas
+    ]
+    vocabulary = dict.fromkeys(term for terms in candidate_terms for term in terms)
+
+    job_terms = _job_terms(job_description, vocabulary, required_skills)
+    job_term_set = set(job_terms)
+    if job_terms:
+        skills_scores = np.fromiter(
+            (len(terms & job_term_set) for terms in candidate_terms), dtype=np.float32, count=len(ids)
+        ) / len(job_terms)
+    else:
+        skills_scores = np.zeros(len(ids), dtype=np.float32)
+
+    # Experience fit: ratio of candidate years to required years, capped at 1
+    years = np.asarray(
+        [float(metadata.get("experience_years", 0) or 0) for metadata in metadatas],
+        dtype=np.float32,
+    )
+    if min_experience_years:
+        experience_scores = np.clip(years / min_experience_years, 0.0, 1.0)
+    else:
+        experience_scores = np.ones(len(ids), dtype=np.float32)
+
+    # Blend only the components that carry a signal for this job description
+    weights = np.asarray(
+        [
+            settings.MATCH_WEIGHT_SEMANTIC,
+            settings.MATCH_WEIGHT_SKILLS if job_terms else 0.0,
+            settings.MATCH_WEIGHT_EXPERIENCE if min_experience_years else 0.0,
+        ],
+        dtype=np.float32,
+    )
+    components = np.vstack([semantic_scores, skills_scores, experience_scores])
+    scores = (weights @ components) / (weights.sum() or 1.0)
+
+    # Rank, keeping only the best-scoring entry of each near-duplicate group
+    order = []
+    seen_groups = set()
+    for index in np.argsort(-scores, kind="stable"):
+        group = metadatas[index].get("duplicate_of") or ids[index]
+        if group not in seen_groups:
+            seen_groups.add(group)
+            order.append(int(index))
+
+    def build_candidate(index: int) -> Dict[str, Any]:
+        metadata = metadatas[index]
+        return {
+            "id": ids[index],
+            "filename": metadata.get("filename", "Unknown"),
+            "name": metadata.get("name", "Unknown"),
+            "location": metadata.get("location", "Unknown"),
+            "experience_years": float(years[index]),
+            "score": float(scores[index]),
+            "semantic_score": float(semantic_scores[index]),
+            "skills_score": float(skills_scores[index]),
+            "experience_score": float(experience_scores[index]),
+            "matched_skills": [
+                term
+                for term in _candidate_terms(metadata)
+                if _normalize_term(term) in job_term_set
+            ],
+        }
+
+    start = (page - 1) * page_size
+    candidates = [build_candidate(index) for index in order[start:start + page_size]]
+
+    summary = None
+    if summarize_top_n:
+        top_n = min(summarize_top_n, settings.MATCH_MAX_SUMMARY_CANDIDATES)
+        summary = _summarize_candidates(
+            job_description, [build_candidate(index) for index in order[:top_n]]
+        )
+
+    logger.info(f"Ranked {len(order)} candidates against {len(job_terms)} job terms")
+    set_span_attributes(**{"documents.count": len(order), "match.job_terms": len(job_terms)})
+
+    return {
+        "total": len(order),
+        "page": page,
+        "page_size": page_size,
+        "candidates": candidates,
+        "summary": summary,
+    }
@@ -0,0 +1,74 @@
+import re
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.core.tracing import set_span_attributes
+from app.infrastructure.bedrock import query_llm as bedrock_query
+from app.infrastructure.openai import query_llm as openai_query
+
+logger = logging.getLogger(__name__)
+
+SMALL_ROUTE = "small"
+LARGE_ROUTE = "large"
+
+# Questions that ask for judgement or synthesis rather than a lookup
+_COMPLEX_HINTS = re.compile(
+    r"\b(why|recommend\w*|compare|contrast|versus|vs|best|most suitable|rank\w*|evaluate|assess|explain|"
+    r"summari[sz]e|pros|cons|strengths?|weakness\w*|fit|trade-?offs?|recomienda\w*|compara\w*|mejor)\b",
+    re.IGNORECASE,
+)
+
+
+def classify_question(question: str, context_chars: int, sub_queries: int = 1) -> str:
+    """
+    Pick the model route for a question from its complexity and context size
+
+    Short lookups over a small context go to the small model; questions that need
+    judgement, span several candidate groups or carry a large context go to the large one.
+
+    Args:
+        question: The recruiter question
+        context_chars: Size of the CV context that will be sent with it
+        sub_queries: Number of sub-queries the question was split into
+
+    Returns:
+        SMALL_ROUTE or LARGE_ROUTE
+    """
+    if not settings.ROUTER_ENABLED:
+        return LARGE_ROUTE
+    if sub_queries > 1 or context_chars > settings.ROUTER_SIMPLE_MAX_CONTEXT_CHARS:
+        return LARGE_ROUTE
+    if len(question.split()) > settings.ROUTER_SIMPLE_MAX_WORDS or _COMPLEX_HINTS.search(question):
+        return LARGE_ROUTE
+    return SMALL_ROUTE
+
+
+def query_routed_llm(prompt: str, route: str, system: Optional[str] = None, context: Optional[str] = None) -> str:
+    """
+    Send a prompt to the active provider using the model and output limit of a route
+
+    Args:
+        prompt: The prompt to send to the LLM
+        route: SMALL_ROUTE or LARGE_ROUTE
+        system: Stable instructions, sent first so providers can cache them
+        context: Context shared by related questions, cached after the instructions
+
+    Returns:
+        The LLM's response
+
+    Raises:
+        AIServiceException: If the LLM query fails
+    """
+    small = route == SMALL_ROUTE
+    max_tokens = settings.ROUTER_SMALL_MAX_TOKENS if small else settings.ROUTER_LARGE_MAX_TOKENS
+    set_span_attributes(**{"llm.route": route})
+
+    if settings.USE_OPENAI:
+        model = settings.OPENAI_SMALL_MODEL if small else settings.OPENAI_MODEL
+        logger.info(f"Using OpenAI {model} ({route} route)")
+        return openai_query(prompt, model=model, max_tokens=max_tokens, route=route, system=system, context=context)
+
+    model_id = settings.BEDROCK_SMALL_MODEL_ID if small else settings.BEDROCK_MODEL_ID
+    logger.info(f"Using Bedrock {model_id} ({route} route)")
+    return bedrock_query(prompt, model_id=model_id, max_tokens=max_tokens, route=route, system=system, context=context)
@@ -0,0 +1,194 @@
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Common spellings and abbreviations mapped to one canonical skill name
+SKILL_ALIASES = {
+    "js": "JavaScript",
+    "javascript": "JavaScript",
+    "ts": "TypeScript",
+    "typescript": "TypeScript",
+    "py": "Python",
+    "python": "Python",
+    "python3": "Python",
+    "golang": "Go",
+    "go": "Go",
+    "k8s": "Kubernetes",
+    "kubernetes": "Kubernetes",
+    "aws": "AWS",
+    "amazon web services": "AWS",
+    "gcp": "GCP",
+    "google cloud": "GCP",
+    "google cloud platform": "GCP",
+    "azure": "Azure",
+    "microsoft azure": "Azure",
+    "postgres": "PostgreSQL",
+    "postgresql": "PostgreSQL",
+    "mongo": "MongoDB",
+    "mongodb": "MongoDB",
+    "mysql": "MySQL",
+    "sql": "SQL",
+    "react": "React",
+    "react.js": "React",
+    "reactjs": "React",
+    "node": "Node.js",
+    "node.js": "Node.js",
+    "nodejs": "Node.js",
+    "ci/cd": "CI/CD",
+    "cicd": "CI/CD",
+    "ml": "Machine Learning",
+    "machine learning": "Machine Learning",
+    "docker": "Docker",
+    "terraform": "Terraform",
+    "java": "Java",
+    "c#": "C#",
+    "c++": "C++",
+}
+
+MAX_SUMMARY_CHARS = 300
+MAX_PROFILE_SKILLS = 20
+MAX_TIMELINE_ROLES = 6
+
+_YEAR = re.compile(r"(19|20)\d{2}")
+_MONTH_YEAR = re.compile(r"((19|20)\d{2})[-/.](\d{1,2})\b|\b(\d{1,2})[-/.]((19|20)\d{2})")
+_PRESENT = re.compile(r"\b(present|presente|current|now|actualidad|actual)\b", re.IGNORECASE)
+
+
+def canonicalize_skills(skills: List[str]) -> List[str]:
+    """
+    Map skills to canonical names and drop case-insensitive duplicates
+
+    Args:
+        skills: Skills as extracted from the CV
+
+    Returns:
+        Canonical skills in their original order
+    """
+    canonical = {}
+    for skill in skills or []:
+        if not isinstance(skill, str):
+            continue
+        cleaned = " ".join(skill.strip().split())
+        if not cleaned:
+            continue
+        name = SKILL_ALIASES.get(cleaned.lower(), cleaned)
+        canonical.setdefault(name.lower(), name)
+    return list(canonical.values())
+
+
+def normalize_date(value: Any) -> Optional[str]:
+    """
+    Normalize a free-form date to YYYY-MM, YYYY or "present"
+
+    Args:
+        value: Date as extracted from the CV
+
+    Returns:
+        Normalized date, or None if no date could be recognised
+    """
+    if value is None:
+        return None
+    text = str(value)
+    if _PRESENT.search(text):
+        return "present"
+    match = _MONTH_YEAR.search(text)
+    if match:
+        year, month = (match.group(1), match.group(3)) if match.group(1) else (match.group(5), match.group(4))
+        if 1 <= int(month) <= 12:
+            return f"{year}-{int(month):02d}"
+    match = _YEAR.search(text)
+    return match.group(0) if match else None
+
+
+def normalize_timeline(timeline: Any) -> List[Dict[str, Optional[str]]]:
+    """
+    Normalize extracted roles into a timeline sorted from most recent
+
+    Args:
+        timeline: List of role dictionaries with title, company, start and end
+
+    Returns:
+        List of roles with normalized dates
+    """
+    roles = []
+    for role in timeline if isinstance(timeline, list) else []:
+        if not isinstance(role, dict) or not role.get("title"):
+            continue
+        roles.append({
+            "title": str(role["title"]).strip(),
+            "company": str(role.get("company") or "").strip() or None,
+            "start": normalize_date(role.get("start")),
+            "end": normalize_date(role.get("end")),
+        })
+
+    # "present" sorts after any year, so current roles come first
+    roles.sort(key=lambda role: (role["end"] or role["start"] or ""), reverse=True)
+    return roles[:MAX_TIMELINE_ROLES]
+
+
+def flatten_education(education: Any) -> str:
+    """
+    Flatten extracted education entries into one line
+
+    Args:
+        education: A string, or a list of strings or dictionaries (degree, institution, ...)
+
+    Returns:
+        Entries joined with "; ", the fields of each with ", "
+    """
+    if isinstance(education, list):
+        return "; ".join(
+            ", ".join(str(value) for value in item.values() if value) if isinstance(item, dict) else str(item)
+            for item in education
+        )
+    return str(education or "")
+
+
+def build_profile(metadata: Dict[str, Any]) -> str:
+    """
+    Build the compact candidate profile that is sent to the LLM at question time
+
+    Args:
+        metadata: Extracted CV metadata, including the optional summary and timeline
+
+    Returns:
+        Dense, normalized profile text
+    """
+    header = [metadata.get("name") or "Unknown"]
+    if metadata.get("location") and metadata["location"] != "Unknown":
+        header.append(metadata["location"])
+    header.append(f"{metadata.get('experience_years') or 0} yrs")
+
+    lines = [" | ".join(str(part) for part in header)]
+
+    summary = " ".join(str(metadata.get("summary") or "").split())
+    if summary:
+        if len(summary) > MAX_SUMMARY_CHARS:
+            summary = summary[:MAX_SUMMARY_CHARS].rsplit(" ", 1)[0] + "..."
+        lines.append(f"Summary: {summary}")
+
+    skills = canonicalize_skills(metadata.get("skills", []))[:MAX_PROFILE_SKILLS]
+    if skills:
+        lines.append(f"Skills: {', '.join(skills)}")
+
+    languages = [language for language in metadata.get("languages") or [] if isinstance(language, str)]
+    if languages:
+        lines.append(f"Languages: {', '.join(languages)}")
+
+    roles = []
+    for role in normalize_timeline(metadata.get("timeline")):
+        period = f"{role['start'] or '?'} to {role['end'] or '?'}"
+        company = f" @ {role['company']}" if role["company"] else ""
+        roles.append(f"{period} {role['title']}{company}")
+    if roles:
+        lines.append(f"Roles: {'; '.join(roles)}")
+    elif metadata.get("job_titles"):
+        lines.append(f"Roles: {', '.join(metadata['job_titles'])}")
+
+    education = flatten_education(metadata.get("education"))
+    if education:
+        lines.append(f"Education: {education}")
+
+    return "\n".join(lines)
@@ -0,0 +1,163 @@
+import re
+import json
+import logging
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.model_router import SMALL_ROUTE, query_routed_llm
+
+logger = logging.getLogger(__name__)
+
+_COMPARE_PREFIX = re.compile(r"^\s*(please\s+)?(compare|contrast)\s+(the\s+)?", re.IGNORECASE)
+# "to" and "against" only ever separate the compared groups; "with" and "and" also join a
+# group's own conditions ("developers with Kubernetes skills"), so they are only trusted alone
+_COMPARE_SPLIT = re.compile(r"\s+(?:against|to)\s+(?:the\s+)?", re.IGNORECASE)
+_COMPARE_WEAK_SPLIT = re.compile(r"\s+(?:with|and)\s+(?:the\s+)?", re.IGNORECASE)
+_VERSUS_SPLIT = re.compile(r"\s+(?:vs\.?|versus)\s+", re.IGNORECASE)
+
+# "those in Bogotá": the second side of a comparison refers back to the first side's subject
+_BACK_REFERENCE = re.compile(r"^(?:those|the ones|ones|people|candidates)\b\s*", re.IGNORECASE)
+
+# Where the subject of a side ends and its conditions start ("Java developers | in Lima")
+_CONDITION_START = re.compile(
+    r"\s+(?:in|from|with|who|that|based|living|having|en|de|con|que)\b|\s+\d+\+?\s+years\b", re.IGNORECASE
+)
+
+# A constraint of its own, e.g. "in Lima", "from Bogotá", "with 5 years"
+_CONSTRAINT = re.compile(r"\b(?:in|from|en|de|based in|living in)\s+[A-ZÁÉÍÓÚÑ][\w\-áéíóúñ]+|\b\d+\+?\s+years\b")
+
+# Signals that a question may be compound even when the heuristics found one part
+_COMPOUND_HINTS = re.compile(r"\b(compare|contrast|versus|both|each|respectively|difference|while|whereas)\b", re.IGNORECASE)
+
+
+def _clean(part: str) -> str:
+    return part.strip(" ?.,;")
+
+
+def _carry_predicate(first: str, second: str) -> str:
+    """
+    Make the second side of a comparison a query of its own
+
+    "who knows Java vs Python" compares two values of one predicate, so the
+    lone second value becomes "who knows Python"; "Java developers in Lima with
+    those in Bogotá" refers back to the first side's subject, which becomes "Java
+    developers in Bogotá". A second side of several words is a query already.
+    """
+    reference = _BACK_REFERENCE.match(second)
+    if reference:
+        condition = _CONDITION_START.search(first)
+        subject = first[:condition.start()] if condition else first
+        return f"{subject} {second[reference.end():]}".strip()
+
+    first_words = first.split()
+    if len(second.split()) == 1 and len(first_words) > 1:
+        return " ".join(first_words[:-1] + [second])
+    return second
+
+
+def _compare_splits(body: str, separator: re.Pattern) -> List[List[str]]:
+    """Every way of splitting a comparison body at one separator into two non-empty sides"""
+    splits = [
+        [_clean(body[:match.start()]), _clean(body[match.end():])]
+        for match in separator.finditer(body)
+    ]
+    return [parts for parts in splits if all(parts)]
+
+
+def _split_heuristic(question: str) -> Optional[List[str]]:
+    """
+    Split a question comparing different groups of candidates with cheap pattern rules
+
+    Only comparisons ("compare ... with ...", "... versus ...") are split, and each
+    side keeps the predicate it shares with the other. Conditions joined by "and"
+    ("who lives in Lima and has 5 years of experience?") must hold together, so
+    they stay in one query.
+
+    Returns:
+        The sub-queries, a single-element list when the question is not compound,
+        or None for a comparison whose sides the rules cannot tell apart
+    """
+    # "compare senior developers with Kubernetes skills to junior developers"
+    if _COMPARE_PREFIX.match(question):
+        body = _COMPARE_PREFIX.sub("", question, count=1)
+        splits = _compare_splits(body, _COMPARE_SPLIT) or _compare_splits(body, _COMPARE_WEAK_SPLIT)
+
+        # With several candidate separators, only trust the one that leaves a constraint on each
+        # side ("the Java developers in Lima with the Python developers in Bogotá"), preferring a
+        # second side that refers back to the first ("... with those with 3 years")
+        if len(splits) > 1:
+            splits = [
+                parts for parts in splits if _CONSTRAINT.search(parts[0]) and _CONSTRAINT.search(parts[1])
+            ]
+            if len(splits) > 1:
+                splits = [parts for parts in splits if _BACK_REFERENCE.match(parts[1])]
+        if len(splits) != 1:
+            return None
+        first, second = splits[0]
+        return [first, _carry_predicate(first, second)]
+
+    # "Java developers in Lima vs Python developers in Bogotá", "who knows Java versus Python"
+    parts = [_clean(part) for part in _VERSUS_SPLIT.split(question)]
+    if len(parts) > 1 and all(parts):
+        return [parts[0]] + [_carry_predicate(parts[0], part) for part in parts[1:]]
+
+    return [question]
+
+
+def _split_with_llm(question: str) -> List[str]:
+    """Ask the LLM to decompose a question into independent search queries"""
+    prompt = f"""
+    Split the following recruiter question into independent search queries, one per
+    group of candidates it compares. Conditions that must hold together (e.g. "lives in
+    Lima and has 5 years of experience") describe one group and stay in one query. Each
+    query must make sense on its own. If it only asks about one group, return it unchanged.
+    Return only a JSON array of strings with at most {settings.QUERY_MAX_SUBQUERIES} items.
+
+    Question: {question}
+    """
+
+    try:
+        # Splitting a question is a simple task, so it always uses the small model
+        answer = query_routed_llm(prompt, SMALL_ROUTE)
+        start, end = answer.find("["), answer.rfind("]") + 1
+        parts = json.loads(answer[start:end]) if start >= 0 and end > start else []
+        parts = [_clean(part) for part in parts if isinstance(part, str) and _clean(part)]
+        return parts or [question]
+
+    except Exception as e:
+        # Planning is an optimization; fall back to a single retrieval
+        logger.warning(f"LLM query planning failed, using the question as is: {str(e)}")
+        return [question]
+
+
+def plan_queries(question: str) -> List[str]:
+    """
+    Decompose a question into the sub-queries to retrieve candidates for
+
+    Pattern rules run first; the LLM is consulted for comparisons the rules find
+    ambiguous, and for long questions that look compound but that the rules
+    could not split. Without the LLM, an ambiguous comparison is searched whole
+    rather than split at a guess.
+
+    Args:
+        question: The recruiter question
+
+    Returns:
+        Unique sub-queries, at most QUERY_MAX_SUBQUERIES of them
+    """
+    parts = _split_heuristic(question)
+
+    if parts is None:
+        parts = _split_with_llm(question) if settings.QUERY_PLANNER_USE_LLM else [question]
+    elif (
+        len(parts) == 1
+        and settings.QUERY_PLANNER_USE_LLM
+        and len(question.split()) >= settings.QUERY_PLANNER_LLM_MIN_WORDS
+        and _COMPOUND_HINTS.search(question)
+    ):
+        parts = _split_with_llm(question)
+
+    parts = list(dict.fromkeys(parts))[:settings.QUERY_MAX_SUBQUERIES]
+    if len(parts) > 1:
+        logger.info(f"Split question into {len(parts)} sub-queries: {parts}")
+    return parts
@@ -1,19 +1,107 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
 
 from app.core.config import settings
-from app.core.exceptions import AIServiceException
-from app.infrastructure.vector_db import query_documents
-from app.infrastructure.bedrock import query_llm as bedrock_query
-from app.infrastructure.openai import query_llm as openai_query
+from app.core.exceptions import AIServiceException, ProviderBusyException
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import traced, set_span_attributes, current_context, use_context
+from app.infrastructure.vector_db import query_documents, get_document_text
+from app.services.model_router import classify_question, query_routed_llm
+from app.services.query_planner import plan_queries
+from app.services.session_store import Session, is_follow_up, refers_to_candidates, filter_candidates
 
 logger = logging.getLogger(__name__)
 
-def process_question(question: str) -> str:
+# Identical for every question, so it is sent first where providers can cache it
+ANSWER_INSTRUCTIONS = """
+You are an AI assistant for a Human Resources department. Answer the following question 
+about job candidates based ONLY on the CV information provided below. If the information 
+needed to answer the question is not in the provided CVs, say that you don't have that 
+information. Always cite the specific candidates by name in your answer.
+"""
+
+# Shared by all requests, so several compound questions can retrieve at the same time
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=settings.QUERY_MAX_SUBQUERIES * 4, thread_name_prefix="retrieval"
+)
+
+def _merge_results(results_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the results of several sub-queries into a single query result
+    
+    Hits are interleaved round-robin so every sub-query is represented, and
+    documents (or duplicate groups) found by more than one sub-query appear once.
+    
+    Args:
+        results_list: ChromaDB query results, one per sub-query
+        
+    Returns:
+        Query results in the ChromaDB shape for a single query
+    """
+    merged = {"ids": [[]], "metadatas": [[]], "distances": [[]]}
+    seen = set()
+    depth = max(len(results["ids"][0]) for results in results_list)
+    for rank in range(depth):
+        for results in results_list:
+            if rank >= len(results["ids"][0]):
+                continue
+            doc_id = results["ids"][0][rank]
+            metadata = results["metadatas"][0][rank]
+            group = metadata.get("duplicate_of") or doc_id
+            if group in seen:
+                continue
+            seen.add(group)
+            merged["ids"][0].append(doc_id)
+            merged["metadatas"][0].append(metadata)
+            merged["distances"][0].append(results["distances"][0][rank])
+    return merged
+
+def retrieve_candidates(
+    question: str, sub_queries: Optional[List[str]] = None, tenants: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Retrieve the candidates for a question, splitting compound questions into
+    sub-queries that run concurrently against the vector database
+    
+    Args:
+        question: The question to retrieve candidates for
+        sub_queries: The question's sub-queries, planned here when not given
+        tenants: Tenants to search, or None for the shared collection
+        
+    Returns:
+        Query results in the ChromaDB shape for a single query
+    """
+    sub_queries = sub_queries or plan_queries(question)
+    set_span_attributes(**{"question.sub_queries": len(sub_queries)})
+    
+    if len(sub_queries) == 1:
+        return query_documents(question, n_results=3, tenants=tenants)
+    
+    # Run the sub-queries in parallel so the total latency is about one retrieval round
+    context = current_context()
+    
+    def run(sub_query: str) -> Dict[str, Any]:
+        with use_context(context):
+            return query_documents(sub_query, n_results=settings.QUERY_RESULTS_PER_SUBQUERY, tenants=tenants)
+    
+    return _merge_results(list(_retrieval_pool.map(run, sub_queries)))
+
+@traced("process_question")
+def process_question(
+    question: str, session: Optional[Session] = None, tenants: Optional[Sequence[str]] = None
+) -> str:
     """
     Process a question about CVs and generate an answer
     
+    Within a session, follow-up questions ("and which of them speaks French?") are
+    answered over the previous candidates, narrowed locally, without a new search;
+    follow-ups the previous candidates cannot answer get a new search.
+    
     Args:
         question: The question to answer
+        session: Conversation the question belongs to, if any
+        tenants: Tenants whose CVs to search, or None for the shared collection
         
     Returns:
         The answer to the question
@@ -21,20 +109,49 @@ def process_question(question: str) -> str:
     Raises:
         AIServiceException: If processing fails
     """
+    if session is not None:
+        with session.lock:
+            return _answer(question, session, tenants)
+    return _answer(question, tenants=tenants)
+
+def _answer(question: str, session: Optional[Session] = None, tenants: Optional[Sequence[str]] = None) -> str:
+    """Answer a question, reusing the session's candidates for follow-ups"""
     logger.info(f"Processing question: {question}")
+    set_span_attributes(**{"question.chars": len(question)})
     
-    # Query the vector database
-    results = query_documents(question, n_results=3)
+    # A follow-up is answered over the previous candidates when it narrows them down, or when it
+    # explicitly asks about them ("which of them has the most experience?"); otherwise it gets a new search
+    results = None
+    if session and session.candidates and is_follow_up(question):
+        results = filter_candidates(question, session.candidates)
+        if results is None and refers_to_candidates(question):
+            results = session.candidates
+    if session is not None:
+        record_cache_lookup("session_candidates", results is not None)
+    
+    if results is not None:
+        sub_queries = [question]
+        set_span_attributes(**{"question.follow_up": True})
+    else:
+        # Query the vector database
+        sub_queries = plan_queries(question)
+        results = retrieve_candidates(question, sub_queries, tenants)
     
     if not results["ids"][0]:
         logger.warning("No CV data found to answer the question")
         return "No CV data is available. Please upload CVs to the system first."
     
-    # Prepare CV data for the LLM
+    # Prepare CV data for the LLM, most relevant first; follow-ups reuse the session's
+    # candidates in the same order, so their context is still an identical prefix
     cv_context = ""
-    for i, doc_id in enumerate(results["ids"][0]):
-        metadata = results["metadatas"][0][i]
+    for doc_id, metadata in zip(results["ids"][0], results["metadatas"][0]):
         cv_context += f"CV ID: {doc_id}\n"
+        
+        # Prefer the compact profile built at ingestion; CVs indexed before profiles existed fall back to raw fields
+        if metadata.get("profile"):
+            cv_context += f"{metadata['profile']}\n\n"
+            continue
+        
         cv_context += f"Name: {metadata.get('name', 'Unknown')}\n"
         cv_context += f"Location: {metadata.get('location', 'Unknown')}\n"
         cv_context += f"Skills: {metadata.get('skills', 'Not specified')}\n"
@@ -42,33 +159,33 @@ def process_question(question: str) -> str:
         cv_context += f"Experience: {metadata.get('experience_years', 0)} years\n"
         cv_context += f"Job Titles: {metadata.get('job_titles', 'Not specified')}\n"
         cv_context += f"Education: {metadata.get('education', 'Not specified')}\n"
-        cv_context += f"Content Preview: {results['documents'][0][i][:500]}...\n\n"
-    
-    # Create the prompt for the LLM
-    prompt = f"""
-    You are an AI assistant for a Human Resources department. Answer the following question 
-    about job candidates based ONLY on the CV information provided below. If the information 
-    needed to answer the question is not in the provided CVs, say that you don't have that 
-    information. Always cite the specific candidates by name in your answer.
+        content = get_document_text(doc_id, metadata, metadata.get("tenant")) or ""
+        cv_context += f"Content Preview: {content[:500]}...\n\n"
     
-    CV Information:
-    {cv_context}
-    
-    Question: {question}
-    """
+    # Create the prompt for the LLM: stable instructions, then the candidates, then the question
+    context = f"CV Information:\n{cv_context}"
+    prompt = f"Question: {question}"
+    history = session.history() if session is not None else ""
+    if history:
+        prompt = f"Conversation so far:\n{history}\n\n{prompt}"
+    set_span_attributes(**{
+        "documents.count": len(results["ids"][0]),
+        "prompt.chars": len(ANSWER_INSTRUCTIONS) + len(context) + len(prompt),
+    })
     
     try:
-        # Query the appropriate LLM
-        if settings.USE_OPENAI:
-            logger.info("Using OpenAI for question answering")
-            answer = openai_query(prompt)
-        else:
-            logger.info("Using Bedrock for question answering")
-            answer = bedrock_query(prompt)
+        # Simple lookups go to the small model, harder questions to the large one
+        route = classify_question(question, len(cv_context), len(sub_queries))
+        answer = query_routed_llm(prompt, route, system=ANSWER_INSTRUCTIONS, context=context)
+        
+        if session is not None:
+            session.record_turn(question, answer, results)
         
         logger.info("Successfully generated answer")
         return answer
     
+    except ProviderBusyException:
+        raise
     except Exception as e:
         error_message = f"Error processing question: {str(e)}"
         logger.error(error_message)
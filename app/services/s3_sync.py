@@ -0,0 +1,322 @@
+"""
+Change-data-capture sync from the S3 bucket into the index
+
+Usage:
+    python -m app.services.s3_sync          # sync every S3_SYNC_INTERVAL_SECONDS
+    python -m app.services.s3_sync --once   # run a single pass and print its counts
+"""
+import io
+import os
+import uuid
+import json
+import fcntl
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import UploadFile
+
+from app.core.admission import INGESTION, lane
+from app.core.config import settings
+from app.core.metrics import S3_SYNC_OBJECTS, track_stage
+from app.infrastructure.s3 import list_objects, get_object_metadata, download_bytes_from_s3
+from app.infrastructure.vector_db import (
+    parse_tenants,
+    list_tenants,
+    find_document_by_source,
+    get_document_sources,
+    set_document_source,
+)
+from app.services.cv_processor import process_cv_file, remove_cv
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("added", "updated", "deleted", "linked", "skipped", "failed")
+
+# Save the checkpoint every this many objects, so an interrupted pass does not start over
+_CHECKPOINT_EVERY = 50
+
+
+def _valid_tenant(value: Optional[str]) -> Optional[str]:
+    """A tenant ID read from S3, or None if it is missing or not valid"""
+    try:
+        return parse_tenants(value)[0]
+    except (ValueError, IndexError):
+        return None
+
+
+def source_doc_id(key: str) -> str:
+    """Document ID of a CV first indexed from an S3 object, the same on every host"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"s3://{settings.S3_BUCKET_NAME}/{key}"))
+
+
+class S3SyncWorker:
+    """
+    Keeps the index in step with the CVs in the S3 bucket
+
+    Each pass lists the bucket under a prefix and compares every object's ETag
+    with a checkpoint of the objects already synced. New and changed CVs go
+    through the same pipeline as uploads, a bounded number at a time and in the
+    ingestion lane; CVs whose object is gone are removed from the index, unless
+    another object still holds them as a near-duplicate.
+
+    The index is the source of truth: every synced CV records its S3 key and
+    ETag in its metadata, and CVs uploaded through the API, which carry their
+    document ID in the object metadata, are linked to their object rather than
+    indexed again. The checkpoint, a JSON file mapping each key to its ETag,
+    document ID and tenant, only saves looking objects up; it is rebuilt from
+    the index when missing, e.g. after a container restart. Objects new to the
+    index get a document ID derived from their key, so passes running on
+    several hosts at once store them under the same ID rather than twice.
+    A lock file next to the checkpoint lets only one process per host sync at a
+    time, however many API workers run.
+    """
+
+    def __init__(self, state_path: str, prefix: str = "", concurrency: int = 4):
+        self.state_path = state_path
+        self.prefix = prefix
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="s3-sync")
+
+    def _is_cv(self, key: str) -> bool:
+        return key.lower().endswith(".pdf")
+
+    def _tenant_of(self, key: str) -> Optional[str]:
+        """Tenant named by the first path segment after the prefix, when S3_SYNC_TENANT_FROM_KEY is set"""
+        if not settings.S3_SYNC_TENANT_FROM_KEY:
+            return None
+        segment, separator, _ = key[len(self.prefix):].partition("/")
+        return _valid_tenant(segment) if separator else None
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the sync lock if no other process does; yields whether it was acquired"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        with open(f"{self.state_path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as file:
+                return json.load(file)
+
+        # No checkpoint on this host yet: start from what the index says was synced
+        state = {
+            key: entry
+            for key, entry in get_document_sources(list_tenants()).items()
+            if key.startswith(self.prefix)
+        }
+        if state:
+            logger.info(f"Rebuilt the S3 sync checkpoint from {len(state)} indexed objects")
+        return state
+
+    def _save_state(self, state: Dict[str, Dict[str, Any]]):
+        # Write a new file and swap it in, so a crash never leaves a truncated checkpoint
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(state, file)
+        os.replace(temp_path, self.state_path)
+
+    def _ingest(self, key: str, summary: Dict, previous: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Index a new or changed object
+
+        Returns:
+            The action taken and the object's checkpoint entry
+        """
+        # An object already indexed stays with its tenant
+        etag = summary["ETag"]
+        tenant = previous.get("tenant") if previous and previous.get("doc_id") else self._tenant_of(key)
+        entry = {
+            "etag": etag,
+            "last_modified": summary["LastModified"].isoformat(),
+        }
+
+        # This version may already be indexed, by another host or before the checkpoint was lost
+        indexed = find_document_by_source(key, tenant)
+        if indexed and indexed[1].get("source_etag") == etag:
+            return "linked", dict(entry, doc_id=indexed[0], tenant=tenant)
+
+        # CVs uploaded through the API are already indexed, in the tenant they were uploaded to,
+        # and from now on tracked by their key
+        uploaded = {} if indexed else get_object_metadata(key)
+        uploaded_id = uploaded.get("doc-id")
+        if uploaded_id:
+            tenant = _valid_tenant(uploaded.get("tenant"))
+            if set_document_source(uploaded_id, key, etag, tenant):
+                return "linked", dict(entry, doc_id=uploaded_id, tenant=tenant)
+        entry["tenant"] = tenant
+
+        # A changed object replaces the CV indexed from its previous version
+        previous_id = indexed[0] if indexed else None
+        doc_id = previous_id or uploaded_id or source_doc_id(key)
+        with lane(INGESTION):
+            data = download_bytes_from_s3(key)
+            file = UploadFile(io.BytesIO(data), filename=os.path.basename(key))
+            stored_id = process_cv_file(file, tenant, doc_id=doc_id, source_key=key, source_etag=etag)
+
+        # The new version was skipped or merged into another CV as a duplicate, so its old version goes away
+        if previous_id and stored_id != previous_id:
+            remove_cv(previous_id, tenant)
+        if stored_id is None:
+            return "skipped", dict(entry, doc_id=None)
+        return ("updated" if previous_id else "added"), dict(entry, doc_id=stored_id)
+
+    def _delete(self, key: str, entry: Dict[str, Any], state: Dict[str, Dict[str, Any]], listed: Dict[str, Dict]):
+        """
+        Remove the CV indexed from a deleted object, if it is still the one it came from
+
+        Near-duplicate objects share one document: in merge mode it records only
+        the object merged last, and in skip mode the skipped copies are not
+        indexed at all. When another object still held in the document exists,
+        the document is handed over to it instead of removed; otherwise the
+        checkpoints of the skipped objects of the tenant are reset, so the next
+        pass indexes the copies whose original is gone (the others are skipped
+        again, before any extraction).
+        """
+        tenant = entry.get("tenant")
+        indexed = find_document_by_source(key, tenant)
+        if indexed:
+            doc_id = indexed[0]
+            holders = [
+                other for other, other_entry in state.items()
+                if other in listed and other_entry.get("doc_id") == doc_id and other_entry.get("tenant") == tenant
+            ]
+            if holders and set_document_source(doc_id, holders[0], state[holders[0]]["etag"], tenant):
+                logger.info(f"Object {key} was deleted from S3, its CV is now indexed from {holders[0]}")
+                return
+
+            remove_cv(doc_id, tenant)
+            for other, other_entry in state.items():
+                if other in listed and other_entry.get("doc_id") is None and other_entry.get("tenant") == tenant:
+                    state[other] = dict(other_entry, etag=None)
+        logger.info(f"Object {key} was deleted from S3")
+
+    def sync_once(self) -> Optional[Dict[str, int]]:
+        """
+        Run one sync pass
+
+        Returns:
+            Number of objects per action, or None if another process is syncing
+
+        Raises:
+            S3DownloadException: If the bucket cannot be listed
+        """
+        with self._exclusive() as acquired:
+            if not acquired:
+                logger.debug("Another process is syncing S3, skipping this pass")
+                return None
+
+            counts = dict.fromkeys(ACTIONS, 0)
+            with track_stage("s3_sync"):
+                state = self._load_state()
+                listed = {
+                    summary["Key"]: summary
+                    for summary in list_objects(self.prefix)
+                    if self._is_cv(summary["Key"])
+                }
+                changed = [key for key, summary in listed.items() if state.get(key, {}).get("etag") != summary["ETag"]]
+
+                try:
+                    futures = {
+                        self._pool.submit(self._ingest, key, listed[key], state.get(key)): key
+                        for key in changed
+                    }
+                    for done, future in enumerate(as_completed(futures), start=1):
+                        key = futures[future]
+                        try:
+                            action, state[key] = future.result()
+                        except Exception as e:
+                            # Left out of the checkpoint, so the next pass retries it
+                            action = "failed"
+                            logger.error(f"Error syncing S3 object {key}: {str(e)}")
+                        counts[action] += 1
+                        if done % _CHECKPOINT_EVERY == 0:
+                            self._save_state(state)
+
+                    if settings.S3_SYNC_DELETE:
+                        gone = [key for key in state if key.startswith(self.prefix) and key not in listed]
+                        for key in gone:
+                            entry = state.pop(key)
+                            try:
+                                self._delete(key, entry, state, listed)
+                                counts["deleted"] += 1
+                            except Exception as e:
+                                state[key] = entry
+                                counts["failed"] += 1
+                                logger.error(f"Error removing deleted S3 object {key}: {str(e)}")
+                finally:
+                    self._save_state(state)
+
+            for action, count in counts.items():
+                if count:
+                    S3_SYNC_OBJECTS.labels(action=action).inc(count)
+            if any(counts.values()):
+                logger.info(f"S3 sync pass over {len(listed)} objects: {counts}")
+            return counts
+
+    def run(self, stop: threading.Event, interval: float):
+        """Sync every interval seconds until stop is set"""
+        while not stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                logger.error(f"S3 sync pass failed: {str(e)}")
+            stop.wait(interval)
+
+
+def create_worker() -> S3SyncWorker:
+    """Create a sync worker from the S3_SYNC_* settings"""
+    return S3SyncWorker(settings.S3_SYNC_STATE_PATH, settings.S3_SYNC_PREFIX, settings.S3_SYNC_CONCURRENCY)
+
+
+_stop = threading.Event()
+
+
+def start_background_sync() -> threading.Thread:
+    """Run the sync worker in a daemon thread of the current process"""
+    _stop.clear()
+    thread = threading.Thread(
+        target=create_worker().run,
+        args=(_stop, settings.S3_SYNC_INTERVAL_SECONDS),
+        name="s3-sync",
+        daemon=True,
+    )
+    thread.start()
+    logger.info(f"S3 sync started for s3://{settings.S3_BUCKET_NAME}/{settings.S3_SYNC_PREFIX}")
+    return thread
+
+
+def stop_background_sync():
+    """Ask the background sync to stop after its current pass"""
+    _stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync CVs from the S3 bucket into the index")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and print its counts")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    worker = create_worker()
+    if args.once:
+        print(json.dumps(worker.sync_once()))
+        return
+    try:
+        worker.run(threading.Event(), settings.S3_SYNC_INTERVAL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.infrastructure.vector_db import load_session_state, save_session_state, purge_session_states
+from app.services.profile_builder import SKILL_ALIASES
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[\w#+.]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Follow-ups open the question: with a conjunction continuing the previous one ("and who knows Go?")...
+_CONTINUATION = re.compile(r"^\s*(and|also|what about|how about|y|tambi[eé]n|qu[eé] tal)\b", re.IGNORECASE)
+
+# ...or by pointing at the previous candidates ("which of them", "those in Lima"); pronouns later in
+# the question ("who lists AWS among their skills?") usually refer to something else
+_REFERENCE = re.compile(
+    r"^\s*(?:\S+\s+){0,3}?(of|among|de|entre)\s+(them|those|these|ellos|ellas|estos|estas|esos|esas)\b|"
+    r"^\s*(?:and\s+|y\s+)?(they|those|these|ellos|ellas|estos|estas)\b",
+    re.IGNORECASE,
+)
+
+# Metadata fields a follow-up can narrow the previous candidates by
+_FILTER_FIELDS = ("skills", "languages", "location", "job_titles", "name")
+
+# Function words and follow-up cues never narrow the candidates, even when a title or name
+# contains them ("Head of Engineering")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "from", "with", "by", "as",
+    "is", "are", "has", "have", "who", "which", "what", "whom", "whose", "them", "those", "these",
+    "they", "their", "any", "also", "about", "how", "among", "speaks", "speak", "knows", "know",
+    "lives", "live", "works", "work", "y", "o", "de", "del", "la", "el", "los", "las", "en", "con",
+    "que", "quien", "quién", "quienes", "quiénes", "cual", "cuál", "cuales", "cuáles", "ellos",
+    "ellas", "estos", "estas", "esos", "esas", "entre", "habla", "sabe", "vive", "también",
+}
+
+
+class Session:
+    """A recruiter conversation: the current shortlist and a bounded history"""
+
+    def __init__(self, session_id: str, tenants: Tuple[str, ...] = ()):
+        self.id = session_id
+        self.tenants = tenants
+        self.candidates: Optional[Dict[str, Any]] = None
+        self.turns: List[Dict[str, str]] = []
+        self.summary = ""
+        self.lock = threading.Lock()
+        self.touched = time.monotonic()
+
+    def record_turn(self, question: str, answer: str, candidates: Dict[str, Any]):
+        """
+        Store a question, its answer and the candidates it was answered over
+
+        Turns beyond SESSION_HISTORY_TURNS are folded into the summary, which keeps
+        the first sentence of each answer and drops its oldest text once it grows
+        past SESSION_SUMMARY_MAX_CHARS.
+        """
+        self.candidates = candidates
+        self.turns.append({"question": question, "answer": answer})
+        while len(self.turns) > settings.SESSION_HISTORY_TURNS:
+            turn = self.turns.pop(0)
+            first_sentence = _SENTENCE_END.split(" ".join(turn["answer"].split()), 1)[0]
+            self.summary = f"{self.summary} Q: {turn['question']} A: {first_sentence}".strip()
+        if len(self.summary) > settings.SESSION_SUMMARY_MAX_CHARS:
+            self.summary = "..." + self.summary[-settings.SESSION_SUMMARY_MAX_CHARS:]
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serializable state of the session, for stores shared between workers"""
+        return {"tenants": list(self.tenants), "candidates": self.candidates, "turns": self.turns, "summary": self.summary}
+
+    @classmethod
+    def from_state(cls, session_id: str, state: Dict[str, Any]) -> "Session":
+        """Restore a session saved with to_state"""
+        session = cls(session_id, tuple(state.get("tenants") or ()))
+        session.candidates = state.get("candidates")
+        session.turns = state.get("turns") or []
+        session.summary = state.get("summary") or ""
+        return session
+
+    def history(self) -> str:
+        """Render the conversation so far for the prompt"""
+        lines = [f"Earlier: {self.summary}"] if self.summary else []
+        limit = settings.SESSION_ANSWER_MAX_CHARS
+        for turn in self.turns:
+            answer = turn["answer"] if len(turn["answer"]) <= limit else turn["answer"][:limit] + "..."
+            lines.append(f"Q: {turn['question']}\nA: {answer}")
+        return "\n".join(lines)
+
+
+class SessionStore:
+    """Bounded in-memory session store with least-recently-used and TTL eviction"""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        # Sessions are kept in access order, so expired ones are at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.touched <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get_or_create(self, session_id: Optional[str] = None, tenants: Sequence[str] = ()) -> Session:
+        """
+        Get a live session, or start a new one if the ID is missing, unknown or expired
+
+        A session only continues for the tenants it was started for, so its
+        candidates never leak into another tenant's conversation.
+
+        Args:
+            session_id: ID returned by a previous answer
+            tenants: Tenants the question is asked for
+
+        Returns:
+            The session
+        """
+        tenants = tuple(tenants)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and session.tenants != tenants:
+                session = None
+            if session_id:
+                record_cache_lookup("sessions", session is not None)
+            if session is None:
+                session = Session(uuid.uuid4().hex, tenants)
+                self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            session.touched = now
+            self._evict(now)
+        return session
+
+    def save(self, session: Session):
+        """Sessions live in this store already, so there is nothing to write back"""
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SharedSessionStore:
+    """
+    Session store in the vector database, so that every worker continues the same conversation
+
+    Each request works on its own copy of the session, which is written back
+    after the answer; two concurrent questions in one session keep the last
+    answer's state. Sessions unused for ttl_seconds expire and are purged.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._purged = 0.0
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str] = None, tenants: Sequence[str] = ()) -> Session:
+        """
+        Get a stored session, or start a new one if the ID is missing, unknown or expired
+
+        Args:
+            session_id: ID returned by a previous answer
+            tenants: Tenants the question is asked for
+
+        Returns:
+            The session
+        """
+        tenants = tuple(tenants)
+        session = None
+        if session_id:
+            record = load_session_state(session_id)
+            if record is not None and time.time() - record[1] <= self.ttl_seconds:
+                session = Session.from_state(session_id, json.loads(record[0]))
+                if session.tenants != tenants:
+                    session = None
+            record_cache_lookup("sessions", session is not None)
+        return session or Session(uuid.uuid4().hex, tenants)
+
+    def save(self, session: Session):
+        """Write a session back after a question, and purge expired sessions now and then"""
+        now = time.time()
+        # Distances may come back as numpy floats
+        save_session_state(session.id, json.dumps(session.to_state(), default=float), now)
+
+        with self._lock:
+            purge = now - self._purged > min(self.ttl_seconds, 60)
+            if purge:
+                self._purged = now
+        if purge:
+            purge_session_states(now - self.ttl_seconds)
+
+
+if settings.SESSION_STORE == "vector_db":
+    _store = SharedSessionStore(settings.SESSION_TTL_SECONDS)
+else:
+    _store = SessionStore(settings.SESSION_MAX_SESSIONS, settings.SESSION_TTL_SECONDS)
+
+
+def get_session(session_id: Optional[str] = None, tenants: Sequence[str] = ()) -> Session:
+    """Get or start a session in the configured store"""
+    return _store.get_or_create(session_id, tenants)
+
+
+def save_session(session: Session):
+    """Write a session back to the configured store after it answered a question"""
+    _store.save(session)
+
+
+def is_follow_up(question: str) -> bool:
+    """Check whether a question continues the previous one or refers back to its candidates"""
+    return bool(_CONTINUATION.search(question) or _REFERENCE.search(question))
+
+
+def refers_to_candidates(question: str) -> bool:
+    """Check whether a question explicitly asks about the previous candidates ("which of them...")"""
+    return bool(_REFERENCE.search(question))
+
+
+def _terms(value: Any) -> set:
+    text = value if isinstance(value, str) else " ".join(str(item) for item in value or [])
+    terms = {term.lower().rstrip(".") for term in _WORD.findall(text)} - _STOPWORDS
+    return terms | {SKILL_ALIASES[term].lower() for term in terms if term in SKILL_ALIASES}
+
+
+def filter_candidates(question: str, candidates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Narrow the previous candidates to those matching a follow-up question
+
+    Only terms that tell the candidates apart (e.g. "French" when some of them
+    speak it) are used, and a candidate is kept only if it matches all of them,
+    so "speaks French and lives in Lima" asks for both.
+
+    Args:
+        question: The follow-up question
+        candidates: Previous candidates in the ChromaDB single-query shape
+
+    Returns:
+        Candidates in the same shape, or None when the question names no such
+        term or nobody matches them all
+    """
+    question_terms = _terms(question)
+    candidate_terms = [
+        set().union(*(_terms(metadata.get(field)) for field in _FILTER_FIELDS)) & question_terms
+        for metadata in candidates["metadatas"][0]
+    ]
+    if not candidate_terms:
+        return None
+    shared = set.intersection(*candidate_terms)
+    wanted = set.union(*candidate_terms) - shared
+    keep = [index for index, terms in enumerate(candidate_terms) if wanted and wanted <= terms]
+    if not keep:
+        return None
+
+    logger.info(f"Follow-up narrowed {len(candidate_terms)} candidates to {len(keep)}")
+    return {
+        key: [[candidates[key][0][index] for index in keep]]
+        for key in ("ids", "metadatas", "distances")
+    }
@@ -0,0 +1,125 @@
+"""
+Synthetic CV corpus generator
+
+Produces reproducible CV texts with labelled fields (which the stub providers
+parse back into metadata) and renders them as minimal single-page PDFs that
+pypdf can extract text from.
+"""
+import random
+from typing import Dict, Iterator, List
+
+FIRST_NAMES = ["Ana", "Luis", "Maria", "Carlos", "Sofia", "Diego", "Lucia", "Jorge", "Valeria", "Andres",
+               "Camila", "Mateo", "Paula", "Javier", "Elena", "Ricardo", "Daniela", "Fernando", "Isabel", "Pablo"]
+LAST_NAMES = ["Garcia", "Rodriguez", "Lopez", "Martinez", "Gonzalez", "Perez", "Sanchez", "Ramirez", "Torres",
+              "Flores", "Rivera", "Gomez", "Diaz", "Vargas", "Castro", "Rojas", "Mendoza", "Silva", "Herrera", "Ortiz"]
+LOCATIONS = ["Lima, Peru", "Bogota, Colombia", "Santiago, Chile", "Buenos Aires, Argentina", "Quito, Ecuador",
+             "Mexico City, Mexico", "Madrid, Spain", "Montevideo, Uruguay", "Medellin, Colombia", "Arequipa, Peru"]
+SKILLS = ["Python", "Java", "JavaScript", "TypeScript", "Go", "Rust", "SQL", "PostgreSQL", "MongoDB", "AWS",
+          "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "React", "Angular", "Django", "FastAPI", "Spring",
+          "Kafka", "Spark", "Airflow", "Machine Learning", "Leadership", "Communication", "Scrum", "CI/CD",
+          "Linux", "GraphQL"]
+LANGUAGES = ["Spanish", "English", "Portuguese", "French", "German", "Italian"]
+JOB_TITLES = ["Software Engineer", "Backend Developer", "Frontend Developer", "DevOps Engineer", "Data Engineer",
+              "Data Scientist", "Tech Lead", "Engineering Manager", "QA Engineer", "Site Reliability Engineer",
+              "Full Stack Developer", "Cloud Architect"]
+EDUCATION = ["BSc Computer Science, Universidad de Lima", "BSc Systems Engineering, Universidad Nacional",
+             "MSc Data Science, Universidad de los Andes", "BSc Software Engineering, PUCP",
+             "MSc Computer Science, Universidad de Chile"]
+FILLER = ["Delivered features across the full product lifecycle.", "Collaborated with cross-functional teams.",
+          "Improved system reliability and reduced incident response time.", "Mentored junior engineers.",
+          "Designed and maintained scalable services.", "Automated deployment pipelines.",
+          "Worked closely with stakeholders to define requirements.", "Optimized database queries."]
+
+
+def generate_cv(index: int, seed: int = 0, paragraphs: int = 6) -> Dict:
+    """
+    Generate one synthetic CV
+
+    Args:
+        index: Position of the CV in the corpus (same index and seed give the same CV)
+        seed: Corpus seed
+        paragraphs: Number of experience paragraphs, which controls text length
+
+    Returns:
+        Dictionary with "filename", "text" and "metadata" keys
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    metadata = {
+        "name": name,
+        "location": rng.choice(LOCATIONS),
+        "skills": rng.sample(SKILLS, rng.randint(4, 10)),
+        "languages": rng.sample(LANGUAGES, rng.randint(1, 3)),
+        "experience_years": rng.randint(0, 25),
+        "job_titles": rng.sample(JOB_TITLES, rng.randint(1, 3)),
+        "education": rng.choice(EDUCATION),
+    }
+
+    lines = [
+        f"Name: {metadata['name']}",
+        f"Location: {metadata['location']}",
+        f"Skills: {', '.join(metadata['skills'])}",
+        f"Languages: {', '.join(metadata['languages'])}",
+        f"Experience: {metadata['experience_years']} years",
+        f"Job Titles: {', '.join(metadata['job_titles'])}",
+        f"Education: {metadata['education']}",
+        "",
+        "Professional Experience",
+    ]
+    for _ in range(paragraphs):
+        title = rng.choice(metadata["job_titles"])
+        lines.append(f"{title} working with {', '.join(rng.sample(metadata['skills'], 2))}.")
+        lines.extend(rng.sample(FILLER, 3))
+
+    return {"filename": f"cv_{seed}_{index:06d}.pdf", "text": "\n".join(lines), "metadata": metadata}
+
+
+def generate_corpus(size: int, seed: int = 0, paragraphs: int = 6) -> Iterator[Dict]:
+    """Yield `size` synthetic CVs"""
+    for index in range(size):
+        yield generate_cv(index, seed, paragraphs)
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(text: str) -> bytes:
+    """
+    Render text as a minimal single-page PDF using the built-in Helvetica font
+
+    Args:
+        text: Text to render, one PDF text line per input line
+
+    Returns:
+        PDF file bytes
+    """
+    lines: List[str] = text.splitlines()
+    stream_lines = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+    for line in lines:
+        stream_lines.append(f"({_escape(line.encode('latin-1', 'replace').decode('latin-1'))}) Tj T*")
+    stream_lines.append("ET")
+    stream = "\n".join(stream_lines).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+    ]
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n".encode()
+    output += b"0000000000 65535 f \n"
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(output)
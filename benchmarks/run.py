@@ -0,0 +1,496 @@
+"""
+Offline benchmark suite
+
+Runs the application against deterministic stub providers and a synthetic CV
+corpus, and writes the results as JSON so runs can be compared over time.
+
+Usage:
+    python -m benchmarks.run --scenario all --output bench_results.json
+    python -m benchmarks.run --scenario ask --concurrency 16 --llm-latency-ms 800
+"""
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import numpy as np
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import generate_corpus, render_pdf
+from benchmarks.stubs import StubConfig, fake_embedding, install_stubs
+
+QUESTIONS = [
+    "Who lives in Lima?",
+    "Which candidate would you recommend for a DevOps profile?",
+    "Who knows English and Portuguese?",
+    "Who has the most experience with Kubernetes?",
+    "Which data engineers know Spark and Airflow?",
+    "Who could lead a backend team using Java and Spring?",
+]
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _measure(scenario: Callable[[], Dict]) -> Dict:
+    """Run a scenario and record its wall time and the process peak RSS after it"""
+    start = time.perf_counter()
+    result = scenario()
+    result["wall_time_s"] = time.perf_counter() - start
+    result["process_max_rss_mb"] = _max_rss_mb()
+    return result
+
+
+def _heap_peak_mb(func: Callable[[], object]) -> float:
+    """Peak Python heap allocated while running func (tracing slows it, so never time this call)"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def _prompt_cache_tokens() -> Dict[str, float]:
+    """Prompt tokens counted so far by provider cache outcome (cached, written, uncached)"""
+    from app.core.metrics import PROMPT_CACHE_TOKENS
+
+    totals: Dict[str, float] = {}
+    for metric in PROMPT_CACHE_TOKENS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                totals[sample.labels["kind"]] = totals.get(sample.labels["kind"], 0.0) + sample.value
+    return totals
+
+
+def _fresh_collection(name: str, config: StubConfig):
+    """Point the application at a new, empty collection with stub providers installed"""
+    from app.core.config import settings
+    from app.infrastructure import vector_db
+    from app.services import deduplication
+
+    settings.COLLECTION_NAME = name
+    vector_db.collection = None
+    deduplication._indexes.clear()
+    vector_db.init_vector_db()
+
+    # Drop leftovers from earlier runs against the same --db-dir
+    if vector_db.collection.count():
+        vector_db.chroma_client.delete_collection(name)
+        vector_db.collection = None
+        vector_db.init_vector_db()
+    install_stubs(config)
+
+
+def _seed_collection(size: int, config: StubConfig, seed: int, batch_size: int = 5000):
+    """Bulk-load synthetic CVs with precomputed embeddings, bypassing the LLM pipeline"""
+    from app.infrastructure import vector_db
+    from app.infrastructure.document_store import put_document
+
+    batch = {"ids": [], "metadatas": [], "embeddings": []}
+    for index, cv in enumerate(generate_corpus(size, seed=seed, paragraphs=2)):
+        doc_id = f"seed-{index}"
+        metadata = dict(cv["metadata"], filename=cv["filename"], content_hash=put_document(cv["text"]))
+        batch["ids"].append(doc_id)
+        batch["metadatas"].append(vector_db.format_metadata(metadata, doc_id))
+        batch["embeddings"].append(fake_embedding(cv["text"][:300], config.embedding_dim))
+        if len(batch["ids"]) == batch_size:
+            vector_db.collection.add(**batch)
+            batch = {key: [] for key in batch}
+    if batch["ids"]:
+        vector_db.collection.add(**batch)
+
+
+class _Upload:
+    """Minimal stand-in for fastapi.UploadFile as used by process_cv_file"""
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self.file = io.BytesIO(content)
+
+
+def scenario_ingestion(args, config: StubConfig) -> Dict:
+    """Throughput of process_cv_file over rendered PDFs"""
+    from app.services.cv_processor import process_cv_file
+
+    _fresh_collection("bench_ingestion", config)
+    uploads = [(cv["filename"], render_pdf(cv["text"])) for cv in generate_corpus(args.ingest_docs, seed=args.seed)]
+    latencies: List[float] = []
+    errors = 0
+
+    def ingest(upload):
+        start = time.perf_counter()
+        process_cv_file(_Upload(*upload))
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(ingest, upload) for upload in uploads]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "documents": len(uploads),
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "throughput_docs_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": _percentiles(latencies),
+    }
+
+
+def scenario_ask(args, config: StubConfig) -> Dict:
+    """Latency distribution of POST /ask under concurrent load"""
+    import httpx
+    from app.main import app
+
+    _fresh_collection("bench_ask", config)
+    _seed_collection(args.ask_corpus_docs, config, args.seed)
+
+    async def run() -> Dict:
+        latencies: List[float] = []
+        statuses: Dict[int, int] = {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=app)
+
+        cache_before = _prompt_cache_tokens()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def ask(index: int):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/ask", json={"question": QUESTIONS[index % len(QUESTIONS)]})
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(ask(index) for index in range(args.ask_requests)))
+            elapsed = time.perf_counter() - start
+
+        cache = {kind: tokens - cache_before.get(kind, 0.0) for kind, tokens in _prompt_cache_tokens().items()}
+        prompt_tokens = sum(cache.values())
+        return {
+            "requests": args.ask_requests,
+            "concurrency": args.concurrency,
+            "corpus_documents": args.ask_corpus_docs,
+            "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+            "throughput_rps": args.ask_requests / elapsed if elapsed else 0.0,
+            "latency": _percentiles(latencies),
+            "prompt_cache_tokens": cache,
+            "prompt_cached_ratio": cache.get("cached", 0.0) / prompt_tokens if prompt_tokens else 0.0,
+        }
+
+    return asyncio.run(run())
+
+
+def scenario_get_all_cvs(args, config: StubConfig) -> Dict:
+    """Latency of get_all_cvs as the collection grows"""
+    from app.infrastructure.vector_db import get_all_cvs
+
+    results = {}
+    for size in args.list_sizes:
+        _fresh_collection(f"bench_list_{size}", config)
+        seed_start = time.perf_counter()
+        _seed_collection(size, config, args.seed)
+        seed_time = time.perf_counter() - seed_start
+
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            cvs = get_all_cvs()
+            samples.append(time.perf_counter() - start)
+
+        results[str(size)] = {
+            "documents": len(cvs),
+            "seed_time_s": seed_time,
+            "get_all_cvs": _percentiles(samples),
+        }
+    return {"sizes": results}
+
+
+def scenario_memory(args, config: StubConfig) -> Dict:
+    """Python heap peaks of the main code paths and RSS growth per indexed document"""
+    from app.infrastructure.vector_db import get_all_cvs
+    from app.services.cv_processor import process_cv_file
+    from app.services.query_service import process_question
+
+    _fresh_collection("bench_memory", config)
+    rss_before = _max_rss_mb()
+    _seed_collection(args.ask_corpus_docs, config, args.seed)
+    rss_after = _max_rss_mb()
+
+    uploads = [
+        (cv["filename"], render_pdf(cv["text"]))
+        for cv in generate_corpus(10, seed=args.seed + 1)
+    ]
+
+    return {
+        "corpus_documents": args.ask_corpus_docs,
+        "peak_rss_growth_per_1k_docs_mb": (rss_after - rss_before) * 1000 / max(args.ask_corpus_docs, 1),
+        "get_all_cvs_heap_peak_mb": _heap_peak_mb(get_all_cvs),
+        "process_question_heap_peak_mb": _heap_peak_mb(lambda: process_question(QUESTIONS[0])),
+        "process_cv_file_heap_peak_mb": _heap_peak_mb(
+            lambda: [process_cv_file(_Upload(*upload)) for upload in uploads]
+        ) / len(uploads),
+    }
+
+
+def _timed(func: Callable[[], object], repeat: int):
+    """Run func repeat times; returns the last result and the per-run timings"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def scenario_serialization(args, config: StubConfig) -> Dict:
+    """Time to turn stored CVs into a /cv response body, and its size on the wire per encoding"""
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.api.models.cv import CVDocument
+    from app.core.compression import compress, supported_encodings
+    from app.infrastructure import vector_db
+
+    field = create_response_field(name="response", type_=List[CVDocument])
+
+    def default_path(rows) -> bytes:
+        # What FastAPI does for response_model=List[CVDocument]: build models, re-validate, stdlib json
+        cvs = [vector_db._to_cv_document(doc_id, metadata, text) for doc_id, metadata, text in rows]
+        content = asyncio.run(serialize_response(field=field, response_content=cvs, is_coroutine=False))
+        return JSONResponse(content).body
+
+    def fast_path(rows) -> bytes:
+        return ORJSONResponse([vector_db._to_cv_dict(doc_id, metadata, text) for doc_id, metadata, text in rows]).body
+
+    results = {}
+    for size in args.serialization_sizes:
+        # Full text included, the worst case for a listing
+        rows = [
+            (f"seed-{index}", vector_db.format_metadata(dict(cv["metadata"], filename=cv["filename"]), f"seed-{index}"), cv["text"])
+            for index, cv in enumerate(generate_corpus(size, seed=args.seed, paragraphs=2))
+        ]
+        default_body, default_samples = _timed(lambda: default_path(rows), args.repeat)
+        fast_body, fast_samples = _timed(lambda: fast_path(rows), args.repeat)
+
+        encodings = {"identity": {"bytes": len(fast_body)}}
+        for encoding in supported_encodings():
+            body, samples = _timed(lambda: compress(fast_body, encoding), args.repeat)
+            encodings[encoding] = {"bytes": len(body), "ratio": len(body) / len(fast_body), "compress": _percentiles(samples)}
+
+        results[str(size)] = {
+            "documents": size,
+            "identical_bodies": json.loads(default_body) == json.loads(fast_body),
+            "default": _percentiles(default_samples),
+            "fast": _percentiles(fast_samples),
+            "speedup": float(np.mean(default_samples) / np.mean(fast_samples)),
+            "encodings": encodings,
+        }
+    return {"sizes": results}
+
+
+def scenario_s3_sync(args, config: StubConfig) -> Dict:
+    """Initial, no-op, incremental and post-restart S3 sync passes over CVs dropped straight into the bucket"""
+    from app.core.config import settings
+    from app.infrastructure import s3, vector_db
+    from app.services.s3_sync import S3SyncWorker
+
+    _fresh_collection("bench_s3_sync", config)
+    bucket = settings.S3_BUCKET_NAME
+    s3.s3_client.create_bucket(Bucket=bucket)
+    cvs = list(generate_corpus(args.sync_docs, seed=args.seed + 2))
+    for cv in cvs:
+        s3.s3_client.put_object(Bucket=bucket, Key=f"incoming/{cv['filename']}", Body=render_pdf(cv["text"]))
+
+    worker = S3SyncWorker(
+        os.path.join(tempfile.mkdtemp(prefix="cv_sync_"), "state.json"), "incoming/", args.concurrency
+    )
+
+    def sync_pass() -> Dict:
+        start = time.perf_counter()
+        counts = worker.sync_once()
+        return {"seconds": time.perf_counter() - start, "counts": counts}
+
+    initial = sync_pass()
+    no_op = sync_pass()
+
+    # Edit a tenth of the CVs and delete another tenth
+    for cv in cvs[0::10]:
+        text = cv["text"] + "\nCertifications: AWS Solutions Architect"
+        s3.s3_client.put_object(Bucket=bucket, Key=f"incoming/{cv['filename']}", Body=render_pdf(text))
+    for cv in cvs[5::10]:
+        s3.s3_client.delete_object(Bucket=bucket, Key=f"incoming/{cv['filename']}")
+    incremental = sync_pass()
+
+    # A new host, or a restarted container, without the checkpoint picks up from the index
+    worker = S3SyncWorker(
+        os.path.join(tempfile.mkdtemp(prefix="cv_sync_"), "state.json"), "incoming/", args.concurrency
+    )
+    restart = sync_pass()
+
+    return {
+        "objects": len(cvs),
+        "concurrency": args.concurrency,
+        "initial": initial,
+        "throughput_docs_per_s": len(cvs) / initial["seconds"] if initial["seconds"] else 0.0,
+        "no_op": no_op,
+        "incremental": incremental,
+        "restart": restart,
+        "indexed_documents": vector_db.collection.count(),
+        "expected_documents": len(cvs) - len(cvs[5::10]),
+    }
+
+
+_COLD_START_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from app.infrastructure.vector_db import init_vector_db
+init_vector_db()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "ready_s": ready - start,
+    "eager_modules": [name for name in ("openai", "boto3") if name in sys.modules],
+}))
+"""
+
+
+def scenario_cold_start(args, config: StubConfig) -> Dict:
+    """Import time of app.main and time until the vector database is ready, in fresh interpreters"""
+    import subprocess
+
+    env = dict(os.environ, VECTOR_DB_DIR=tempfile.mkdtemp(prefix="cv_cold_"))
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _COLD_START_PROBE], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_times = [run["import_s"] for run in runs]
+    ready_times = [run["ready_s"] for run in runs]
+    return {
+        "runs": len(runs),
+        "import": _percentiles(import_times),
+        "ready": _percentiles(ready_times),
+        "eager_modules": sorted({name for run in runs for name in run["eager_modules"]}),
+        "import_budget_ms": args.import_budget_ms,
+        "ready_budget_ms": args.ready_budget_ms,
+        "within_budget": max(import_times) * 1000 <= args.import_budget_ms
+        and max(ready_times) * 1000 <= args.ready_budget_ms,
+    }
+
+
+SCENARIOS = {
+    "ingestion": scenario_ingestion,
+    "ask": scenario_ask,
+    "get_all_cvs": scenario_get_all_cvs,
+    "memory": scenario_memory,
+    "serialization": scenario_serialization,
+    "s3_sync": scenario_s3_sync,
+    "cold_start": scenario_cold_start,
+}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Run offline benchmarks against stub providers")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--output", default="bench_results.json", help="Path of the JSON results file")
+    parser.add_argument("--provider", choices=["bedrock", "openai"], default="bedrock")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub latency of embedding and S3 calls")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Stub latency of LLM calls")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="Shortest prefix the stub prompt caches store")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ingest-docs", type=int, default=100)
+    parser.add_argument("--ask-requests", type=int, default=100)
+    parser.add_argument("--ask-corpus-docs", type=int, default=1000)
+    parser.add_argument("--list-sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--sync-docs", type=int, default=200, help="CVs dropped into the bucket for the S3 sync")
+    parser.add_argument("--serialization-sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per size and cold starts")
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0, help="Cold start budget for importing app.main")
+    parser.add_argument("--ready-budget-ms", type=float, default=3000.0, help="Cold start budget until the vector DB is ready")
+    parser.add_argument("--admission", action="store_true", help="Keep rate limits and provider concurrency budgets on")
+    parser.add_argument("--db-dir", default=None, help="Vector DB directory (a temporary one by default)")
+    args = parser.parse_args(argv)
+
+    # Configure the application before it is imported
+    os.environ["VECTOR_DB_DIR"] = args.db_dir or tempfile.mkdtemp(prefix="cv_bench_")
+    os.environ["DOC_STORE_DIR"] = os.path.join(os.environ["VECTOR_DB_DIR"], "doc_store")
+    os.environ["USE_OPENAI"] = "true" if args.provider == "openai" else "false"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ["TRACING_ENABLED"] = "false"
+    os.environ["ADMISSION_ENABLED"] = "true" if args.admission else "false"
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        embedding_dim=args.embedding_dim,
+        seed=args.seed,
+        cache_min_tokens=args.cache_min_tokens,
+    )
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "db_dir")},
+        "scenarios": {},
+    }
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        report["scenarios"][name] = _measure(lambda: SCENARIOS[name](args, config))
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    # Fail the run when the cold start budget is exceeded, so CI can gate on it
+    cold_start = report["scenarios"].get("cold_start")
+    if cold_start is not None and not cold_start["within_budget"]:
+        print("Cold start budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
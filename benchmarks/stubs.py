@@ -0,0 +1,349 @@
+"""
+Deterministic local stand-ins for the Bedrock, OpenAI and S3 clients
+
+The stubs mimic the parts of the boto3 and OpenAI client APIs the application
+uses, with configurable latency and error rates, so benchmarks run offline and
+produce repeatable numbers.
+"""
+import io
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import numpy as np
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from botocore.exceptions import ClientError
+
+_TOKEN = re.compile(r"\w+")
+_FIELD = re.compile(r"^\s*(Name|Location|Skills|Languages|Experience|Job Titles|Education):\s*(.+)$", re.MULTILINE)
+
+
+class StubConfig:
+    """Latency and failure behaviour shared by all stub clients"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        llm_latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        embedding_dim: int = 256,
+        seed: int = 0,
+        cache_min_tokens: int = 1024,
+    ):
+        self.latency_ms = latency_ms
+        self.llm_latency_ms = llm_latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.embedding_dim = embedding_dim
+        self.cache_min_tokens = cache_min_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self, llm: bool = False) -> Optional[str]:
+        """Sleep for the configured latency and decide whether the call fails"""
+        with self._lock:
+            base = self.llm_latency_ms if llm else self.latency_ms
+            delay = base + self._random.uniform(0, self.jitter_ms)
+            outcome = self._random.random()
+        if delay:
+            time.sleep(delay / 1000)
+        if outcome < self.throttle_rate:
+            return "throttle"
+        if outcome < self.throttle_rate + self.error_rate:
+            return "error"
+        return None
+
+
+def fake_embedding(text: str, dim: int = 256) -> List[float]:
+    """
+    Hash each token into a fixed-size bag-of-words vector
+
+    Texts sharing words get similar vectors, so retrieval quality is meaningful
+    while staying fully deterministic.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in _TOKEN.findall(text.lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dim] += 1.0 if value & (1 << 63) else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def fake_metadata(prompt: str) -> Dict:
+    """Parse the labelled fields written by the synthetic corpus back out of a prompt"""
+    fields = {label: value.strip() for label, value in _FIELD.findall(prompt)}
+    experience = re.search(r"\d+(\.\d+)?", fields.get("Experience", ""))
+    split = lambda value: [item.strip() for item in value.split(",") if item.strip()]
+    return {
+        "name": fields.get("Name", "Unknown"),
+        "location": fields.get("Location", "Unknown"),
+        "skills": split(fields.get("Skills", "")),
+        "languages": split(fields.get("Languages", "")),
+        "experience_years": float(experience.group()) if experience else 0,
+        "job_titles": split(fields.get("Job Titles", "")),
+        "education": fields.get("Education", ""),
+    }
+
+
+def _token_count(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+class _PromptCache:
+    """Remembers prompt prefixes the way provider prompt caches do, ignoring expiry"""
+
+    def __init__(self, min_tokens: int, history: int = 64):
+        self.min_tokens = min_tokens
+        self.prefixes: Dict[str, None] = {}
+        self.prompts: List[str] = []
+        self.history = history
+        self._lock = threading.Lock()
+
+    def explicit(self, prefixes: List[str]) -> Dict[str, int]:
+        """Anthropic-style: each cache breakpoint prefix is either read or written"""
+        read, written = 0, 0
+        with self._lock:
+            for prefix in prefixes:
+                tokens = _token_count(prefix)
+                if tokens < self.min_tokens:
+                    continue
+                if prefix in self.prefixes:
+                    read = tokens
+                else:
+                    self.prefixes[prefix] = None
+                    written = tokens - read
+        return {"read": read, "written": written}
+
+    def automatic(self, prompt: str) -> int:
+        """OpenAI-style: the longest prefix shared with a recent prompt, in 128-token steps"""
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, other])) for other in self.prompts), default=0)
+            self.prompts = (self.prompts + [prompt])[-self.history:]
+        tokens = shared // 4
+        return tokens // 128 * 128 if tokens >= self.min_tokens else 0
+
+
+class StubBedrockClient:
+    """Stand-in for the boto3 bedrock-runtime client"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.calls = 0
+        self.cache = _PromptCache(config.cache_min_tokens)
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+        self.calls += 1
+        request = json.loads(body)
+        failure = self.config.roll(llm="inputText" not in request)
+        if failure:
+            code = "ThrottlingException" if failure == "throttle" else "InternalServerException"
+            raise ClientError({"Error": {"Code": code, "Message": "stub failure"}}, "InvokeModel")
+
+        if "inputText" in request:
+            text = request["inputText"]
+            payload = {
+                "embedding": fake_embedding(text, self.config.embedding_dim),
+                "inputTextTokenCount": _token_count(text),
+            }
+        else:
+            blocks = list(request.get("system", [])) + [
+                block
+                for message in request["messages"]
+                for block in (message["content"] if isinstance(message["content"], list) else [message["content"]])
+            ]
+            texts = [block["text"] if isinstance(block, dict) else block for block in blocks]
+            prompt = "\n".join(texts)
+            cache = self.cache.explicit([
+                "\n".join(texts[:index + 1])
+                for index, block in enumerate(blocks)
+                if isinstance(block, dict) and "cache_control" in block
+            ])
+            if "Extract the following structured information" in prompt:
+                answer = json.dumps(fake_metadata(prompt))
+            else:
+                answer = f"Stub answer based on {prompt.count('CV ID:')} candidates."
+            payload = {
+                "content": [{"type": "text", "text": answer}],
+                "usage": {
+                    "input_tokens": _token_count(prompt) - cache["read"] - cache["written"],
+                    "cache_read_input_tokens": cache["read"],
+                    "cache_creation_input_tokens": cache["written"],
+                    "output_tokens": _token_count(answer),
+                },
+            }
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+
+class RateLimitError(Exception):
+    """Matches the class name the application uses to detect OpenAI throttling"""
+
+
+class _StubEmbeddings:
+    def __init__(self, config: StubConfig):
+        self.config = config
+
+    def create(self, model: str, input, **kwargs):
+        failure = self.config.roll()
+        if failure:
+            raise RateLimitError("stub throttle") if failure == "throttle" else RuntimeError("stub failure")
+        texts = [input] if isinstance(input, str) else list(input)
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=fake_embedding(text, self.config.embedding_dim)) for text in texts],
+            usage=SimpleNamespace(prompt_tokens=sum(_token_count(text) for text in texts), completion_tokens=0),
+        )
+
+
+class _StubCompletions:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.cache = _PromptCache(config.cache_min_tokens)
+
+    def create(self, model: str, messages: List[Dict], **kwargs):
+        failure = self.config.roll(llm=True)
+        if failure:
+            raise RateLimitError("stub throttle") if failure == "throttle" else RuntimeError("stub failure")
+        prompt = "\n".join(message["content"] for message in messages)
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            answer = json.dumps(fake_metadata(prompt))
+        else:
+            answer = f"Stub answer based on {prompt.count('CV ID:')} candidates."
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            usage=SimpleNamespace(
+                prompt_tokens=_token_count(prompt),
+                completion_tokens=_token_count(answer),
+                prompt_tokens_details=SimpleNamespace(cached_tokens=self.cache.automatic(prompt)),
+            ),
+        )
+
+
+class StubOpenAIClient:
+    """Stand-in for the OpenAI SDK client"""
+
+    def __init__(self, config: StubConfig):
+        self.api_key = "stub"
+        self.embeddings = _StubEmbeddings(config)
+        self.chat = SimpleNamespace(completions=_StubCompletions(config))
+
+
+class StubS3Client:
+    """In-memory stand-in for the boto3 S3 client"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+        self.info: Dict[str, Dict[str, Dict]] = {}
+
+    def _bucket(self, bucket: str) -> Dict[str, bytes]:
+        if bucket not in self.buckets:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadBucket")
+        return self.buckets[bucket]
+
+    def _store(self, bucket: str, key: str, data: bytes, metadata: Optional[Dict[str, str]] = None):
+        self._bucket(bucket)[key] = data
+        self.info.setdefault(bucket, {})[key] = {
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "LastModified": datetime.now(timezone.utc),
+            "Metadata": dict(metadata or {}),
+        }
+
+    def head_bucket(self, Bucket: str):
+        self._bucket(Bucket)
+        return {}
+
+    def create_bucket(self, Bucket: str, **kwargs):
+        self.buckets.setdefault(Bucket, {})
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, Metadata: Optional[Dict[str, str]] = None, **kwargs):
+        if self.config.roll():
+            raise ClientError({"Error": {"Code": "SlowDown", "Message": "stub failure"}}, "PutObject")
+        self._store(Bucket, Key, bytes(Body), Metadata)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        if self.config.roll():
+            raise ClientError({"Error": {"Code": "SlowDown", "Message": "stub failure"}}, "GetObject")
+        objects = self._bucket(Bucket)
+        if Key not in objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+        return {"Body": io.BytesIO(objects[Key]), **self.info[Bucket][Key]}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs):
+        if Key not in self._bucket(Bucket):
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return dict(self.info[Bucket][Key], ContentLength=len(self.buckets[Bucket][Key]))
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs):
+        self._bucket(Bucket).pop(Key, None)
+        self.info.get(Bucket, {}).pop(Key, None)
+        return {}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs: Optional[Dict] = None, **kwargs):
+        if self.config.roll():
+            raise ClientError({"Error": {"Code": "SlowDown", "Message": "stub failure"}}, "PutObject")
+        with open(Filename, "rb") as file:
+            self._store(Bucket, Key, file.read(), (ExtraArgs or {}).get("Metadata"))
+
+    def get_paginator(self, operation: str):
+        return _StubListPaginator(self)
+
+
+class _StubListPaginator:
+    """list_objects_v2 paginator over the stub buckets, 1000 keys per page like S3"""
+
+    def __init__(self, client: StubS3Client):
+        self.client = client
+
+    def paginate(self, Bucket: str, Prefix: str = "", **kwargs):
+        keys = sorted(key for key in self.client._bucket(Bucket) if key.startswith(Prefix))
+        for start in range(0, max(len(keys), 1), 1000):
+            yield {
+                "Contents": [
+                    {
+                        "Key": key,
+                        "ETag": self.client.info[Bucket][key]["ETag"],
+                        "LastModified": self.client.info[Bucket][key]["LastModified"],
+                        "Size": len(self.client.buckets[Bucket][key]),
+                    }
+                    for key in keys[start:start + 1000]
+                ]
+            }
+
+
+def install_stubs(config: StubConfig) -> Dict[str, object]:
+    """
+    Replace the provider clients used by the application with stubs
+
+    Must be called after the vector database is initialized, since the OpenAI
+    embedding function creates its own client.
+
+    Returns:
+        Dictionary of the installed stub clients by provider name
+    """
+    from app.infrastructure import bedrock, openai, s3
+
+    stubs = {
+        "bedrock": StubBedrockClient(config),
+        "openai": StubOpenAIClient(config),
+        "s3": StubS3Client(config),
+    }
+    bedrock.bedrock_client = stubs["bedrock"]
+    openai.client = stubs["openai"]
+    s3.s3_client = stubs["s3"]
+
+    # The OpenAI embedding function holds its own client
+    from app.infrastructure import vector_db
+
+    if hasattr(vector_db.embedding_function, "client"):
+        vector_db.embedding_function.client = stubs["openai"]
+    return stubs
@@ -0,0 +1,39 @@
+"""
+Production server configuration
+
+Usage:
+    gunicorn app.main:app -c gunicorn.conf.py
+
+The application is imported once in the master (preload_app) and forked into
+Uvicorn workers, so workers start without re-importing it. Provider clients and
+the vector database are created lazily in each worker after the fork.
+"""
+import os
+import logging
+import multiprocessing
+
+logger = logging.getLogger("gunicorn.error")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# A local ChromaDB directory can only be used by one process, so several workers need CHROMA_HOST
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2, 8))))
+if workers > 1 and not os.getenv("CHROMA_HOST"):
+    logger.warning("CHROMA_HOST is not set; running a single worker on the local vector database")
+    workers = 1
+
+# The application splits its admission limits between the workers it actually runs with
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+def child_exit(server, worker):
+    # Drop the metrics of exited workers when Prometheus multiprocess mode is on
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
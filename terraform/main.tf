@@ -345,6 +345,15 @@ resource "aws_ecs_task_definition" "app_task" {
           {
             name  = "USE_OPENAI"
             value = tostring(var.use_openai)
+          },
+          {
+            # Requests arrive through the ALB, which appends the client address to X-Forwarded-For
+            name  = "TRUSTED_PROXY_HOPS"
+            value = "1"
+          },
+          {
+            name  = "TRUSTED_PROXY_CIDRS"
+            value = data.aws_vpc.selected.cidr_block
           }
         ],
         var.use_openai ? [
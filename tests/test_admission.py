@@ -0,0 +1,33 @@
+"""Client identity for admission control behind a load balancer"""
+import pytest
+
+from app.core import admission
+from app.core.config import settings
+
+
+@pytest.fixture
+def behind_alb(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 1)
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_CIDRS", "10.0.0.0/16")
+
+
+def test_clients_behind_the_balancer_get_their_own_identity(behind_alb):
+    first = admission.client_key(None, admission.forwarded_client("10.0.3.7", "203.0.113.5"))
+    second = admission.client_key(None, admission.forwarded_client("10.0.3.7", "198.51.100.9"))
+
+    assert first == "ip:203.0.113.5"
+    assert second == "ip:198.51.100.9"
+
+
+def test_addresses_sent_by_the_client_are_ignored(behind_alb):
+    assert admission.forwarded_client("10.0.3.7", "1.2.3.4, 203.0.113.5") == "203.0.113.5"
+
+
+def test_forwarded_header_from_an_untrusted_peer_is_ignored(behind_alb):
+    assert admission.forwarded_client("203.0.113.5", "1.2.3.4") == "203.0.113.5"
+
+
+def test_forwarded_header_is_ignored_without_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 0)
+
+    assert admission.forwarded_client("10.0.3.7", "203.0.113.5") == "10.0.3.7"
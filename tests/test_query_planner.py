@@ -0,0 +1,50 @@
+"""Splitting recruiter questions into sub-queries with the pattern rules"""
+import pytest
+
+from app.core.config import settings
+from app.services import query_planner
+
+
+@pytest.fixture(autouse=True)
+def no_llm(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_PLANNER_USE_LLM", False)
+
+
+@pytest.mark.parametrize("question", [
+    "Who lives in Lima and has 5 years of experience?",
+    "Who knows Java as well as Python?",
+])
+def test_conjunctive_questions_stay_whole(question):
+    assert query_planner.plan_queries(question) == [question]
+
+
+@pytest.mark.parametrize("question, expected", [
+    (
+        "compare senior developers with Kubernetes skills to junior developers",
+        ["senior developers with Kubernetes skills", "junior developers"],
+    ),
+    (
+        "Compare the Java developers in Lima with the Python developers in Bogotá",
+        ["Java developers in Lima", "Python developers in Bogotá"],
+    ),
+    ("Who knows Java versus Python?", ["Who knows Java", "Who knows Python"]),
+])
+def test_comparisons_split_into_self_contained_queries(question, expected):
+    assert query_planner.plan_queries(question) == expected
+
+
+def test_ambiguous_comparisons_go_to_the_llm(monkeypatch):
+    question = "compare the backend engineers with React experience and the data scientists"
+    monkeypatch.setattr(settings, "QUERY_PLANNER_USE_LLM", True)
+    monkeypatch.setattr(
+        query_planner, "query_routed_llm",
+        lambda prompt, route: '["backend engineers with React experience", "data scientists"]',
+    )
+
+    assert query_planner.plan_queries(question) == ["backend engineers with React experience", "data scientists"]
+
+
+def test_ambiguous_comparisons_stay_whole_without_the_llm():
+    question = "compare the backend engineers with React experience and the data scientists"
+
+    assert query_planner.plan_queries(question) == [question]
@@ -0,0 +1,230 @@
+"""
+S3 sync passes against a moto S3 backend
+
+Providers are the benchmark stubs; S3 is moto's in-process mock, so listing,
+ETags, object metadata and deletes behave as they do on S3.
+"""
+import os
+import tempfile
+
+# Configure the application before it is imported
+_data_dir = tempfile.mkdtemp(prefix="cv_test_")
+os.environ.update(
+    VECTOR_DB_DIR=_data_dir,
+    DOC_STORE_DIR=os.path.join(_data_dir, "doc_store"),
+    USE_OPENAI="false",
+    TRACING_ENABLED="false",
+    ADMISSION_ENABLED="false",
+    AWS_ACCESS_KEY_ID="testing",
+    AWS_SECRET_ACCESS_KEY="testing",
+    AWS_REGION="us-east-1",
+    S3_BUCKET_NAME="cv-sync-test",
+)
+os.environ.pop("S3_ENDPOINT_URL", None)
+
+import io
+import uuid
+
+import pytest
+from moto import mock_s3
+
+from app.core.config import settings
+from app.infrastructure import s3, vector_db
+from app.services import deduplication
+from app.services.cv_processor import process_cv_file
+from app.services.s3_sync import S3SyncWorker
+from benchmarks.corpus import generate_corpus, render_pdf
+from benchmarks.stubs import StubConfig, install_stubs
+
+PREFIX = "incoming/"
+
+
+class _Upload:
+    """Minimal stand-in for fastapi.UploadFile as used by process_cv_file"""
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self.file = io.BytesIO(content)
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """An empty moto bucket and a fresh collection, with stub AI providers"""
+    monkeypatch.setattr(settings, "COLLECTION_NAME", f"test_{uuid.uuid4().hex[:12]}")
+    vector_db.collection = None
+    deduplication._indexes.clear()
+    vector_db.init_vector_db()
+    install_stubs(StubConfig(latency_ms=0, llm_latency_ms=0, jitter_ms=0))
+
+    with mock_s3():
+        # The real client, against the mock
+        s3.s3_client = None
+        s3.get_client().create_bucket(Bucket=settings.S3_BUCKET_NAME)
+        yield s3.get_client()
+    s3.s3_client = None
+
+
+def _worker(state_dir=None) -> S3SyncWorker:
+    return S3SyncWorker(os.path.join(state_dir or tempfile.mkdtemp(), "state.json"), PREFIX, concurrency=2)
+
+
+def _put(client, key: str, text: str):
+    client.put_object(Bucket=settings.S3_BUCKET_NAME, Key=key, Body=render_pdf(text))
+
+
+def _counts(**expected):
+    return dict(dict.fromkeys(("added", "updated", "deleted", "linked", "skipped", "failed"), 0), **expected)
+
+
+def test_sync_adds_updates_and_deletes(bucket):
+    cvs = list(generate_corpus(3, seed=1))
+    for cv in cvs:
+        _put(bucket, PREFIX + cv["filename"], cv["text"])
+    worker = _worker()
+
+    assert worker.sync_once() == _counts(added=3)
+    assert vector_db.collection.count() == 3
+    assert worker.sync_once() == _counts()
+
+    # An edited object replaces its CV under the same ID
+    key = PREFIX + cvs[0]["filename"]
+    doc_id, _ = vector_db.find_document_by_source(key)
+    _put(bucket, key, cvs[0]["text"] + "\nCertifications: AWS Solutions Architect")
+    assert worker.sync_once() == _counts(updated=1)
+    updated_id, metadata = vector_db.find_document_by_source(key)
+    assert updated_id == doc_id
+    assert metadata["source_etag"] == bucket.head_object(Bucket=settings.S3_BUCKET_NAME, Key=key)["ETag"]
+    assert vector_db.collection.count() == 3
+
+    bucket.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=PREFIX + cvs[1]["filename"])
+    assert worker.sync_once() == _counts(deleted=1)
+    assert vector_db.collection.count() == 2
+    assert vector_db.find_document_by_source(PREFIX + cvs[1]["filename"]) is None
+
+
+def test_sync_links_api_uploads(bucket):
+    cv = next(generate_corpus(1, seed=2))
+    doc_id = process_cv_file(_Upload(PREFIX + cv["filename"], render_pdf(cv["text"])))
+
+    assert _worker().sync_once() == _counts(linked=1)
+    assert vector_db.collection.count() == 1
+    assert vector_db.find_document_by_source(PREFIX + cv["filename"])[0] == doc_id
+
+
+def test_sync_resumes_from_the_index_without_a_checkpoint(bucket):
+    cvs = list(generate_corpus(3, seed=3))
+    for cv in cvs:
+        _put(bucket, PREFIX + cv["filename"], cv["text"])
+    assert _worker().sync_once() == _counts(added=3)
+
+    # A restarted container has lost its checkpoint; objects deleted meanwhile still go away
+    bucket.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=PREFIX + cvs[2]["filename"])
+    assert _worker().sync_once() == _counts(deleted=1)
+    assert vector_db.collection.count() == 2
+
+
+def test_sync_drops_the_old_version_of_a_merged_object(bucket, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_MODE", "merge")
+    first, second = generate_corpus(2, seed=4)
+    _put(bucket, PREFIX + "first.pdf", first["text"])
+    _put(bucket, PREFIX + "second.pdf", second["text"])
+    worker = _worker()
+    assert worker.sync_once() == _counts(added=2)
+
+    # The second object now holds a copy of the first CV, so it is merged into it
+    _put(bucket, PREFIX + "second.pdf", first["text"])
+    assert worker.sync_once() == _counts(updated=1)
+    assert vector_db.collection.count() == 1
+
+
+def test_sync_keeps_a_merged_cv_while_another_object_holds_it(bucket, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_MODE", "merge")
+    first, second = generate_corpus(2, seed=8)
+    _put(bucket, PREFIX + "first.pdf", first["text"])
+    _put(bucket, PREFIX + "second.pdf", second["text"])
+    worker = _worker()
+    assert worker.sync_once() == _counts(added=2)
+    _put(bucket, PREFIX + "second.pdf", first["text"])
+    assert worker.sync_once() == _counts(updated=1)
+    doc_id = vector_db.find_document_by_source(PREFIX + "second.pdf")[0]
+
+    # The merged CV was last written from the second object, but the first one still holds it
+    bucket.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=PREFIX + "second.pdf")
+    assert worker.sync_once() == _counts(deleted=1)
+    assert vector_db.collection.count() == 1
+    assert vector_db.find_document_by_source(PREFIX + "first.pdf")[0] == doc_id
+
+
+def test_sync_indexes_a_skipped_copy_once_its_original_is_deleted(bucket, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_MODE", "skip")
+    cv = next(generate_corpus(1, seed=9))
+    _put(bucket, PREFIX + "original.pdf", cv["text"])
+    worker = _worker()
+    assert worker.sync_once() == _counts(added=1)
+    _put(bucket, PREFIX + "copy.pdf", cv["text"])
+    assert worker.sync_once() == _counts(skipped=1)
+
+    bucket.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=PREFIX + "original.pdf")
+    assert worker.sync_once() == _counts(deleted=1)
+    assert worker.sync_once() == _counts(added=1)
+    assert vector_db.collection.count() == 1
+    assert vector_db.find_document_by_source(PREFIX + "copy.pdf") is not None
+
+
+def test_sync_keeps_folders_out_of_tenants(bucket):
+    cv = next(generate_corpus(1, seed=5))
+    _put(bucket, PREFIX + "2024/" + cv["filename"], cv["text"])
+
+    assert _worker().sync_once() == _counts(added=1)
+    assert vector_db.collection.count() == 1
+    assert vector_db.list_tenants() == []
+
+
+def test_sync_links_tenant_uploads_to_their_tenant(bucket):
+    cv = next(generate_corpus(1, seed=6))
+    doc_id = process_cv_file(_Upload(cv["filename"], render_pdf(cv["text"])), tenant="acme")
+    worker = S3SyncWorker(os.path.join(tempfile.mkdtemp(), "state.json"), "acme/", concurrency=2)
+
+    assert worker.sync_once() == _counts(linked=1)
+    assert vector_db.collection.count() == 0
+    assert vector_db.find_document_by_source(f"acme/{cv['filename']}", "acme")[0] == doc_id
+
+
+def test_sync_deletes_the_text_of_removed_cvs(bucket):
+    from app.infrastructure import document_store
+
+    first, second = generate_corpus(2, seed=7)
+    _put(bucket, PREFIX + "first.pdf", first["text"])
+    _put(bucket, PREFIX + "second.pdf", second["text"])
+    worker = _worker()
+    assert worker.sync_once() == _counts(added=2)
+    first_hash = vector_db.find_document_by_source(PREFIX + "first.pdf")[1]["content_hash"]
+    second_hash = vector_db.find_document_by_source(PREFIX + "second.pdf")[1]["content_hash"]
+
+    # A new version leaves no copy of the old text behind, and neither does a deleted object
+    _put(bucket, PREFIX + "first.pdf", first["text"] + "\nCertifications: CKA")
+    bucket.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=PREFIX + "second.pdf")
+    assert worker.sync_once() == _counts(updated=1, deleted=1)
+
+    for digest in (first_hash, second_hash):
+        assert not os.path.exists(document_store._local_path(digest))
+        with pytest.raises(bucket.exceptions.ClientError):
+            bucket.head_object(Bucket=settings.S3_BUCKET_NAME, Key=document_store._object_name(digest))
+
+
+def test_sync_keeps_text_shared_with_another_cv(bucket, monkeypatch):
+    from app.infrastructure import document_store
+
+    monkeypatch.setattr(settings, "DEDUP_MODE", "off")
+    cv = next(generate_corpus(1, seed=8))
+    _put(bucket, PREFIX + "copy-1.pdf", cv["text"])
+    _put(bucket, PREFIX + "copy-2.pdf", cv["text"])
+    worker = _worker()
+    assert worker.sync_once() == _counts(added=2)
+    digest = vector_db.find_document_by_source(PREFIX + "copy-1.pdf")[1]["content_hash"]
+
+    bucket.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=PREFIX + "copy-1.pdf")
+    assert worker.sync_once() == _counts(deleted=1)
+    assert document_store.get_document(digest) == vector_db.get_cv(
+        vector_db.find_document_by_source(PREFIX + "copy-2.pdf")[0]
+    ).content
@@ -0,0 +1,31 @@
+"""Narrowing a session's candidates with a follow-up question"""
+from app.services.session_store import filter_candidates
+
+
+def _candidates(*metadatas):
+    return {
+        "ids": [[f"cv-{index}" for index in range(len(metadatas))]],
+        "metadatas": [list(metadatas)],
+        "distances": [[0.1 * index for index in range(len(metadatas))]],
+    }
+
+
+def test_function_words_in_titles_do_not_narrow():
+    candidates = _candidates(
+        {"name": "Ana", "languages": "French, Spanish", "job_titles": "Head of Engineering"},
+        {"name": "Ben", "languages": "French, English", "job_titles": "Backend Developer"},
+    )
+
+    assert filter_candidates("and which of them speaks French?", candidates) is None
+
+
+def test_every_named_term_must_match():
+    candidates = _candidates(
+        {"name": "Ana", "languages": "French", "location": "Lima"},
+        {"name": "Ben", "languages": "French", "location": "Bogotá"},
+        {"name": "Cai", "languages": "German", "location": "Lima"},
+    )
+
+    narrowed = filter_candidates("which of them speaks French and lives in Lima?", candidates)
+
+    assert narrowed["ids"] == [["cv-0"]]
@@ -0,0 +1,79 @@
+"""
+Tenant collection lookups against a ChromaDB client that does not have the collection,
+and document texts released while another document is being added with the same text
+
+The local client raises ValueError for a missing collection, while chromadb's
+HttpClient re-raises the server's error as a plain Exception.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.infrastructure import document_store, vector_db
+
+
+class _Client:
+    """ChromaDB client stand-in whose get_collection fails like the HTTP client"""
+
+    def __init__(self, names, error):
+        self.names = names
+        self.error = error
+
+    def get_collection(self, name, embedding_function=None):
+        raise self.error
+
+    def list_collections(self):
+        return [SimpleNamespace(name=name) for name in self.names]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(names=(), error=Exception("{\"error\":\"ValueError('Collection cv_embeddings__acme does not exist.')\"}")):
+        fake = _Client(list(names), error)
+        monkeypatch.setattr(vector_db, "chroma_client", fake)
+        monkeypatch.setattr(vector_db, "collection", object())
+        monkeypatch.setattr(vector_db, "_tenant_collections", vector_db.OrderedDict())
+        return fake
+
+    return install
+
+
+@pytest.mark.parametrize("error", [Exception("server error"), ValueError("does not exist")])
+def test_missing_tenant_collection_is_none(client, error):
+    client(error=error)
+
+    assert vector_db.get_collection("acme") is None
+    assert vector_db._get_tenant("acme", include=["metadatas"])["ids"] == []
+
+
+def test_lookup_errors_of_existing_collections_are_raised(client):
+    client(names=[vector_db.tenant_collection_name("acme")], error=Exception("server error"))
+
+    with pytest.raises(Exception, match="server error"):
+        vector_db.get_collection("acme")
+
+
+class _Collection:
+    """Collection stand-in whose upsert runs a release that found no reference just before"""
+
+    name = "cv_embeddings"
+
+    def get(self, ids=None, include=None):
+        return {"ids": [], "metadatas": []}
+
+    def upsert(self, embeddings, metadatas, ids):
+        document_store.release_document(metadatas[0]["content_hash"], lambda: False)
+
+
+def test_text_released_while_a_document_is_added_is_stored_again(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "DOC_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DOC_STORE_S3_ENABLED", False)
+    monkeypatch.setattr(vector_db, "get_collection", lambda tenant, create=False: _Collection())
+    monkeypatch.setattr(vector_db, "embedding_function", lambda texts: [[0.0] for _ in texts])
+    text = "Jane Doe, Python developer"
+
+    vector_db.add_document(text, {"name": "Jane Doe"}, "cv-1")
+    document_store._cache.clear()
+
+    assert document_store.get_document(document_store.content_hash(text)) == text